@@ -0,0 +1,77 @@
+"""
+Acciones masivas sobre vehículos del panel de inventario.
+
+Cada acción es un único UPDATE (o un INSERT masivo en la tabla M2M)
+dentro de una transacción, sin cargar ni guardar los vehículos uno por
+uno. Como update() y bulk_create() no disparan señales, aquí mismo se
+actualiza fecha_actualizacion (invalida tarjetas y ETags) y se programa
+la sincronización de búsqueda, catálogo, resumen y cachés al confirmar.
+Todas devuelven la cantidad de vehículos afectados.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import autocompletar
+from .models import Vehiculo
+from .reprecio import aplicar_reglas
+from .signals import sincronizar_al_confirmar
+
+
+def _al_terminar(ids, cambia_terminos):
+    sincronizar_al_confirmar(ids)
+    if cambia_terminos and autocompletar.indice_construido():
+        # Disponibilidad y atributos cambian el peso de los términos
+        terminos = autocompletar.terminos_de_vehiculos(ids)
+        transaction.on_commit(lambda: autocompletar.actualizar_terminos(terminos))
+
+
+def _actualizar(ids, cambia_terminos=False, **campos):
+    ids = list(ids)
+    with transaction.atomic():
+        total = Vehiculo.objects.filter(pk__in=ids).update(fecha_actualizacion=timezone.now(), **campos)
+        _al_terminar(ids, cambia_terminos)
+    return total
+
+
+def cambiar_disponibilidad(ids, disponible):
+    """Marca los vehículos como disponibles o no disponibles (vendidos)"""
+    return _actualizar(ids, cambia_terminos=True, disponible=disponible)
+
+
+def ajustar_precio(ids, porcentaje=None, monto=None):
+    """
+    Sube o baja el precio en un porcentaje o en un monto fijo (negativos
+    para bajar). Es una regla sin condiciones del motor de reprecio: el
+    cálculo lo hace la base de datos, redondeado a dos decimales y nunca
+    por debajo de cero, y cada cambio queda en el historial de precios.
+    Todos los lotes del motor corren en una misma transacción: o cambian
+    todos los vehículos o ninguno.
+    """
+    if porcentaje is not None:
+        regla = {'nombre': f'{Decimal(porcentaje):+}%', 'porcentaje': porcentaje}
+    else:
+        regla = {'nombre': f'{Decimal(monto):+}', 'monto': monto}
+    with transaction.atomic():
+        cambios = aplicar_reglas([regla], Vehiculo.objects.filter(pk__in=list(ids)), aplicar=True, origen='masiva')
+    return len(cambios)
+
+
+def asignar_categoria(ids, categoria):
+    """Asigna la misma categoría (o ninguna) a todos los vehículos"""
+    return _actualizar(ids, categoria=categoria)
+
+
+def agregar_atributos(ids, atributos):
+    """Agrega atributos a los vehículos con un solo INSERT (ignora los que ya tenían)"""
+    ids = list(Vehiculo.objects.filter(pk__in=ids).values_list('pk', flat=True))
+    Relacion = Vehiculo.atributos.through
+    with transaction.atomic():
+        Relacion.objects.bulk_create(
+            [Relacion(vehiculo_id=vehiculo_id, atributo_id=atributo.pk) for vehiculo_id in ids for atributo in atributos],
+            ignore_conflicts=True,
+        )
+        Vehiculo.objects.filter(pk__in=ids).update(fecha_actualizacion=timezone.now())
+        _al_terminar(ids, cambia_terminos=True)
+    return len(ids)
@@ -1,8 +1,27 @@
 from django.contrib import admin
-from .models import Marca, Condicion, Vehiculo, Categoria, Atributo, DetalleVehiculo
+from .models import Marca, Condicion, Vehiculo, Categoria, Atributo, DetalleVehiculo, HistorialPrecio, TrabajoImagen
+from .paginacion import PaginadorAproximado
 
 # Register your models here.
 
+class CondicionFilter(admin.SimpleListFilter):
+    """
+    Filtro por condición sin JOIN con la tabla M2M: se usa una subconsulta
+    de ids (pk IN ...), así el listado no necesita DISTINCT.
+    """
+    title = 'condición'
+    parameter_name = 'condicion'
+
+    def lookups(self, request, model_admin):
+        return Condicion.objects.values_list('pk', 'nombre')
+
+    def queryset(self, request, queryset):
+        if self.value() is None:
+            return queryset
+        vehiculos = Vehiculo.condicion.through.objects.filter(condicion_id=self.value())
+        return queryset.filter(pk__in=vehiculos.values('vehiculo_id'))
+
+
 @admin.register(Marca)
 class MarcaAdmin(admin.ModelAdmin):
     list_display = ('nombre',)
@@ -18,10 +37,16 @@ class CondicionAdmin(admin.ModelAdmin):
 @admin.register(Vehiculo)
 class VehiculoAdmin(admin.ModelAdmin):
     list_display = ('marca', 'modelo', 'anio', 'precio', 'color', 'disponible', 'fecha_ingreso')
-    list_filter = ('marca', 'anio', 'disponible', 'condicion')
+    list_filter = ('marca', 'anio', 'disponible', CondicionFilter)
+    list_select_related = ('marca',)
     search_fields = ('modelo', 'marca__nombre', 'descripcion')
-    filter_horizontal = ('condicion',)
-    readonly_fields = ('fecha_ingreso', 'fecha_actualizacion')
+    # Autocompletado en vez de <select> con todas las filas de cada tabla
+    autocomplete_fields = ('marca', 'condicion', 'detalles')
+    readonly_fields = ('estado_imagen', 'fecha_ingreso', 'fecha_actualizacion')
+    # Con tablas grandes el total del listado es la estimación del
+    # planificador y no se hace el segundo COUNT(*) sin filtros
+    paginator = PaginadorAproximado
+    show_full_result_count = False
     
     fieldsets = (
         ('Información Básica', {
@@ -31,7 +56,7 @@ class VehiculoAdmin(admin.ModelAdmin):
             'fields': ('detalles', 'color', 'kilometraje', 'num_puertas', 'num_pasajeros')
         }),
         ('Descripción e Imagen', {
-            'fields': ('descripcion', 'imagen')
+            'fields': ('descripcion', 'imagen', 'estado_imagen')
         }),
         ('Control', {
             'fields': ('fecha_ingreso', 'fecha_actualizacion'),
@@ -39,6 +64,10 @@ class VehiculoAdmin(admin.ModelAdmin):
         }),
     )
 
+    def get_queryset(self, request):
+        # El formulario de edición muestra marca y detalles (y sus __str__)
+        return super().get_queryset(request).select_related('marca', 'detalles')
+
 # Registro de modelos adicionales para el admin
 @admin.register(Categoria)
 class CategoriaAdmin(admin.ModelAdmin):
@@ -52,5 +81,44 @@ class AtributoAdmin(admin.ModelAdmin):
 
 @admin.register(DetalleVehiculo)
 class DetalleVehiculoAdmin(admin.ModelAdmin):
-    list_display = ('id', 'dimensiones', 'peso')
-    search_fields = ('dimensiones',)
+    list_display = ('id', '__str__', 'dimensiones', 'peso')
+    search_fields = ('dimensiones', 'vehiculo__modelo')
+    ordering = ('-pk',)
+    paginator = PaginadorAproximado
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        # __str__ usa el vehículo y su marca: se traen en la misma consulta
+        # (también para el autocompletado del campo detalles de Vehiculo)
+        return super().get_queryset(request).select_related('vehiculo__marca')
+
+@admin.register(HistorialPrecio)
+class HistorialPrecioAdmin(admin.ModelAdmin):
+    list_display = ('vehiculo', 'precio_anterior', 'precio_nuevo', 'origen', 'regla', 'fecha')
+    list_filter = ('origen',)
+    list_select_related = ('vehiculo__marca',)
+    search_fields = ('vehiculo__modelo', 'regla')
+    raw_id_fields = ('vehiculo',)
+
+    # El historial se escribe solo: ediciones, acciones masivas y reglas
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(TrabajoImagen)
+class TrabajoImagenAdmin(admin.ModelAdmin):
+    list_display = ('vehiculo', 'imagen', 'estado', 'intentos', 'disponible_desde', 'actualizado')
+    list_filter = ('estado',)
+    list_select_related = ('vehiculo__marca',)
+    search_fields = ('vehiculo__modelo', 'imagen')
+    raw_id_fields = ('vehiculo',)
+    ordering = ('-pk',)
+
+    # La cola la llenan las señales y la vacía `procesar_imagenes`
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
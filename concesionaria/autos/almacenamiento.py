@@ -0,0 +1,92 @@
+"""
+Almacenamiento por contenido para las imágenes de vehículos.
+
+Cada archivo subido se guarda una sola vez, nombrado por el SHA-256 de su
+contenido: `vehiculos/3f/a1/3fa1...c9.jpg`. El hash se calcula mientras el
+archivo se copia por bloques a un temporal; si ya existe un archivo con
+ese hash, el temporal se descarta y se devuelve el nombre existente. Subir
+la misma foto diez veces ocupa lo mismo que subirla una.
+
+Como el nombre depende del contenido, un archivo nunca cambia: sus URLs
+se pueden cachear sin vencimiento. Cuántos vehículos usan cada archivo lo
+lleva ImagenAlmacenada (autos/imagenes.py); este módulo no toca la base
+de datos.
+"""
+import hashlib
+import os
+import posixpath
+import tempfile
+
+from django.core.files.storage import FileSystemStorage, storages
+
+CARPETA_TEMPORAL = 'tmp'
+
+
+def almacenamiento_imagenes():
+    """Storage de Vehiculo.imagen: el alias "imagenes" de settings.STORAGES"""
+    return storages['imagenes']
+
+
+def nombre_por_contenido(carpeta, digest, extension):
+    return posixpath.join(carpeta, digest[:2], digest[2:4], f'{digest}{extension}')
+
+
+def es_nombre_por_contenido(nombre):
+    """True si `nombre` ya sigue el esquema carpeta/ab/cd/<sha256>.ext"""
+    partes = nombre.split('/')
+    if len(partes) < 3:
+        return False
+    digest = posixpath.splitext(partes[-1])[0]
+    return (
+        len(digest) == 64 and partes[-3] == digest[:2] and partes[-2] == digest[2:4]
+        and all(caracter in '0123456789abcdef' for caracter in digest)
+    )
+
+
+class AlmacenamientoDeduplicado(FileSystemStorage):
+    """FileSystemStorage que nombra cada archivo por el hash de su contenido"""
+
+    def nombre_para(self, name, content):
+        """Nombre que tendría `content` subido como `name`, sin guardarlo"""
+        digest = hashlib.sha256()
+        for bloque in content.chunks():
+            digest.update(bloque)
+        carpeta, archivo = posixpath.split(name.replace('\\', '/'))
+        return nombre_por_contenido(carpeta, digest.hexdigest(), posixpath.splitext(archivo)[1].lower())
+
+    def get_available_name(self, name, max_length=None):
+        # El nombre definitivo lo decide _save a partir del contenido
+        return name
+
+    def _save(self, name, content):
+        carpeta, archivo = posixpath.split(name.replace('\\', '/'))
+        extension = posixpath.splitext(archivo)[1].lower()
+        temporales = self.path(CARPETA_TEMPORAL)
+        os.makedirs(temporales, exist_ok=True)
+
+        digest = hashlib.sha256()
+        descriptor, temporal = tempfile.mkstemp(dir=temporales)
+        try:
+            with os.fdopen(descriptor, 'wb') as destino:
+                for bloque in content.chunks():
+                    digest.update(bloque)
+                    destino.write(bloque)
+            nombre = nombre_por_contenido(carpeta, digest.hexdigest(), extension)
+            ruta = self.path(nombre)
+            if os.path.exists(ruta):
+                # Mismo contenido ya guardado: se reutiliza. Se renueva su fecha
+                # para que la limpieza (autos/limpieza.py) no lo borre mientras
+                # la fila que lo referencia todavía no se confirma
+                os.remove(temporal)
+                os.utime(ruta)
+            else:
+                os.makedirs(os.path.dirname(ruta), exist_ok=True)
+                # os.replace es atómico: dos subidas iguales simultáneas dejan un solo archivo completo
+                os.replace(temporal, ruta)
+                if self.file_permissions_mode is not None:
+                    os.chmod(ruta, self.file_permissions_mode)
+        except BaseException:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            raise
+        return nombre
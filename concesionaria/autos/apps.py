@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class AutosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'autos'
+
+    def ready(self):
+        # Registra las señales que mantienen las estructuras derivadas
+        from . import signals  # noqa: F401
@@ -0,0 +1,313 @@
+"""
+Autocompletado del buscador del catálogo con un trie de prefijos en memoria.
+
+Los términos (marcas, modelos y atributos) pesan tantos vehículos
+disponibles como tengan. Cada nodo del trie guarda ya calculados sus
+mejores k términos, así una consulta solo recorre los caracteres del
+prefijo y no toca la base de datos.
+
+El índice es por proceso: se construye al primer uso, se actualiza término
+a término desde las señales de autos/signals.py y se reconstruye completo
+cada TIEMPO_MAXIMO_INDICE segundos para recoger cambios de otros procesos.
+La reconstrucción corre en un hilo aparte: mientras tanto las consultas
+usan el índice anterior y, al terminar, se reemplaza la referencia de una
+vez. Solo la primera construcción del proceso se espera.
+"""
+import heapq
+import logging
+import threading
+import time
+
+from django.db import connection
+from django.db.models import Count, Q
+
+from .busqueda import normalizar_texto
+from .models import Atributo, Vehiculo
+
+TIPO_MARCA = 'marca'
+TIPO_MODELO = 'modelo'
+TIPO_ATRIBUTO = 'atributo'
+
+MEJORES_POR_NODO = 10
+TIEMPO_MAXIMO_INDICE = 600  # segundos
+
+logger = logging.getLogger(__name__)
+
+
+class _Nodo:
+    __slots__ = ('hijos', 'terminos', 'mejores')
+
+    def __init__(self):
+        self.hijos = {}
+        self.terminos = None    # set de (tipo, texto) que terminan aquí
+        self.mejores = ()       # [(-peso, texto, tipo)] ordenada, máx. k
+
+
+class TriePrefijos:
+    """Trie de prefijos con los mejores k términos precalculados por nodo"""
+
+    def __init__(self, k=MEJORES_POR_NODO):
+        self.k = k
+        self.raiz = _Nodo()
+        self.pesos = {}
+
+    def __len__(self):
+        return len(self.pesos)
+
+    def _ruta(self, clave, crear=False):
+        """Nodos desde la raíz hasta el de `clave` (None si no existe)"""
+        nodo = self.raiz
+        ruta = [nodo]
+        for caracter in clave:
+            siguiente = nodo.hijos.get(caracter)
+            if siguiente is None:
+                if not crear:
+                    return None
+                siguiente = nodo.hijos[caracter] = _Nodo()
+            nodo = siguiente
+            ruta.append(nodo)
+        return ruta
+
+    def _recalcular(self, nodo):
+        if not nodo.terminos and len(nodo.hijos) == 1:
+            # Tramo sin bifurcaciones: comparte la lista del único hijo
+            # (las listas se reemplazan, nunca se modifican en su lugar)
+            nodo.mejores = next(iter(nodo.hijos.values())).mejores
+            return
+        candidatos = [(-self.pesos[termino], termino[1], termino[0]) for termino in nodo.terminos or ()]
+        for hijo in nodo.hijos.values():
+            candidatos.extend(hijo.mejores)
+        nodo.mejores = heapq.nsmallest(self.k, candidatos)
+
+    def _guardar(self, tipo, texto, peso):
+        clave = normalizar_texto(texto)
+        termino = (tipo, texto)
+        if peso > 0:
+            ruta = self._ruta(clave, crear=True)
+            self.pesos[termino] = peso
+            if ruta[-1].terminos is None:
+                ruta[-1].terminos = set()
+            ruta[-1].terminos.add(termino)
+        else:
+            ruta = self._ruta(clave)
+            self.pesos.pop(termino, None)
+            if ruta is None or not ruta[-1].terminos:
+                return None
+            ruta[-1].terminos.discard(termino)
+        return ruta
+
+    def actualizar(self, tipo, texto, peso):
+        """Inserta, cambia el peso o (con peso 0) elimina un término"""
+        ruta = self._guardar(tipo, texto, peso)
+        if ruta is None:
+            return
+        # Solo cambian los mejores de los nodos en la ruta, de abajo hacia arriba
+        for nodo in reversed(ruta):
+            self._recalcular(nodo)
+
+    def cargar(self, terminos):
+        """Carga masiva de (tipo, texto, peso); recalcula una sola vez al final"""
+        for tipo, texto, peso in terminos:
+            self._guardar(tipo, texto, peso)
+        # Recorrido post-orden iterativo para no depender de la recursión
+        pila = [(self.raiz, False)]
+        while pila:
+            nodo, visitado = pila.pop()
+            if visitado:
+                self._recalcular(nodo)
+            else:
+                pila.append((nodo, True))
+                pila.extend((hijo, False) for hijo in nodo.hijos.values())
+
+    def buscar(self, prefijo, limite=MEJORES_POR_NODO):
+        """Los `limite` términos más pesados que empiezan con `prefijo`"""
+        nodo = self.raiz
+        for caracter in normalizar_texto(prefijo):
+            nodo = nodo.hijos.get(caracter)
+            if nodo is None:
+                return []
+        return [
+            {'texto': texto, 'tipo': tipo, 'total': -peso}
+            for peso, texto, tipo in nodo.mejores[:limite]
+        ]
+
+
+# =====================
+# ÍNDICE DEL CATÁLOGO
+# =====================
+
+_indice = None
+_construido_en = 0.0
+# Protege las modificaciones del índice y las variables de este bloque;
+# las consultas leen _indice sin tomarlo
+_candado = threading.Lock()
+# Una sola construcción a la vez (la primera, o la del hilo de fondo)
+_candado_construccion = threading.Lock()
+_reconstruyendo = False
+# Cambios mientras se reconstruye: el índice nuevo puede haber leído los
+# datos anteriores, así que esos términos se recalculan al reemplazarlo y
+# una invalidación lo deja vencido de entrada
+_cambiados_durante = set()
+_invalidado_durante = False
+
+
+def _disponibles():
+    return Vehiculo.objects.filter(disponible=True)
+
+
+def _pesos_marcas(nombres=None):
+    vehiculos = _disponibles()
+    if nombres is not None:
+        vehiculos = vehiculos.filter(marca__nombre__in=nombres)
+    return dict(vehiculos.values_list('marca__nombre').annotate(total=Count('id')).order_by())
+
+
+def _pesos_modelos(modelos=None):
+    vehiculos = _disponibles()
+    if modelos is not None:
+        vehiculos = vehiculos.filter(modelo__in=modelos)
+    return dict(vehiculos.values_list('modelo').annotate(total=Count('id')).order_by())
+
+
+def _pesos_atributos(nombres=None):
+    atributos = Atributo.objects.all()
+    if nombres is not None:
+        atributos = atributos.filter(nombre__in=nombres)
+    return dict(
+        atributos.values_list('nombre')
+        .annotate(total=Count('vehiculos', filter=Q(vehiculos__disponible=True)))
+        .order_by()
+    )
+
+
+def construir_indice():
+    """Construye un trie nuevo con todos los términos (3 consultas agrupadas)"""
+    trie = TriePrefijos()
+    terminos = []
+    for tipo, pesos in (
+        (TIPO_MARCA, _pesos_marcas()),
+        (TIPO_MODELO, _pesos_modelos()),
+        (TIPO_ATRIBUTO, _pesos_atributos()),
+    ):
+        terminos.extend((tipo, texto, peso) for texto, peso in pesos.items())
+    trie.cargar(terminos)
+    return trie
+
+
+def _reemplazar_indice():
+    """Construye un índice nuevo y lo pone en lugar del actual"""
+    global _indice, _construido_en, _cambiados_durante, _invalidado_durante
+    with _candado:
+        _cambiados_durante, _invalidado_durante = set(), False
+    nuevo = construir_indice()
+    with _candado:
+        _actualizar(nuevo, _cambiados_durante)
+        _indice = nuevo
+        _construido_en = float('-inf') if _invalidado_durante else time.monotonic()
+        _cambiados_durante, _invalidado_durante = set(), False
+
+
+def _reconstruir_en_segundo_plano():
+    global _reconstruyendo
+    try:
+        with _candado_construccion:
+            _reemplazar_indice()
+    except Exception:
+        # Se sigue usando el índice anterior; se reintenta en la próxima consulta
+        logger.exception('No se pudo reconstruir el índice de autocompletado')
+    finally:
+        with _candado:
+            _reconstruyendo = False
+        # El hilo abrió su propia conexión a la base de datos
+        connection.close()
+
+
+def obtener_indice():
+    global _reconstruyendo
+    indice = _indice
+    if indice is None:
+        # Primer uso del proceso: no hay con qué responder, se espera
+        with _candado_construccion:
+            if _indice is None:
+                _reemplazar_indice()
+        return _indice
+    if time.monotonic() - _construido_en > TIEMPO_MAXIMO_INDICE:
+        with _candado:
+            lanzar = not _reconstruyendo
+            _reconstruyendo = True
+        if lanzar:
+            threading.Thread(target=_reconstruir_en_segundo_plano, daemon=True).start()
+    return indice
+
+
+def indice_construido():
+    return _indice is not None
+
+
+def invalidar_indice():
+    """
+    Marca el índice como vencido: la próxima consulta lanza la
+    reconstrucción y, mientras tanto, sigue respondiendo con el actual
+    """
+    global _construido_en, _invalidado_durante
+    with _candado:
+        _construido_en = float('-inf')
+        _invalidado_durante = _reconstruyendo
+
+
+def _actualizar(indice, terminos):
+    """Recalcula en `indice` el peso de los términos (tipo, texto); con _candado tomado"""
+    por_tipo = {TIPO_MARCA: set(), TIPO_MODELO: set(), TIPO_ATRIBUTO: set()}
+    for tipo, texto in terminos:
+        por_tipo[tipo].add(texto)
+    consultas = {TIPO_MARCA: _pesos_marcas, TIPO_MODELO: _pesos_modelos, TIPO_ATRIBUTO: _pesos_atributos}
+    for tipo, textos in por_tipo.items():
+        if not textos:
+            continue
+        pesos = consultas[tipo](textos)
+        for texto in textos:
+            indice.actualizar(tipo, texto, pesos.get(texto, 0))
+
+
+def actualizar_terminos(terminos):
+    """
+    Recalcula el peso de los términos (tipo, texto) indicados y los
+    actualiza en el índice, si ya está construido.
+    """
+    if _indice is None or not terminos:
+        return
+    with _candado:
+        if _indice is None:
+            return
+        _actualizar(_indice, terminos)
+        if _reconstruyendo:
+            _cambiados_durante.update(terminos)
+
+
+def terminos_de_vehiculo(vehiculo_id):
+    """Términos (tipo, texto) que aporta un vehículo según la base de datos"""
+    fila = Vehiculo.objects.filter(pk=vehiculo_id).values_list('marca__nombre', 'modelo').first()
+    if fila is None:
+        return set()
+    terminos = {(TIPO_MARCA, fila[0]), (TIPO_MODELO, fila[1])}
+    terminos.update(
+        (TIPO_ATRIBUTO, nombre)
+        for nombre in Atributo.objects.filter(vehiculos__pk=vehiculo_id).values_list('nombre', flat=True)
+    )
+    return terminos
+
+
+def terminos_de_vehiculos(ids):
+    """Como terminos_de_vehiculo, para muchos vehículos con dos consultas"""
+    terminos = set()
+    for marca, modelo in Vehiculo.objects.filter(pk__in=ids).values_list('marca__nombre', 'modelo').distinct():
+        terminos.update({(TIPO_MARCA, marca), (TIPO_MODELO, modelo)})
+    terminos.update(
+        (TIPO_ATRIBUTO, nombre)
+        for nombre in Atributo.objects.filter(vehiculos__pk__in=ids).values_list('nombre', flat=True).distinct()
+    )
+    return terminos
+
+
+def autocompletar(prefijo, limite=MEJORES_POR_NODO):
+    return obtener_indice().buscar(prefijo, limite)
@@ -0,0 +1,245 @@
+"""
+Búsqueda de texto completo del catálogo.
+
+Cada vehículo tiene un BusquedaVehiculo (título + documento) y la base de
+datos mantiene el índice:
+
+- PostgreSQL: columna generada `vector` (tsvector con la configuración
+  `es_unaccent`: stemming en español + unaccent) con índice GIN.
+- SQLite: tabla virtual FTS5 `autos_busquedavehiculo_fts` sincronizada por
+  triggers, con `remove_diacritics` para ignorar tildes (sin stemming).
+
+Otros motores vuelven a la búsqueda con icontains.
+
+Para tolerar errores de tipeo ("toyta corola") `sugerir` compara por
+trigramas contra Marca.nombre y Vehiculo.modelo: en PostgreSQL con pg_trgm
+e índices GIN trigram, en el resto calculando los trigramas en Python.
+"""
+import re
+import unicodedata
+from collections import defaultdict
+
+from django.db import connection, transaction
+from django.db.models import Count, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+from .models import BusquedaVehiculo, Marca, Vehiculo
+
+CONFIGURACION_PG = 'es_unaccent'
+TABLA_FTS = 'autos_busquedavehiculo_fts'
+
+# Peso relativo del título frente al resto del documento (SQLite / bm25)
+PESO_TITULO = 10.0
+PESO_DOCUMENTO = 1.0
+
+
+def _consulta_fts5(texto):
+    """Convierte texto libre en una consulta FTS5 segura: "tok"* "tok"* ..."""
+    palabras = re.findall(r'\w+', texto)
+    return ' '.join(f'"{palabra}"*' for palabra in palabras)
+
+
+def buscar(vehiculos, texto):
+    """
+    Filtra un queryset (Vehiculo o un modelo cuyo pk es el id del vehículo)
+    por texto completo y anota `relevancia` (mayor es mejor).
+    """
+    tabla = vehiculos.model._meta.db_table
+    columna_pk = vehiculos.model._meta.pk.column
+    referencia = f'"{tabla}"."{columna_pk}"'
+
+    if connection.vendor == 'postgresql':
+        consulta = f"websearch_to_tsquery('{CONFIGURACION_PG}', %s)"
+        coincidencias = RawSQL(
+            f"SELECT vehiculo_id FROM autos_busquedavehiculo WHERE vector @@ {consulta}",
+            (texto,),
+        )
+        # ::float8 para que el valor vuelva exacto en el cursor de paginación
+        relevancia = RawSQL(
+            f"SELECT ts_rank_cd(b.vector, {consulta})::float8 FROM autos_busquedavehiculo b "
+            f"WHERE b.vehiculo_id = {referencia}",
+            (texto,),
+            output_field=FloatField(),
+        )
+    elif connection.vendor == 'sqlite':
+        consulta = _consulta_fts5(texto)
+        if not consulta:
+            # Anotada igual, para que se pueda ordenar por relevancia
+            return vehiculos.none().annotate(relevancia=Value(0.0, output_field=FloatField()))
+        coincidencias = RawSQL(
+            f"SELECT rowid FROM {TABLA_FTS} WHERE {TABLA_FTS} MATCH %s",
+            (consulta,),
+        )
+        relevancia = RawSQL(
+            f"SELECT -bm25({TABLA_FTS}, {PESO_TITULO}, {PESO_DOCUMENTO}) FROM {TABLA_FTS} "
+            f"WHERE {TABLA_FTS} MATCH %s AND rowid = {referencia}",
+            (consulta,),
+            output_field=FloatField(),
+        )
+    else:
+        return vehiculos.filter(
+            Q(modelo__icontains=texto) |
+            Q(descripcion__icontains=texto) |
+            Q(marca__nombre__icontains=texto)
+        ).annotate(relevancia=Value(0.0, output_field=FloatField()))
+
+    return vehiculos.filter(pk__in=coincidencias).annotate(relevancia=relevancia)
+
+
+def construir_documento(vehiculo):
+    """Devuelve (titulo, documento) de un vehículo con sus relaciones cargadas"""
+    titulo = f'{vehiculo.marca.nombre} {vehiculo.modelo} {vehiculo.anio}'
+    partes = [vehiculo.descripcion, vehiculo.color]
+    if vehiculo.categoria:
+        partes.append(vehiculo.categoria.nombre)
+    partes.extend(condicion.nombre for condicion in vehiculo.condicion.all())
+    partes.extend(atributo.nombre for atributo in vehiculo.atributos.all())
+    return titulo, ' '.join(parte for parte in partes if parte)
+
+
+def reindexar_vehiculos(ids, tamano_lote=500):
+    """Regenera el documento de búsqueda de los vehículos indicados"""
+    ids = list(ids)
+    for inicio in range(0, len(ids), tamano_lote):
+        lote = (
+            Vehiculo.objects.filter(pk__in=ids[inicio:inicio + tamano_lote])
+            .select_related('marca', 'categoria')
+            .prefetch_related('condicion', 'atributos')
+        )
+        documentos = []
+        for vehiculo in lote:
+            titulo, documento = construir_documento(vehiculo)
+            documentos.append(BusquedaVehiculo(vehiculo=vehiculo, titulo=titulo, documento=documento))
+        BusquedaVehiculo.objects.bulk_create(
+            documentos,
+            update_conflicts=True,
+            unique_fields=['vehiculo'],
+            update_fields=['titulo', 'documento'],
+        )
+
+
+def reindexar_todo(tamano_lote=500):
+    """Regenera los documentos de todos los vehículos; devuelve cuántos"""
+    ids = list(Vehiculo.objects.values_list('pk', flat=True))
+    reindexar_vehiculos(ids, tamano_lote)
+    return len(ids)
+
+
+# =====================
+# SUGERENCIAS POR SIMILITUD (TRIGRAMAS)
+# =====================
+
+UMBRAL_SIMILITUD = 0.3
+
+
+def normalizar_texto(texto):
+    """Minúsculas y sin tildes, igual que unaccent(lower(...))"""
+    texto = unicodedata.normalize('NFKD', texto.lower())
+    return ''.join(c for c in texto if not unicodedata.combining(c))
+
+
+def _trigramas(palabra):
+    # Mismo relleno que pg_trgm: dos espacios al inicio y uno al final
+    relleno = f'  {palabra} '
+    return {relleno[i:i + 3] for i in range(len(relleno) - 2)}
+
+
+def similitud_palabra(palabra, texto):
+    """
+    Mayor similitud de trigramas entre `palabra` y alguna palabra de `texto`
+    (aproxima word_similarity de pg_trgm).
+    """
+    trigramas = _trigramas(normalizar_texto(palabra))
+    mejor = 0.0
+    for otra in re.findall(r'\w+', normalizar_texto(texto)):
+        otros = _trigramas(otra)
+        mejor = max(mejor, len(trigramas & otros) / len(trigramas | otros))
+    return mejor
+
+
+def _similares_postgresql(palabra, sql):
+    with transaction.atomic(), connection.cursor() as cursor:
+        # El umbral por defecto de pg_trgm (0.6) descarta "toyta" -> "toyota"
+        cursor.execute(
+            "SELECT set_config('pg_trgm.word_similarity_threshold', %s, true)",
+            [str(UMBRAL_SIMILITUD)],
+        )
+        cursor.execute(sql, [palabra, palabra])
+        return dict(cursor.fetchall())
+
+
+def _similares_python(palabra, valores):
+    similares = {}
+    for valor in valores:
+        puntaje = similitud_palabra(palabra, valor)
+        if puntaje >= UMBRAL_SIMILITUD:
+            similares[valor] = puntaje
+    return similares
+
+
+def _candidatos(palabras):
+    """
+    Para cada palabra, las marcas y modelos parecidos con su similitud:
+    ({palabra: {marca: puntaje}}, {palabra: {modelo: puntaje}})
+    """
+    marcas, modelos = {}, {}
+    if connection.vendor == 'postgresql':
+        for palabra in palabras:
+            marcas[palabra] = _similares_postgresql(
+                palabra,
+                "SELECT nombre, word_similarity(%s, nombre) FROM autos_marca WHERE %s <%% nombre",
+            )
+            modelos[palabra] = _similares_postgresql(
+                palabra,
+                "SELECT DISTINCT modelo, word_similarity(%s, modelo) FROM autos_vehiculo "
+                "WHERE disponible AND %s <%% modelo",
+            )
+    else:
+        nombres = list(Marca.objects.values_list('nombre', flat=True))
+        distintos = list(
+            Vehiculo.objects.filter(disponible=True).values_list('modelo', flat=True).distinct()
+        )
+        for palabra in palabras:
+            marcas[palabra] = _similares_python(palabra, nombres)
+            modelos[palabra] = _similares_python(palabra, distintos)
+    return marcas, modelos
+
+
+def sugerir(texto, limite=5):
+    """
+    Sugerencias "¿Quisiste decir...?" para un texto que no encontró nada.
+    Devuelve una lista de dicts {'texto', 'marca', 'modelo', 'total'}
+    ordenada por similitud y luego por cantidad de vehículos disponibles.
+    """
+    palabras = [p for p in re.findall(r'\w+', texto) if len(p) >= 3]
+    if not palabras:
+        return []
+    marcas, modelos = _candidatos(palabras)
+    todas_marcas = set().union(*marcas.values())
+    todos_modelos = set().union(*modelos.values())
+    if not todas_marcas and not todos_modelos:
+        return []
+
+    combinaciones = (
+        Vehiculo.objects.filter(disponible=True)
+        .filter(Q(marca__nombre__in=todas_marcas) | Q(modelo__in=todos_modelos))
+        .values('marca__nombre', 'modelo')
+        .annotate(total=Count('id'))
+    )
+    puntajes = defaultdict(float)
+    totales = {}
+    for fila in combinaciones:
+        clave = (fila['marca__nombre'], fila['modelo'])
+        totales[clave] = fila['total']
+        # Cada palabra aporta su mejor coincidencia (con la marca o el modelo)
+        for palabra in palabras:
+            puntajes[clave] += max(
+                marcas[palabra].get(clave[0], 0.0),
+                modelos[palabra].get(clave[1], 0.0),
+            )
+
+    ordenadas = sorted(puntajes, key=lambda clave: (-puntajes[clave], -totales[clave]))
+    return [
+        {'texto': f'{marca} {modelo}', 'marca': marca, 'modelo': modelo, 'total': totales[(marca, modelo)]}
+        for marca, modelo in ordenadas[:limite]
+    ]
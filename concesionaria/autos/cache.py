@@ -0,0 +1,245 @@
+"""
+Caché de resultados del catálogo versionada por inventario.
+
+Todas las claves incluyen un contador global de versión del inventario.
+Cualquier cambio en vehículos (o en marcas, condiciones y atributos) lo
+incrementa al confirmarse la transacción, así invalidar es O(1): las
+claves viejas simplemente dejan de pedirse y expiran solas, sin recorrer
+ni borrar nada. La versión vive en la propia caché, así que debe ser
+compartida por todos los workers (archivos, Redis, Memcached): con
+LocMemCache cada proceso tendría su propio contador y un cambio solo
+invalidaría el worker que lo hizo. Por eso, con una caché por proceso
+(cache_compartida() falsa) los resultados, las páginas y los ETags
+versionados se desactivan y todo se calcula en cada petición.
+
+También guarda el HTML de cada tarjeta de vehículo por separado, así un
+listado solo renderiza las tarjetas que cambiaron, y ofrece
+`obtener_con_revalidacion` para las páginas más pedidas: sirve el valor
+vencido mientras un solo worker lo recalcula y agrupa los fallos
+simultáneos de una misma clave en un único cálculo.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connections
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+CLAVE_VERSION = 'inventario:version'
+CLAVE_MODIFICADO = 'inventario:modificado'
+TIEMPO_CACHE_RESULTADOS = 60 * 60  # segundos; la versión invalida antes
+TIEMPO_BLOQUEO = 30  # segundos que dura como máximo un cálculo en curso
+ESPERA_MAXIMA = 5  # segundos que se espera el cálculo de otro worker
+
+logger = logging.getLogger(__name__)
+
+
+def cache_compartida():
+    """True si la caché la comparten todos los procesos (no es LocMemCache)"""
+    return not isinstance(caches['default'], LocMemCache)
+
+
+def version_inventario():
+    """Versión actual del inventario (la inicializa si no existe)"""
+    version = cache.get(CLAVE_VERSION)
+    if version is None:
+        # Se parte de la hora actual en milisegundos: si la clave se pierde
+        # (reinicio, desalojo) la nueva versión nunca repite una anterior
+        cache.add(CLAVE_VERSION, int(time.time() * 1000), None)
+        version = cache.get(CLAVE_VERSION)
+    return version
+
+
+def incrementar_version_inventario():
+    """Invalida de una vez todos los resultados cacheados del catálogo"""
+    cache.set(CLAVE_MODIFICADO, time.time(), None)
+    try:
+        return cache.incr(CLAVE_VERSION)
+    except ValueError:
+        # La clave no existía: al crearla ya es una versión nueva
+        return version_inventario()
+
+
+def momento_cambio_inventario():
+    """Timestamp del último cambio del inventario (para Last-Modified)"""
+    momento = cache.get(CLAVE_MODIFICADO)
+    if momento is None:
+        # Sin registro no se sabe cuándo cambió: se asume que fue ahora
+        cache.add(CLAVE_MODIFICADO, time.time(), None)
+        momento = cache.get(CLAVE_MODIFICADO)
+    return momento
+
+
+def clave_versionada(prefijo, *partes):
+    """Clave `prefijo:v<versión>:<hash de partes>` para resultados del catálogo"""
+    resumen = hashlib.md5('|'.join(str(parte) for parte in partes).encode('utf-8')).hexdigest()
+    return f'{prefijo}:v{version_inventario()}:{resumen}'
+
+
+def obtener_o_calcular(clave, calcular, timeout=TIEMPO_CACHE_RESULTADOS):
+    """Devuelve el valor cacheado en `clave` o lo calcula y lo guarda"""
+    if not cache_compartida():
+        return calcular()
+    valor = cache.get(clave)
+    if valor is None:
+        valor = calcular()
+        cache.set(clave, valor, timeout)
+    return valor
+
+
+# =====================
+# REVALIDACIÓN EN SEGUNDO PLANO Y CÁLCULO ÚNICO
+# =====================
+# Se guarda (valor, vence_en) con un timeout mayor que la frescura: entre
+# ambos el valor está vencido pero todavía se puede servir. Con `vigente`
+# la clave puede ser fija y el valor llevar su versión: uno que ya no es
+# vigente también se sirve mientras se recalcula. El bloqueo es
+# un cache.add sobre `<clave>:bloqueo` (atómico en Redis y Memcached), así
+# que vale entre procesos. FileBasedCache.add comprueba y escribe en dos
+# pasos: con ese backend el bloqueo es un archivo creado con O_EXCL.
+
+def _archivo_bloqueo(bloqueo):
+    backend = caches['default']
+    if not isinstance(backend, FileBasedCache):
+        return None
+    os.makedirs(backend._dir, exist_ok=True)
+    # Sin la extensión .djcache: cache.clear() y el desalojo no lo tocan
+    return backend._key_to_file(bloqueo) + '.bloqueo'
+
+
+def _tomar_bloqueo(bloqueo):
+    ruta = _archivo_bloqueo(bloqueo)
+    if ruta is None:
+        return cache.add(bloqueo, 1, TIEMPO_BLOQUEO)
+    for _ in range(2):
+        try:
+            os.close(os.open(ruta, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            pass
+        # Un bloqueo de un worker que se cortó vence como el de la caché
+        try:
+            if time.time() - os.path.getmtime(ruta) < TIEMPO_BLOQUEO:
+                return False
+            os.remove(ruta)
+        except FileNotFoundError:
+            pass
+    return False
+
+
+def _soltar_bloqueo(bloqueo):
+    ruta = _archivo_bloqueo(bloqueo)
+    if ruta is None:
+        cache.delete(bloqueo)
+        return
+    try:
+        os.remove(ruta)
+    except FileNotFoundError:
+        pass
+
+
+def _refrescar(clave, calcular, frescura, timeout):
+    """Calcula y guarda el valor; siempre libera el bloqueo"""
+    try:
+        valor = calcular()
+        if valor is not None:
+            cache.set(clave, (valor, time.time() + frescura), timeout)
+        return valor
+    finally:
+        _soltar_bloqueo(f'{clave}:bloqueo')
+
+
+def _refrescar_en_segundo_plano(clave, calcular, frescura, timeout):
+    def tarea():
+        try:
+            _refrescar(clave, calcular, frescura, timeout)
+        except Exception:
+            logger.exception("No se pudo refrescar la clave de caché %s", clave)
+        finally:
+            # El hilo abre sus propias conexiones: se cierran al terminar
+            connections.close_all()
+    threading.Thread(target=tarea, daemon=True).start()
+
+
+def obtener_con_revalidacion(clave, calcular, frescura=TIEMPO_CACHE_RESULTADOS, timeout=None, vigente=None):
+    """
+    Como obtener_o_calcular, pero sin estampidas:
+    - Valor vencido (o para el que `vigente(valor)` es falso): se devuelve
+      igual y un solo worker lo recalcula en un hilo aparte.
+    - Sin valor: calcula solo quien toma el bloqueo; los demás esperan su
+      resultado (hasta ESPERA_MAXIMA segundos, luego calculan ellos).
+    Si `calcular` devuelve None no se guarda nada.
+    """
+    if not cache_compartida():
+        return calcular()
+    timeout = timeout or frescura * 2
+    bloqueo = f'{clave}:bloqueo'
+    guardado = cache.get(clave)
+    if guardado is not None:
+        valor, vence_en = guardado
+        vencido = vence_en < time.time() or (vigente is not None and not vigente(valor))
+        if vencido and _tomar_bloqueo(bloqueo):
+            _refrescar_en_segundo_plano(clave, calcular, frescura, timeout)
+        return valor
+
+    limite = time.monotonic() + ESPERA_MAXIMA
+    while not _tomar_bloqueo(bloqueo):
+        time.sleep(0.05)
+        guardado = cache.get(clave)
+        if guardado is not None:
+            return guardado[0]
+        if time.monotonic() > limite:
+            return calcular()
+    # Otro worker pudo guardar el valor justo antes de soltar el bloqueo
+    guardado = cache.get(clave)
+    if guardado is not None:
+        _soltar_bloqueo(bloqueo)
+        return guardado[0]
+    return _refrescar(clave, calcular, frescura, timeout)
+
+
+# =====================
+# FRAGMENTOS DE TARJETAS
+# =====================
+# Cada tarjeta renderizada se guarda con una clave que incluye un hash de
+# todos los campos de su fila de VehiculoCatalogo: cualquier cambio que
+# llegue a la fila (también el nombre de la marca o las condiciones, que no
+# tocan Vehiculo.fecha_actualizacion) cambia la clave sola.
+
+PLANTILLA_TARJETA = '_tarjeta_vehiculo.html'
+TIEMPO_CACHE_TARJETAS = 60 * 60 * 24  # segundos
+
+
+def clave_tarjeta(vehiculo):
+    valores = [(campo.attname, getattr(vehiculo, campo.attname)) for campo in vehiculo._meta.concrete_fields]
+    resumen = hashlib.md5(json.dumps(valores, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+    return f'tarjeta:{vehiculo.pk}:{resumen}'
+
+
+def renderizar_tarjetas(vehiculos, usar_cache=True):
+    """
+    HTML de la tarjeta de cada vehículo (VehiculoCatalogo), en orden.
+    Las que están en caché salen con un solo get_many; solo se renderizan
+    las faltantes, que se guardan con un set_many.
+    """
+    vehiculos = list(vehiculos)
+    claves = [clave_tarjeta(vehiculo) for vehiculo in vehiculos]
+    guardadas = cache.get_many(claves) if usar_cache else {}
+    plantilla = get_template(PLANTILLA_TARJETA)
+    nuevas = {}
+    tarjetas = []
+    for clave, vehiculo in zip(claves, vehiculos):
+        html = guardadas.get(clave)
+        if html is None:
+            html = nuevas[clave] = plantilla.render({'vehiculo': vehiculo})
+        tarjetas.append(mark_safe(html))
+    if nuevas and usar_cache:
+        cache.set_many(nuevas, TIEMPO_CACHE_TARJETAS)
+    return tarjetas
@@ -0,0 +1,77 @@
+"""
+Mantenimiento del modelo de lectura VehiculoCatalogo.
+
+`sincronizar_vehiculos` deja la fila de cada vehículo indicado igual a su
+estado actual (la crea, la actualiza o la borra si ya no está disponible);
+las señales de autos/signals.py la llaman tras cada cambio.
+`reconstruir_catalogo` regenera la tabla completa por lotes.
+"""
+from django.db import transaction
+
+from .models import Vehiculo, VehiculoCatalogo
+
+CAMPOS_ACTUALIZABLES = [
+    'marca', 'marca_nombre', 'modelo', 'anio', 'precio', 'kilometraje', 'descripcion',
+    'condiciones', 'atributo_ids', 'imagen_url', 'imagen_srcset', 'estado_imagen',
+    'fecha_ingreso', 'fecha_actualizacion',
+]
+
+
+def _vehiculos_con_relaciones():
+    return Vehiculo.objects.select_related('marca').prefetch_related('condicion', 'atributos')
+
+
+def construir_fila(vehiculo):
+    """Fila del catálogo de un vehículo con marca, condición y atributos cargados"""
+    return VehiculoCatalogo(
+        vehiculo_id=vehiculo.pk,
+        marca_id=vehiculo.marca_id,
+        marca_nombre=vehiculo.marca.nombre,
+        modelo=vehiculo.modelo,
+        anio=vehiculo.anio,
+        precio=vehiculo.precio,
+        kilometraje=vehiculo.kilometraje,
+        descripcion=vehiculo.descripcion,
+        condiciones=', '.join(condicion.nombre for condicion in vehiculo.condicion.all()),
+        atributo_ids=sorted(atributo.pk for atributo in vehiculo.atributos.all()),
+        imagen_url=vehiculo.imagen.url if vehiculo.imagen else '',
+        imagen_srcset=vehiculo.imagen_srcset if vehiculo.imagen else {},
+        estado_imagen=vehiculo.estado_imagen,
+        fecha_ingreso=vehiculo.fecha_ingreso,
+        fecha_actualizacion=vehiculo.fecha_actualizacion,
+    )
+
+
+def sincronizar_vehiculos(ids, tamano_lote=500):
+    """Actualiza, crea o elimina las filas del catálogo de los vehículos indicados"""
+    ids = list(ids)
+    for inicio in range(0, len(ids), tamano_lote):
+        lote = ids[inicio:inicio + tamano_lote]
+        filas = [construir_fila(v) for v in _vehiculos_con_relaciones().filter(pk__in=lote, disponible=True)]
+        presentes = {fila.vehiculo_id for fila in filas}
+        with transaction.atomic():
+            VehiculoCatalogo.objects.filter(pk__in=lote).exclude(pk__in=presentes).delete()
+            VehiculoCatalogo.objects.bulk_create(
+                filas,
+                update_conflicts=True,
+                unique_fields=['vehiculo'],
+                update_fields=CAMPOS_ACTUALIZABLES,
+            )
+
+
+def reconstruir_catalogo(tamano_lote=1000):
+    """Regenera todo el catálogo desde Vehiculo; devuelve cuántas filas quedaron"""
+    total = 0
+    with transaction.atomic():
+        VehiculoCatalogo.objects.all().delete()
+        filas = []
+        vehiculos = _vehiculos_con_relaciones().filter(disponible=True)
+        for vehiculo in vehiculos.iterator(chunk_size=tamano_lote):
+            filas.append(construir_fila(vehiculo))
+            if len(filas) >= tamano_lote:
+                VehiculoCatalogo.objects.bulk_create(filas)
+                total += len(filas)
+                filas = []
+        VehiculoCatalogo.objects.bulk_create(filas)
+        total += len(filas)
+    return total
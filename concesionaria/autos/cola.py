@@ -0,0 +1,122 @@
+"""
+Cola de procesamiento de imágenes en la base de datos.
+
+Guardar un vehículo con imagen nueva ya no genera las miniaturas en la
+petición: la señal crea un TrabajoImagen en la misma transacción y deja
+el vehículo con estado_imagen='pendiente' (la tarjeta muestra un aviso
+en lugar de la foto). El comando `procesar_imagenes` toma los trabajos,
+genera las derivadas en un pool de procesos y marca el vehículo 'lista'.
+
+- Tomar trabajos: en PostgreSQL, SELECT ... FOR UPDATE SKIP LOCKED, así
+  varios workers se reparten la cola sin esperarse. En SQLite (sin SKIP
+  LOCKED) cada fila se reclama con un UPDATE condicionado a que siga
+  pendiente: si otro worker la tomó antes, no se actualiza nada.
+- Reintentos: un trabajo que falla vuelve a pendiente con una espera que
+  se duplica en cada intento; después de MAX_INTENTOS queda 'fallido' y
+  el vehículo 'fallida'.
+- Colgados: un trabajo 'procesando' por más de TIEMPO_MAXIMO (el worker
+  murió) vuelve a la cola, o falla si ya agotó los intentos.
+- Las funciones que cambian el vehículo devuelven sus ids: sincronizar
+  catálogo y cachés queda a cargo de quien llama (update() no dispara
+  señales), igual que con registrar_miniaturas.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .miniaturas import registrar_miniaturas
+from .models import TrabajoImagen, Vehiculo
+
+MAX_INTENTOS = getattr(settings, 'COLA_IMAGENES_MAX_INTENTOS', 5)
+ESPERA_REINTENTO = timedelta(seconds=30)  # se duplica en cada intento
+TIEMPO_MAXIMO = timedelta(minutes=10)
+
+
+def encolar_imagen(vehiculo_id, nombre):
+    """
+    Encola la imagen `nombre` del vehículo. Los trabajos pendientes de una
+    imagen anterior se descartan; uno que ya esté en proceso termina, pero
+    registrar_miniaturas no pisa la imagen nueva.
+    """
+    TrabajoImagen.objects.filter(vehiculo_id=vehiculo_id, estado='pendiente').update(estado='descartado')
+    return TrabajoImagen.objects.create(vehiculo_id=vehiculo_id, imagen=nombre, disponible_desde=timezone.now())
+
+
+def descartar_pendientes(vehiculo_id):
+    """Descarta los trabajos pendientes del vehículo (p. ej., si se quitó la imagen)"""
+    TrabajoImagen.objects.filter(vehiculo_id=vehiculo_id, estado='pendiente').update(estado='descartado')
+
+
+def tomar_trabajos(cantidad):
+    """
+    Reclama hasta `cantidad` trabajos disponibles para este worker: quedan
+    'procesando', con un intento más y la hora de inicio. Devuelve la lista.
+    """
+    ahora = timezone.now()
+    disponibles = TrabajoImagen.objects.filter(estado='pendiente', disponible_desde__lte=ahora).order_by(
+        'disponible_desde', 'pk',
+    )
+    reclamar = {'estado': 'procesando', 'intentos': F('intentos') + 1, 'iniciado': ahora}
+    with transaction.atomic():
+        if connection.features.has_select_for_update_skip_locked:
+            # Las filas que otro worker tiene bloqueadas se saltan, no se esperan
+            ids = list(disponibles.select_for_update(skip_locked=True).values_list('pk', flat=True)[:cantidad])
+            TrabajoImagen.objects.filter(pk__in=ids).update(**reclamar)
+        else:
+            ids = [
+                pk for pk in disponibles.values_list('pk', flat=True)[:cantidad]
+                if TrabajoImagen.objects.filter(pk=pk, estado='pendiente').update(**reclamar)
+            ]
+    return list(TrabajoImagen.objects.filter(pk__in=ids).order_by('pk'))
+
+
+def devolver_trabajos(ids):
+    """Devuelve a la cola trabajos tomados y no terminados, sin gastar el intento"""
+    TrabajoImagen.objects.filter(pk__in=ids, estado='procesando').update(
+        estado='pendiente', intentos=F('intentos') - 1, iniciado=None, disponible_desde=timezone.now(),
+    )
+
+
+def completar(trabajo, derivadas):
+    """Registra las derivadas en el vehículo. Devuelve True si el vehículo cambió"""
+    with transaction.atomic():
+        actualizado = registrar_miniaturas(trabajo.vehiculo_id, trabajo.imagen, derivadas)
+        TrabajoImagen.objects.filter(pk=trabajo.pk).update(estado='listo', error='')
+    return actualizado
+
+
+def fallar(trabajo, error):
+    """
+    Anota el error y reprograma el trabajo con espera creciente; sin
+    intentos restantes lo marca fallido junto con la imagen del vehículo.
+    Devuelve True si el vehículo cambió.
+    """
+    with transaction.atomic():
+        if trabajo.intentos < MAX_INTENTOS:
+            espera = ESPERA_REINTENTO * 2 ** (trabajo.intentos - 1)
+            TrabajoImagen.objects.filter(pk=trabajo.pk).update(
+                estado='pendiente', error=str(error), disponible_desde=timezone.now() + espera,
+            )
+            return False
+        TrabajoImagen.objects.filter(pk=trabajo.pk).update(estado='fallido', error=str(error))
+        # Condicionado a la misma imagen, como registrar_miniaturas
+        return bool(Vehiculo.objects.filter(pk=trabajo.vehiculo_id, imagen=trabajo.imagen).update(
+            estado_imagen='fallida', fecha_actualizacion=timezone.now(),
+        ))
+
+
+def recuperar_colgados():
+    """
+    Trabajos 'procesando' desde hace más de TIEMPO_MAXIMO: el worker que los
+    tomó se cortó. Vuelven a la cola o fallan. Devuelve los ids de vehículo
+    que cambiaron.
+    """
+    limite = timezone.now() - TIEMPO_MAXIMO
+    cambiados = []
+    for trabajo in TrabajoImagen.objects.filter(estado='procesando', iniciado__lt=limite):
+        if fallar(trabajo, 'El worker no terminó el trabajo a tiempo'):
+            cambiados.append(trabajo.vehiculo_id)
+    return cambiados
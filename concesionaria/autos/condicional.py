@@ -0,0 +1,78 @@
+"""
+Validadores HTTP (ETag y Last-Modified) para las páginas públicas.
+
+Se usan con el decorador `condition` de Django: si el cliente ya tiene la
+versión vigente recibe un 304 sin renderizar la plantilla y sin ejecutar
+la consulta principal de la vista.
+
+- Catálogo: la ETag combina la versión global del inventario con los
+  filtros y el cursor; Last-Modified es el momento del último cambio del
+  inventario. No se usa el máximo de fecha_actualizacion del conjunto
+  filtrado porque un vehículo borrado o despublicado no lo mueve.
+- Detalle: la ETag combina fecha_actualizacion del vehículo (una consulta
+  por clave primaria) con la versión del inventario, que cubre cambios de
+  nombre en marcas y condiciones.
+
+Las páginas de usuarios autenticados o con mensajes pendientes se
+renderizan siempre: su contenido no depende solo de la URL.
+"""
+import hashlib
+from datetime import datetime, timezone
+
+from django.contrib.messages import get_messages
+
+from .cache import cache_compartida, momento_cambio_inventario, version_inventario
+from .filtros import clave_filtros, normalizar_filtros
+from .models import Vehiculo
+
+
+def _puede_validar(request):
+    # Con una caché por proceso la versión y el momento del último cambio
+    # no son los mismos en todos los workers: no se responde 304
+    return cache_compartida() and not request.user.is_authenticated and not len(get_messages(request))
+
+
+def _etag(*partes):
+    return hashlib.sha1('|'.join(str(parte) for parte in partes).encode('utf-8')).hexdigest()
+
+
+def etag_catalogo(request, *args, **kwargs):
+    if not _puede_validar(request):
+        return None
+    filtros = clave_filtros(normalizar_filtros(request.GET))
+    return _etag('catalogo', version_inventario(), filtros, request.GET.get('cursor', ''))
+
+
+def ultima_modificacion_catalogo(request, *args, **kwargs):
+    if not _puede_validar(request):
+        return None
+    return datetime.fromtimestamp(momento_cambio_inventario(), tz=timezone.utc)
+
+
+def _fecha_vehiculo(request, vehiculo_id):
+    """fecha_actualizacion del vehículo, consultada una sola vez por request"""
+    if not hasattr(request, '_fecha_vehiculo'):
+        request._fecha_vehiculo = (
+            Vehiculo.objects.filter(pk=vehiculo_id)
+            .values_list('fecha_actualizacion', flat=True).first()
+        )
+    return request._fecha_vehiculo
+
+
+def etag_detalle(request, vehiculo_id):
+    if not _puede_validar(request):
+        return None
+    fecha = _fecha_vehiculo(request, vehiculo_id)
+    if fecha is None:
+        return None  # la vista responde 404
+    return _etag('detalle', vehiculo_id, fecha.isoformat(), version_inventario())
+
+
+def ultima_modificacion_detalle(request, vehiculo_id):
+    if not _puede_validar(request):
+        return None
+    fecha = _fecha_vehiculo(request, vehiculo_id)
+    if fecha is None:
+        return None
+    cambio = datetime.fromtimestamp(momento_cambio_inventario(), tz=timezone.utc)
+    return max(fecha, cambio)
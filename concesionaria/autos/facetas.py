@@ -0,0 +1,79 @@
+"""
+Conteos por faceta del catálogo (marca, condición, atributo, año y precio).
+
+Cada faceta cuenta los vehículos disponibles que cumplen todos los filtros
+actuales excepto el de la propia faceta, así el usuario ve cuántos
+resultados obtendría al cambiar esa opción. Son cinco consultas agrupadas
+(una por faceta; año y precio en un solo aggregate cada una) y el resultado
+se cachea por combinación de filtros normalizados y versión del inventario.
+"""
+from django.db.models import Count, Q
+
+from .cache import clave_versionada, obtener_o_calcular
+from .filtros import aplicar_filtros, clave_filtros
+from .models import Atributo, Condicion, Marca, Vehiculo
+
+# (etiqueta, mínimo, máximo) inclusivos; None = sin límite
+RANGOS_ANIO = [
+    ('Antes de 2000', None, 1999),
+    ('2000 - 2009', 2000, 2009),
+    ('2010 - 2014', 2010, 2014),
+    ('2015 - 2019', 2015, 2019),
+    ('2020 o más', 2020, None),
+]
+RANGOS_PRECIO = [
+    ('Hasta $5.000.000', None, 5_000_000),
+    ('$5.000.001 - $10.000.000', 5_000_001, 10_000_000),
+    ('$10.000.001 - $20.000.000', 10_000_001, 20_000_000),
+    ('$20.000.001 - $40.000.000', 20_000_001, 40_000_000),
+    ('Más de $40.000.000', 40_000_001, None),
+]
+
+
+def _sin(filtros, *campos):
+    """Queryset de disponibles con todos los filtros salvo `campos`"""
+    restantes = {campo: valor for campo, valor in filtros.items() if campo not in campos}
+    return aplicar_filtros(Vehiculo.objects.filter(disponible=True), restantes)
+
+
+def _conteo_por(vehiculos, campo):
+    return dict(vehiculos.values_list(campo).annotate(total=Count('pk')).order_by())
+
+
+def _opciones(modelo, conteos):
+    return [
+        {'id': pk, 'nombre': nombre, 'total': conteos.get(pk, 0)}
+        for pk, nombre in modelo.objects.order_by('nombre').values_list('pk', 'nombre')
+    ]
+
+
+def _rangos(vehiculos, campo, rangos):
+    condiciones = {}
+    for i, (_, minimo, maximo) in enumerate(rangos):
+        condicion = Q()
+        if minimo is not None:
+            condicion &= Q(**{f'{campo}__gte': minimo})
+        if maximo is not None:
+            condicion &= Q(**{f'{campo}__lte': maximo})
+        condiciones[f'r{i}'] = Count('pk', filter=condicion)
+    totales = vehiculos.aggregate(**condiciones)
+    return [
+        {'etiqueta': etiqueta, 'min': minimo, 'max': maximo, 'total': totales[f'r{i}']}
+        for i, (etiqueta, minimo, maximo) in enumerate(rangos)
+    ]
+
+
+def calcular_facetas(filtros):
+    return {
+        'marcas': _opciones(Marca, _conteo_por(_sin(filtros, 'marca'), 'marca_id')),
+        'condiciones': _opciones(Condicion, _conteo_por(_sin(filtros, 'condicion'), 'condicion')),
+        'atributos': _opciones(Atributo, _conteo_por(_sin(filtros, 'atributo'), 'atributos')),
+        'anios': _rangos(_sin(filtros, 'anio_min', 'anio_max'), 'anio', RANGOS_ANIO),
+        'precios': _rangos(_sin(filtros, 'precio_min', 'precio_max'), 'precio', RANGOS_PRECIO),
+    }
+
+
+def obtener_facetas(filtros):
+    """Facetas de una combinación de filtros normalizados, desde la caché si existe"""
+    clave = clave_versionada('catalogo:facetas', clave_filtros(filtros))
+    return obtener_o_calcular(clave, lambda: calcular_facetas(filtros))
@@ -0,0 +1,89 @@
+"""Normalización y aplicación de los filtros públicos del catálogo."""
+import hashlib
+from decimal import Decimal, DecimalException
+
+from .busqueda import buscar
+from .models import Vehiculo
+
+# Filtros aceptados por el catálogo y cómo se interpreta cada valor
+FILTROS_ENTEROS = ('marca', 'condicion', 'atributo', 'anio_min', 'anio_max')
+FILTROS_DECIMALES = ('precio_min', 'precio_max')
+FILTROS_TEXTO = ('q',)
+# Fuera de estos rangos ningún vehículo coincide y la base de datos
+# rechazaría el valor: enteros de 32 bits y precios de max_digits=12,
+# decimal_places=2 (menos de 10**10, centavos como mínimo)
+MAXIMO_ENTERO = 2 ** 31 - 1
+MAXIMO_EXPONENTE_PRECIO = 9
+MINIMO_EXPONENTE_PRECIO = -2
+MAXIMO_DIGITOS_PRECIO = 12
+
+
+def normalizar_filtros(params):
+    """
+    Devuelve un dict solo con los filtros conocidos que traen un valor válido.
+    Los valores se guardan como texto canónico ('2020', '15000000') para que
+    dos URLs equivalentes produzcan la misma clave de caché.
+    """
+    filtros = {}
+    for campo in FILTROS_ENTEROS:
+        valor = (params.get(campo) or '').strip()
+        try:
+            numero = int(valor)
+        except ValueError:
+            continue
+        if abs(numero) <= MAXIMO_ENTERO:
+            filtros[campo] = str(numero)
+    for campo in FILTROS_DECIMALES:
+        valor = (params.get(campo) or '').strip()
+        try:
+            numero = Decimal(valor)
+            # El rango se revisa antes de normalizar: '1e999999999' es finito,
+            # pero normalize() desborda, y '1e-999999999' redondearía a cero
+            if not numero.is_finite():
+                continue
+            if numero:
+                significativos = len(''.join(map(str, numero.as_tuple().digits)).strip('0'))
+                if (numero.adjusted() > MAXIMO_EXPONENTE_PRECIO
+                        or numero.adjusted() - significativos + 1 < MINIMO_EXPONENTE_PRECIO
+                        or significativos > MAXIMO_DIGITOS_PRECIO):
+                    continue
+            filtros[campo] = format(numero.normalize(), 'f')
+        except DecimalException:
+            continue
+    for campo in FILTROS_TEXTO:
+        valor = ' '.join((params.get(campo) or '').split())
+        if valor:
+            filtros[campo] = valor
+    return filtros
+
+
+def clave_filtros(filtros):
+    """Clave estable (hash) de una combinación de filtros normalizados"""
+    crudo = '&'.join(f'{campo}={filtros[campo]}' for campo in sorted(filtros))
+    return hashlib.md5(crudo.encode('utf-8')).hexdigest()
+
+
+def aplicar_filtros(vehiculos, filtros):
+    """Aplica los filtros normalizados sobre un queryset de vehículos"""
+    if 'marca' in filtros:
+        vehiculos = vehiculos.filter(marca_id=filtros['marca'])
+    # Las relaciones M2M se filtran con una subconsulta sobre la tabla
+    # intermedia: no duplica filas ni obliga a usar DISTINCT
+    if 'condicion' in filtros:
+        vehiculos = vehiculos.filter(pk__in=Vehiculo.condicion.through.objects.filter(
+            condicion_id=filtros['condicion']).values('vehiculo_id'))
+    if 'atributo' in filtros:
+        vehiculos = vehiculos.filter(pk__in=Vehiculo.atributos.through.objects.filter(
+            atributo_id=filtros['atributo']).values('vehiculo_id'))
+    if 'anio_min' in filtros:
+        vehiculos = vehiculos.filter(anio__gte=filtros['anio_min'])
+    if 'anio_max' in filtros:
+        vehiculos = vehiculos.filter(anio__lte=filtros['anio_max'])
+    if 'precio_min' in filtros:
+        vehiculos = vehiculos.filter(precio__gte=filtros['precio_min'])
+    if 'precio_max' in filtros:
+        vehiculos = vehiculos.filter(precio__lte=filtros['precio_max'])
+    if 'q' in filtros:
+        # Texto completo: filtra y anota `relevancia` para ordenar
+        vehiculos = buscar(vehiculos, filtros['q'])
+    return vehiculos
@@ -0,0 +1,68 @@
+"""
+Conteo de referencias de las imágenes del almacenamiento por contenido.
+
+Un mismo archivo puede ser la imagen de varios vehículos (la misma foto
+subida varias veces). ImagenAlmacenada cuenta cuántos la usan: las
+señales suman al asignar una imagen y restan al cambiarla o borrar el
+vehículo, dentro de la transacción del guardado. Un archivo en cero no se
+borra en el acto (otra subida podría estar reutilizándolo en ese momento);
+queda marcado con `sin_referencias_desde` para la limpieza periódica.
+"""
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .almacenamiento import almacenamiento_imagenes
+from .models import ImagenAlmacenada, Vehiculo
+
+
+def referenciar_imagen(nombre):
+    """Suma una referencia al archivo `nombre` (lo registra si es nuevo)"""
+    if not nombre:
+        return
+    storage = almacenamiento_imagenes()
+    tamano = storage.size(nombre) if storage.exists(nombre) else 0
+    ImagenAlmacenada.objects.bulk_create(
+        [ImagenAlmacenada(nombre=nombre, tamano=tamano)], ignore_conflicts=True,
+    )
+    ImagenAlmacenada.objects.filter(nombre=nombre).update(
+        referencias=F('referencias') + 1, sin_referencias_desde=None,
+    )
+
+
+def liberar_imagen(nombre):
+    """Resta una referencia; al llegar a cero anota desde cuándo"""
+    if not nombre:
+        return
+    ImagenAlmacenada.objects.filter(nombre=nombre, referencias__gt=0).update(referencias=F('referencias') - 1)
+    ImagenAlmacenada.objects.filter(nombre=nombre, referencias=0, sin_referencias_desde__isnull=True).update(
+        sin_referencias_desde=timezone.now(),
+    )
+
+
+def recontar_referencias():
+    """
+    Recalcula todos los conteos desde Vehiculo.imagen (tras una migración o
+    si algo escribió imágenes con update()). Devuelve cuántos archivos hay.
+    """
+    storage = almacenamiento_imagenes()
+    conteos = dict(
+        Vehiculo.objects.exclude(imagen='').exclude(imagen__isnull=True)
+        .values_list('imagen').annotate(total=Count('pk')).order_by()
+    )
+    existentes = set(ImagenAlmacenada.objects.values_list('nombre', flat=True))
+    ImagenAlmacenada.objects.bulk_create(
+        [
+            ImagenAlmacenada(nombre=nombre, tamano=storage.size(nombre) if storage.exists(nombre) else 0)
+            for nombre in conteos.keys() - existentes
+        ],
+        ignore_conflicts=True, batch_size=1000,
+    )
+    ahora = timezone.now()
+    for imagen in ImagenAlmacenada.objects.iterator():
+        referencias = conteos.get(imagen.nombre, 0)
+        if referencias != imagen.referencias or (referencias == 0) == (imagen.sin_referencias_desde is None):
+            ImagenAlmacenada.objects.filter(pk=imagen.pk).update(
+                referencias=referencias,
+                sin_referencias_desde=(imagen.sin_referencias_desde or ahora) if referencias == 0 else None,
+            )
+    return ImagenAlmacenada.objects.count()
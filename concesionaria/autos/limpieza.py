@@ -0,0 +1,174 @@
+"""
+Limpieza periódica de datos y archivos huérfanos.
+
+- DetalleVehiculo sin vehículo: el OneToOne vive en Vehiculo, así que al
+  borrar un vehículo su detalle quedaba suelto (ahora lo borra una señal,
+  pero existen los de antes).
+- Archivos de MEDIA_ROOT que ninguna fila referencia: imágenes
+  reemplazadas y blobs del almacenamiento por contenido que quedaron sin
+  referencias. Las miniaturas también son blobs (`vehiculos/miniaturas/
+  ab/cd/<sha256>.webp`): su nombre no dice de qué imagen salen y varios
+  vehículos pueden compartir el mismo archivo, así que solo cuenta lo que
+  listan los Vehiculo.miniaturas.
+
+Todo avanza por lotes cortos, cada uno en su propia transacción, con una
+pausa entre lotes para no competir con el tráfico. El avance se guarda en
+EstadoLimpieza: si el proceso se corta, la siguiente ejecución sigue desde
+el último lote. Con aplicar=False solo se informa qué se borraría.
+
+Un archivo modificado hace menos de `gracia` nunca se borra: puede ser
+una subida cuya fila todavía no se confirmó, o un blob que otra subida
+acaba de reutilizar (el almacenamiento renueva su fecha al hacerlo).
+"""
+import os
+import time
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db import models, transaction
+from django.utils import timezone
+
+from .almacenamiento import almacenamiento_imagenes
+from .models import DetalleVehiculo, EstadoLimpieza, ImagenAlmacenada, Vehiculo
+
+TAMANO_LOTE = 500
+PAUSA_ENTRE_LOTES = 0.2  # segundos
+GRACIA = timedelta(hours=24)
+TAREA_DETALLES = 'detalles'
+TAREA_MEDIA = 'media'
+
+
+def _cursor(tarea):
+    return EstadoLimpieza.objects.filter(tarea=tarea).values_list('cursor', flat=True).first() or ''
+
+
+def _guardar_cursor(tarea, cursor):
+    EstadoLimpieza.objects.update_or_create(tarea=tarea, defaults={'cursor': cursor})
+
+
+def limpiar_detalles_huerfanos(aplicar=False, tamano_lote=TAMANO_LOTE, pausa=PAUSA_ENTRE_LOTES, reiniciar=False):
+    """
+    Borra (o cuenta, en simulación) los DetalleVehiculo sin vehículo, por
+    lotes de ids crecientes. Devuelve cuántos encontró.
+    """
+    ultimo = 0 if reiniciar or not aplicar else int(_cursor(TAREA_DETALLES) or 0)
+    encontrados = 0
+    while True:
+        ids = list(
+            DetalleVehiculo.objects.filter(pk__gt=ultimo, vehiculo__isnull=True)
+            .order_by('pk').values_list('pk', flat=True)[:tamano_lote]
+        )
+        if not ids:
+            break
+        ultimo = ids[-1]
+        encontrados += len(ids)
+        if aplicar:
+            with transaction.atomic():
+                # Se vuelve a comprobar: alguno pudo asignarse mientras tanto
+                DetalleVehiculo.objects.filter(pk__in=ids, vehiculo__isnull=True).delete()
+                _guardar_cursor(TAREA_DETALLES, str(ultimo))
+            time.sleep(pausa)
+    if aplicar:
+        _guardar_cursor(TAREA_DETALLES, '')
+    return encontrados
+
+
+def nombres_referenciados():
+    """
+    Nombres de archivo que alguna fila usa: campos de archivo de todos los
+    modelos y las derivadas de Vehiculo.miniaturas. Una miniatura se
+    conserva mientras al menos un vehículo la liste, aunque otro que la
+    compartía haya cambiado de imagen.
+    """
+    nombres = set()
+    for modelo in apps.get_models():
+        for campo in modelo._meta.concrete_fields:
+            if isinstance(campo, models.FileField):
+                nombres.update(
+                    modelo._default_manager.exclude(**{campo.name: ''}).exclude(**{f'{campo.name}__isnull': True})
+                    .values_list(campo.name, flat=True).iterator()
+                )
+    # Las derivadas se nombran por contenido: el JSON es la única referencia
+    for miniaturas in Vehiculo.objects.exclude(miniaturas={}).values_list('miniaturas', flat=True).iterator():
+        for por_ancho in miniaturas.values():
+            nombres.update(por_ancho.values())
+    return nombres
+
+
+def _archivos_media(desde, carpeta=None, prefijo=''):
+    """
+    (nombre relativo, ruta) de los archivos de MEDIA_ROOT posteriores a
+    `desde`, en orden alfabético de la ruta completa: así el cursor sirve
+    para retomar. Las carpetas ya recorridas enteras no se vuelven a abrir.
+    """
+    carpeta = carpeta or settings.MEDIA_ROOT
+    try:
+        entradas = list(os.scandir(carpeta))
+    except FileNotFoundError:
+        return
+    # "b.jpg" < "b/..." < "b0": se ordena con "/" al final de las carpetas
+    entradas.sort(key=lambda entrada: entrada.name + ('/' if entrada.is_dir(follow_symlinks=False) else ''))
+    for entrada in entradas:
+        nombre = prefijo + entrada.name
+        if entrada.is_dir(follow_symlinks=False):
+            if desde > nombre + '/' and not desde.startswith(nombre + '/'):
+                continue
+            yield from _archivos_media(desde, entrada.path, nombre + '/')
+        elif nombre > desde:
+            yield nombre, entrada.path
+
+
+def limpiar_media(aplicar=False, tamano_lote=TAMANO_LOTE, pausa=PAUSA_ENTRE_LOTES, gracia=GRACIA, reiniciar=False):
+    """
+    Recorre MEDIA_ROOT en orden y borra (o lista, en simulación) los
+    archivos sin referencias y más viejos que `gracia`. Devuelve
+    (lista de nombres, bytes). Las referencias se leen una vez al empezar;
+    la gracia cubre lo que se suba durante el recorrido.
+    """
+    referenciados = nombres_referenciados()
+    limite = time.time() - gracia.total_seconds()
+    desde = '' if reiniciar or not aplicar else _cursor(TAREA_MEDIA)
+    huerfanos, total_bytes, lote = [], 0, []
+
+    def borrar(lote):
+        for nombre, ruta in lote:
+            try:
+                os.remove(ruta)
+            except FileNotFoundError:
+                pass
+        with transaction.atomic():
+            # Los blobs borrados dejan de existir también como registro
+            ImagenAlmacenada.objects.filter(nombre__in=[nombre for nombre, _ in lote]).delete()
+            _guardar_cursor(TAREA_MEDIA, lote[-1][0])
+        time.sleep(pausa)
+
+    for nombre, ruta in _archivos_media(desde):
+        if nombre in referenciados:
+            continue
+        try:
+            estado = os.stat(ruta)
+        except FileNotFoundError:
+            continue
+        if estado.st_mtime > limite:
+            continue
+        huerfanos.append(nombre)
+        total_bytes += estado.st_size
+        if aplicar:
+            lote.append((nombre, ruta))
+            if len(lote) >= tamano_lote:
+                borrar(lote)
+                lote = []
+    if aplicar:
+        if lote:
+            borrar(lote)
+        # Registros de blobs sin referencias cuyo archivo ya no existe
+        storage = almacenamiento_imagenes()
+        vencidos = ImagenAlmacenada.objects.filter(
+            referencias=0, sin_referencias_desde__lt=timezone.now() - gracia,
+        ).values_list('pk', 'nombre')
+        ImagenAlmacenada.objects.filter(
+            pk__in=[pk for pk, nombre in vencidos.iterator() if not storage.exists(nombre)],
+        ).delete()
+        _guardar_cursor(TAREA_MEDIA, '')
+    return huerfanos, total_bytes
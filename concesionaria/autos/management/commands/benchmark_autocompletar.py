@@ -0,0 +1,52 @@
+import random
+import string
+import time
+
+from django.core.management.base import BaseCommand
+
+from autos.autocompletar import TIPO_MODELO, TriePrefijos
+
+
+class Command(BaseCommand):
+    help = "Mide el tiempo de consulta del trie de autocompletado con términos sintéticos"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--entradas', type=int, default=100_000, help="Términos en el trie")
+        parser.add_argument('--consultas', type=int, default=20_000, help="Prefijos a consultar")
+        parser.add_argument('--semilla', type=int, default=42)
+
+    def handle(self, *args, **options):
+        aleatorio = random.Random(options['semilla'])
+        letras = string.ascii_lowercase + '      áéíóñ0123456789'
+
+        terminos = set()
+        while len(terminos) < options['entradas']:
+            largo = aleatorio.randint(3, 24)
+            terminos.add(''.join(aleatorio.choice(letras) for _ in range(largo)).strip() or 'x')
+        terminos = list(terminos)
+
+        inicio = time.perf_counter()
+        trie = TriePrefijos()
+        trie.cargar((TIPO_MODELO, texto, aleatorio.randint(1, 500)) for texto in terminos)
+        construccion = time.perf_counter() - inicio
+
+        prefijos = [
+            texto[:aleatorio.randint(1, min(6, len(texto)))]
+            for texto in aleatorio.choices(terminos, k=options['consultas'])
+        ]
+        tiempos = []
+        for prefijo in prefijos:
+            inicio = time.perf_counter()
+            trie.buscar(prefijo)
+            tiempos.append(time.perf_counter() - inicio)
+        tiempos.sort()
+
+        def micro(segundos):
+            return f'{segundos * 1_000_000:.1f} µs'
+
+        self.stdout.write(f'Términos: {len(trie)} (construcción {construccion:.2f} s)')
+        self.stdout.write(f'Consultas: {len(tiempos)}')
+        self.stdout.write(f'  media: {micro(sum(tiempos) / len(tiempos))}')
+        self.stdout.write(f'  p50:   {micro(tiempos[len(tiempos) // 2])}')
+        self.stdout.write(f'  p99:   {micro(tiempos[int(len(tiempos) * 0.99)])}')
+        self.stdout.write(f'  máx:   {micro(tiempos[-1])}')
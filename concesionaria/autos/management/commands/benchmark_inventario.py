@@ -0,0 +1,73 @@
+import random
+import time
+import tracemalloc
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client
+from django.urls import reverse
+
+from autos.models import Marca, Vehiculo
+
+
+class Command(BaseCommand):
+    help = ("Mide tiempo hasta el primer byte y memoria máxima del inventario por partes "
+            "con distintos tamaños (los datos sintéticos se revierten al terminar)")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamanos', type=int, nargs='+', default=[1_000, 10_000, 50_000])
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            usuario = get_user_model().objects.create_superuser('benchmark_inventario', password=None)
+            cliente = Client()
+            cliente.force_login(usuario)
+            self.stdout.write(f'{"Vehículos":>10} {"primer byte":>12} {"total":>10} {"memoria máx.":>13}')
+            creados = Vehiculo.objects.count()
+            for tamano in sorted(options['tamanos']):
+                if tamano > creados:
+                    self._sembrar(tamano - creados)
+                    creados = tamano
+                self._medir(cliente, creados)
+            # Los datos sintéticos y el usuario se descartan al salir del bloque
+            transaction.set_rollback(True)
+
+    def _consumir(self, cliente):
+        """Segundos hasta la primera parte y hasta la última"""
+        inicio = time.perf_counter()
+        respuesta = cliente.get(reverse('panel:inventario'))
+        partes = iter(respuesta.streaming_content)
+        next(partes)
+        primer_byte = time.perf_counter() - inicio
+        # Al agotarse, el cliente de pruebas cierra la respuesta sin cerrar
+        # la conexión (que sostiene la transacción con los datos sintéticos)
+        for _ in partes:
+            pass
+        return primer_byte, time.perf_counter() - inicio
+
+    def _medir(self, cliente, cantidad):
+        primer_byte, total = self._consumir(cliente)
+        # La memoria se mide en una segunda pasada: tracemalloc enlentece
+        tracemalloc.start()
+        self._consumir(cliente)
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        self.stdout.write(
+            f'{cantidad:>10} {primer_byte * 1000:>9.1f} ms {total:>8.2f} s {pico / 2 ** 20:>10.1f} MB'
+        )
+
+    def _sembrar(self, cantidad):
+        aleatorio = random.Random(cantidad)
+        marcas = [Marca.objects.get_or_create(nombre=f'Marca benchmark {i}')[0] for i in range(20)]
+        Vehiculo.objects.bulk_create([
+            Vehiculo(
+                marca=aleatorio.choice(marcas),
+                modelo=f'Modelo {aleatorio.randint(1, 500)}',
+                anio=aleatorio.randint(1990, 2025),
+                precio=Decimal(aleatorio.randint(1_000, 80_000)) * 1000,
+                descripcion='Vehículo de prueba para medir el inventario por partes.',
+            )
+            for _ in range(cantidad)
+        ], batch_size=1000)
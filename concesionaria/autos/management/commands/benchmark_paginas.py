@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from autos.models import Vehiculo
+
+
+class Command(BaseCommand):
+    help = "Mide requests por segundo de las páginas públicas con y sin caché de página anónima"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help="Requests por página y modo")
+
+    def handle(self, *args, **options):
+        vehiculo = Vehiculo.objects.filter(disponible=True).first()
+        if vehiculo is None:
+            raise CommandError("No hay vehículos disponibles; cargue datos antes de medir")
+        urls = [
+            reverse('index'),
+            reverse('catalogo'),
+            reverse('catalogo') + f'?marca={vehiculo.marca_id}',
+            reverse('detalle_vehiculo', args=[vehiculo.pk]),
+        ]
+        cliente = Client()
+        total = options['requests']
+
+        def medir(url):
+            cliente.get(url)  # calentar (y llenar la caché si está activa)
+            inicio = time.perf_counter()
+            for _ in range(total):
+                respuesta = cliente.get(url)
+                if respuesta.status_code != 200:
+                    raise CommandError(f"{url} respondió {respuesta.status_code}")
+            return total / (time.perf_counter() - inicio)
+
+        self.stdout.write(f'{"Página":<32} {"sin caché":>12} {"con caché":>12} {"mejora":>8}')
+        for url in urls:
+            with override_settings(CACHE_PAGINAS_ANONIMAS=False):
+                sin_cache = medir(url)
+            con_cache = medir(url)
+            self.stdout.write(
+                f'{url:<32} {sin_cache:>8.0f} r/s {con_cache:>8.0f} r/s {con_cache / sin_cache:>7.1f}x'
+            )
@@ -0,0 +1,51 @@
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.template.loader import get_template
+from django.utils import timezone
+
+from autos.cache import PLANTILLA_TARJETA, clave_tarjeta, renderizar_tarjetas
+from autos.models import VehiculoCatalogo
+
+
+class Command(BaseCommand):
+    help = "Compara el render de tarjetas del catálogo con y sin caché por fragmento"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tarjetas', type=int, default=300, help="Tarjetas por página")
+        parser.add_argument('--repeticiones', type=int, default=20)
+
+    def handle(self, *args, **options):
+        # Vehículos en memoria: se mide solo el render, no la base de datos
+        ahora = timezone.now()
+        vehiculos = [
+            VehiculoCatalogo(
+                vehiculo_id=i, marca_id=1, marca_nombre='Toyota', modelo=f'Corolla {i}',
+                anio=2020, precio=Decimal('15990000.00'), kilometraje=35000,
+                descripcion='Vehículo en excelente estado, mantenciones al día y único dueño. ' * 3,
+                condiciones='Usado', imagen_url=f'/media/vehiculos/auto_{i}.jpg',
+                fecha_ingreso=ahora, fecha_actualizacion=ahora - timedelta(seconds=i),
+            )
+            for i in range(1, options['tarjetas'] + 1)
+        ]
+        plantilla = get_template(PLANTILLA_TARJETA)
+        repeticiones = options['repeticiones']
+
+        def medir(funcion):
+            inicio = time.perf_counter()
+            for _ in range(repeticiones):
+                funcion()
+            return (time.perf_counter() - inicio) / repeticiones * 1000
+
+        sin_cache = medir(lambda: [plantilla.render({'vehiculo': v}) for v in vehiculos])
+        cache.delete_many([clave_tarjeta(v) for v in vehiculos])
+        renderizar_tarjetas(vehiculos)  # llena la caché
+        con_cache = medir(lambda: renderizar_tarjetas(vehiculos))
+
+        self.stdout.write(f'{len(vehiculos)} tarjetas, {repeticiones} repeticiones')
+        self.stdout.write(f'  sin caché: {sin_cache:.2f} ms por página')
+        self.stdout.write(f'  con caché: {con_cache:.2f} ms por página')
+        self.stdout.write(f'  mejora:    {sin_cache / con_cache:.1f}x')
@@ -0,0 +1,74 @@
+from django.core.files import File
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from autos.almacenamiento import almacenamiento_imagenes, es_nombre_por_contenido
+from autos.imagenes import recontar_referencias
+from autos.models import ImagenAlmacenada, Vehiculo
+from autos.signals import sincronizar_al_confirmar
+
+
+class Command(BaseCommand):
+    help = (
+        "Pasa las imágenes de vehículos con nombre de subida (FERRARI_2iZVGxY.jpg) al almacenamiento "
+        "por contenido: las copias idénticas quedan en un solo archivo. Por defecto solo informa; "
+        "--aplicar mueve, actualiza los vehículos y recalcula las referencias."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--aplicar', action='store_true', help='Mueve los archivos y actualiza los vehículos')
+
+    def handle(self, *args, **options):
+        storage = almacenamiento_imagenes()
+        vehiculos = (
+            Vehiculo.objects.exclude(imagen='').exclude(imagen__isnull=True)
+            .order_by('pk').values_list('pk', 'imagen')
+        )
+        # nombre antiguo -> nombre por contenido (cada archivo se lee una vez)
+        renombres = {}
+        pendientes = []
+        for vehiculo_id, nombre in vehiculos:
+            if es_nombre_por_contenido(nombre):
+                continue
+            if nombre not in renombres:
+                if not storage.exists(nombre):
+                    self.stdout.write(self.style.WARNING(f'Falta el archivo de vehículo {vehiculo_id}: {nombre}'))
+                    continue
+                renombres[nombre] = self._nombre_nuevo(storage, nombre, options['aplicar'])
+            pendientes.append((vehiculo_id, nombre))
+
+        antes = sum(storage.size(nombre) for nombre in renombres)
+        despues = sum(storage.size(nombre) for nombre in set(renombres.values())) if options['aplicar'] else None
+        for nombre, nuevo in sorted(renombres.items()):
+            self.stdout.write(f'{nombre} -> {nuevo}')
+
+        if not options['aplicar']:
+            distintos = len(set(renombres.values()))
+            self.stdout.write(self.style.WARNING(
+                f'Simulación: {len(pendientes)} vehículos, {len(renombres)} archivos, {distintos} contenidos '
+                f'distintos ({antes} bytes hoy). Usa --aplicar para mover.'
+            ))
+            return
+
+        with transaction.atomic():
+            ahora = timezone.now()
+            for vehiculo_id, nombre in pendientes:
+                # Mismo contenido: las miniaturas siguen siendo válidas
+                Vehiculo.objects.filter(pk=vehiculo_id, imagen=nombre).update(
+                    imagen=renombres[nombre], fecha_actualizacion=ahora,
+                )
+            recontar_referencias()
+            sincronizar_al_confirmar([vehiculo_id for vehiculo_id, _ in pendientes], resumen=False)
+        for nombre in renombres:
+            storage.delete(nombre)
+        ImagenAlmacenada.objects.filter(nombre__in=renombres).delete()
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(pendientes)} vehículos actualizados; {len(renombres)} archivos quedaron en '
+            f'{len(set(renombres.values()))} ({antes} -> {despues} bytes).'
+        ))
+
+    def _nombre_nuevo(self, storage, nombre, aplicar):
+        with storage.open(nombre, 'rb') as archivo:
+            # En simulación solo se calcula el hash, sin escribir
+            return storage.save(nombre, File(archivo)) if aplicar else storage.nombre_para(nombre, File(archivo))
@@ -0,0 +1,65 @@
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+
+from autos.miniaturas import generar_derivadas, registrar_miniaturas
+from autos.models import Vehiculo
+from autos.signals import sincronizar_al_confirmar
+
+logger = logging.getLogger(__name__)
+
+
+def _generar(vehiculo_id, nombre):
+    # Corre en otro proceso: solo lee y escribe archivos, no usa la base de datos.
+    # Cualquier error con una imagen (bomba de descompresión, disco lleno...)
+    # se registra y la cuenta como fallida: una excepción en procesos.map
+    # cortaría el resto del backfill
+    try:
+        return vehiculo_id, nombre, generar_derivadas(nombre)
+    except Exception:
+        logger.exception('No se pudieron generar miniaturas de %s', nombre)
+        return vehiculo_id, nombre, {}
+
+
+class Command(BaseCommand):
+    help = "Genera las miniaturas WebP/JPEG de las imágenes de vehículos que aún no las tienen"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--todas', action='store_true', help='Regenera también las que ya tienen miniaturas')
+        parser.add_argument('--procesos', type=int, default=os.cpu_count() or 1, help='Procesos en paralelo')
+        parser.add_argument('--lote', type=int, default=200, help='Vehículos registrados por transacción')
+
+    def handle(self, *args, **options):
+        vehiculos = Vehiculo.objects.exclude(imagen='').exclude(imagen__isnull=True)
+        if not options['todas']:
+            vehiculos = vehiculos.filter(miniaturas={})
+        pendientes = list(vehiculos.order_by('pk').values_list('pk', 'imagen'))
+        self.stdout.write(f'{len(pendientes)} imágenes pendientes, {options["procesos"]} procesos.')
+        # Conexiones cerradas antes de crear los procesos: ninguno comparte un socket
+        connections.close_all()
+
+        listos, fallidos = [], 0
+        with ProcessPoolExecutor(max_workers=options['procesos']) as procesos:
+            resultados = procesos.map(_generar, *zip(*pendientes), chunksize=8) if pendientes else []
+            for vehiculo_id, nombre, derivadas in resultados:
+                if not derivadas:
+                    fallidos += 1
+                    continue
+                listos.append((vehiculo_id, nombre, derivadas))
+                if len(listos) >= options['lote']:
+                    self._registrar(listos)
+                    listos = []
+        self._registrar(listos)
+        self.stdout.write(self.style.SUCCESS(
+            f'Miniaturas generadas: {len(pendientes) - fallidos}; imágenes con error: {fallidos}.'
+        ))
+
+    def _registrar(self, listos):
+        # update() no dispara señales: catálogo, tarjetas y cachés se sincronizan al confirmar
+        with transaction.atomic():
+            ids = [vehiculo_id for vehiculo_id, nombre, derivadas in listos
+                   if registrar_miniaturas(vehiculo_id, nombre, derivadas)]
+            sincronizar_al_confirmar(ids, resumen=False)
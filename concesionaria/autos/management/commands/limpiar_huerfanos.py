@@ -0,0 +1,47 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from autos.limpieza import (
+    GRACIA, PAUSA_ENTRE_LOTES, TAMANO_LOTE, limpiar_detalles_huerfanos, limpiar_media,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Borra los DetalleVehiculo sin vehículo y los archivos de MEDIA_ROOT que ninguna fila referencia. "
+        "Por defecto solo informa; --aplicar borra por lotes y retoma desde donde quedó si se interrumpe."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--aplicar', action='store_true', help='Borra en vez de solo informar')
+        parser.add_argument('--solo', choices=['detalles', 'media'], help='Ejecuta solo una de las dos tareas')
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE, help='Filas o archivos por lote')
+        parser.add_argument('--pausa', type=float, default=PAUSA_ENTRE_LOTES, help='Segundos de espera entre lotes')
+        parser.add_argument('--gracia', type=float, default=GRACIA.total_seconds() / 3600,
+                            help='Horas: los archivos más recientes nunca se borran')
+        parser.add_argument('--reiniciar', action='store_true', help='Ignora el avance guardado y empieza de cero')
+        parser.add_argument('--mostrar', type=int, default=50, help='Máximo de archivos a listar')
+
+    def handle(self, *args, **options):
+        aplicar = options['aplicar']
+        lotes = {'aplicar': aplicar, 'tamano_lote': options['lote'], 'pausa': options['pausa'],
+                 'reiniciar': options['reiniciar']}
+        accion = 'borrados' if aplicar else 'a borrar'
+
+        if options['solo'] in (None, 'detalles'):
+            detalles = limpiar_detalles_huerfanos(**lotes)
+            self.stdout.write(f'DetalleVehiculo sin vehículo {accion}: {detalles}')
+
+        if options['solo'] in (None, 'media'):
+            archivos, total_bytes = limpiar_media(gracia=timedelta(hours=options['gracia']), **lotes)
+            for nombre in archivos[:options['mostrar']]:
+                self.stdout.write(f'  {nombre}')
+            if len(archivos) > options['mostrar']:
+                self.stdout.write(f"  ... y {len(archivos) - options['mostrar']} más")
+            self.stdout.write(f'Archivos sin referencias {accion}: {len(archivos)} ({total_bytes} bytes)')
+
+        if aplicar:
+            self.stdout.write(self.style.SUCCESS('Limpieza terminada.'))
+        else:
+            self.stdout.write(self.style.WARNING('Simulación: no se borró nada. Usa --aplicar para borrar.'))
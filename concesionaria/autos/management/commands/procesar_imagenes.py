@@ -0,0 +1,91 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+
+from autos.cola import completar, devolver_trabajos, fallar, recuperar_colgados, tomar_trabajos
+from autos.miniaturas import derivadas_existentes, generar_derivadas
+from autos.signals import sincronizar_al_confirmar
+
+
+def _generar(nombre):
+    # Corre en otro proceso: solo lee y escribe archivos, no usa la base de datos
+    derivadas = generar_derivadas(nombre)
+    if not derivadas:
+        raise ValueError(f'No se pudo leer la imagen {nombre}')
+    return derivadas
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker de la cola de imágenes: toma los trabajos pendientes (autos/cola.py) y genera las "
+        "miniaturas en un pool de procesos. Corre hasta interrumpirlo; --una-vez vacía la cola y termina."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--procesos', type=int, default=os.cpu_count() or 1, help='Procesos en paralelo')
+        parser.add_argument('--lote', type=int, help='Trabajos tomados por vuelta (por defecto, 2 por proceso)')
+        parser.add_argument('--intervalo', type=float, default=2.0, help='Segundos de espera con la cola vacía')
+        parser.add_argument('--una-vez', action='store_true', help='Termina cuando no quedan trabajos disponibles')
+
+    def handle(self, *args, **options):
+        lote = options['lote'] or 2 * options['procesos']
+        listos = fallidos = 0
+        # Conexiones cerradas antes de crear los procesos: ninguno comparte un
+        # socket. La primera tarea arranca todo el pool antes de la siguiente consulta
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=options['procesos']) as procesos:
+            procesos.submit(os.getpid).result()
+            self.stdout.write(f'Procesando la cola de imágenes con {options["procesos"]} procesos.')
+            while True:
+                self._sincronizar(recuperar_colgados())
+                trabajos = tomar_trabajos(lote)
+                if not trabajos:
+                    if options['una_vez']:
+                        break
+                    time.sleep(options['intervalo'])
+                    continue
+                try:
+                    ok, error = self._procesar(procesos, trabajos)
+                except KeyboardInterrupt:
+                    # Lo que no terminó vuelve a la cola para el próximo worker
+                    devolver_trabajos([trabajo.pk for trabajo in trabajos])
+                    raise
+                listos += ok
+                fallidos += error
+                self.stdout.write(f'{ok} listas, {error} con error ({listos} y {fallidos} en total).')
+        self.stdout.write(self.style.SUCCESS(f'Cola vacía: {listos} imágenes listas, {fallidos} con error.'))
+
+    def _procesar(self, procesos, trabajos):
+        cambiados, ok, error = [], 0, 0
+        futuros = {}
+        for trabajo in trabajos:
+            # El mismo archivo ya procesado para otro vehículo se reutiliza
+            existentes = derivadas_existentes(trabajo.imagen, excluir=trabajo.vehiculo_id)
+            if existentes:
+                ok += 1
+                if completar(trabajo, existentes):
+                    cambiados.append(trabajo.vehiculo_id)
+            else:
+                futuros[procesos.submit(_generar, trabajo.imagen)] = trabajo
+        for futuro in as_completed(futuros):
+            trabajo = futuros[futuro]
+            try:
+                derivadas = futuro.result()
+            except Exception as excepcion:
+                error += 1
+                vehiculo_cambiado = fallar(trabajo, excepcion)
+            else:
+                ok += 1
+                vehiculo_cambiado = completar(trabajo, derivadas)
+            if vehiculo_cambiado:
+                cambiados.append(trabajo.vehiculo_id)
+        self._sincronizar(cambiados)
+        return ok, error
+
+    def _sincronizar(self, ids):
+        # update() no dispara señales: catálogo, tarjetas y cachés se sincronizan al confirmar
+        with transaction.atomic():
+            sincronizar_al_confirmar(ids, resumen=False)
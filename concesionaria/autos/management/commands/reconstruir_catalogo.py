@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from autos.catalogo import reconstruir_catalogo
+
+
+class Command(BaseCommand):
+    help = "Regenera completa la tabla de lectura del catálogo (VehiculoCatalogo)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=1000, help="Filas por inserción masiva")
+
+    def handle(self, *args, **options):
+        total = reconstruir_catalogo(options['lote'])
+        self.stdout.write(self.style.SUCCESS(f'Catálogo reconstruido: {total} vehículos disponibles.'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from autos.resumen import reconstruir_resumen
+
+
+class Command(BaseCommand):
+    help = "Regenera completo el resumen de inventario del panel (ResumenInventario)"
+
+    def handle(self, *args, **options):
+        total = reconstruir_resumen()
+        self.stdout.write(self.style.SUCCESS(f'Resumen reconstruido: {total} filas.'))
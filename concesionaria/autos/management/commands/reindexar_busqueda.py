@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from autos.busqueda import reindexar_todo
+
+
+class Command(BaseCommand):
+    help = "Regenera los documentos de búsqueda de texto completo de todos los vehículos"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=500, help="Vehículos por lote")
+
+    def handle(self, *args, **options):
+        total = reindexar_todo(options['lote'])
+        self.stdout.write(self.style.SUCCESS(f'{total} vehículos reindexados.'))
@@ -0,0 +1,59 @@
+import json
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+from autos.models import Vehiculo
+from autos.reprecio import TAMANO_LOTE, aplicar_reglas
+
+
+class Command(BaseCommand):
+    help = (
+        "Reprecia el inventario con reglas declarativas (JSON, ver autos/reprecio.py). "
+        "Por defecto solo simula y muestra las diferencias; --aplicar escribe los precios."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('reglas', help='Archivo JSON con la lista de reglas, en orden de prioridad')
+        parser.add_argument('--aplicar', action='store_true', help='Escribe los precios nuevos y el historial')
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE, help='Vehículos por transacción')
+        parser.add_argument('--incluir-no-disponibles', action='store_true',
+                            help='Reprecia también los vehículos vendidos')
+        parser.add_argument('--mostrar', type=int, default=50, help='Máximo de diferencias a listar')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['reglas'], encoding='utf-8') as archivo:
+                reglas = json.load(archivo)
+        except (OSError, ValueError) as error:
+            raise CommandError(f'No se pudieron leer las reglas: {error}')
+        if not isinstance(reglas, list):
+            raise CommandError('El archivo debe contener una lista de reglas')
+
+        vehiculos = Vehiculo.objects.all() if options['incluir_no_disponibles'] else None
+        try:
+            cambios = aplicar_reglas(reglas, vehiculos, aplicar=options['aplicar'], tamano_lote=options['lote'])
+        except ValueError as error:
+            raise CommandError(str(error))
+
+        for cambio in cambios[:options['mostrar']]:
+            self.stdout.write(
+                f"{cambio['id']:>7}  {cambio['vehiculo'][:40]:<40} "
+                f"{cambio['precio_anterior']:>14} -> {cambio['precio_nuevo']:>14}  [{cambio['regla']}]"
+            )
+        if len(cambios) > options['mostrar']:
+            self.stdout.write(f"... y {len(cambios) - options['mostrar']} más")
+
+        por_regla = defaultdict(lambda: [0, 0])
+        for cambio in cambios:
+            por_regla[cambio['regla']][0] += 1
+            por_regla[cambio['regla']][1] += cambio['precio_nuevo'] - cambio['precio_anterior']
+        for regla, (cantidad, diferencia) in por_regla.items():
+            self.stdout.write(f'{regla}: {cantidad} vehículos, diferencia total {diferencia:+}')
+
+        if options['aplicar']:
+            self.stdout.write(self.style.SUCCESS(f'Precios actualizados: {len(cambios)} vehículos.'))
+        else:
+            self.stdout.write(self.style.WARNING(
+                f'Simulación: {len(cambios)} vehículos cambiarían. Usa --aplicar para escribir.'
+            ))
@@ -0,0 +1,160 @@
+"""
+Entrega de archivos de MEDIA_ROOT (imágenes de vehículos y miniaturas).
+
+Reemplaza a django.conf.urls.static.static(), que solo funciona con DEBUG
+y lee los archivos desde Python. Esta vista:
+
+- responde a peticiones condicionales (ETag / Last-Modified -> 304) y a
+  rangos de bytes (Range / If-Range -> 206, 416 si no se puede cumplir);
+- con settings.MEDIA_SENDFILE = 'x-accel-redirect' (nginx) o 'x-sendfile'
+  (Apache/lighttpd) solo valida y delega el envío al servidor web, que
+  también resuelve los rangos. Para nginx, MEDIA_ACCEL_PREFIX debe ser una
+  location `internal` con `alias` a MEDIA_ROOT;
+- si no, devuelve un FileResponse: con el archivo completo el servidor
+  WSGI lo envía con wsgi.file_wrapper (os.sendfile en gunicorn, sin copiar
+  a Python). Los rangos se leen acotados desde Python;
+- marca como inmutables (un año) los archivos del almacenamiento por
+  contenido: su nombre es el hash, así que nunca cambian.
+"""
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from django.views.decorators.http import require_safe
+
+from .almacenamiento import CARPETA_TEMPORAL, es_nombre_por_contenido
+
+CACHE_INMUTABLE = 'public, max-age=31536000, immutable'
+CACHE_MEDIA = 'public, max-age=3600'
+TAMANO_BLOQUE = 64 * 1024
+RANGO = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class _ArchivoAcotado:
+    """Lee a lo sumo `restantes` bytes de `archivo` (la respuesta de un rango)"""
+
+    def __init__(self, archivo, restantes):
+        self.archivo = archivo
+        self.restantes = restantes
+
+    def read(self, tamano=-1):
+        if self.restantes <= 0:
+            return b''
+        tamano = self.restantes if tamano is None or tamano < 0 else min(tamano, self.restantes)
+        datos = self.archivo.read(tamano)
+        self.restantes -= len(datos)
+        return datos
+
+    def close(self):
+        self.archivo.close()
+
+
+def _rango(cabecera, tamano):
+    """
+    (inicio, fin) inclusivo del Range pedido; None si no hay rango que
+    aplicar (ausente, con varios rangos o mal formado: se envía completo)
+    y False si no se puede cumplir.
+    """
+    coincidencia = RANGO.match(cabecera.replace(' ', '')) if cabecera else None
+    if not coincidencia or coincidencia.groups() == ('', ''):
+        return None
+    inicio, fin = coincidencia.groups()
+    if inicio == '':
+        # bytes=-N: los últimos N bytes
+        largo = int(fin)
+        if largo == 0:
+            return False
+        return max(0, tamano - largo), tamano - 1
+    inicio = int(inicio)
+    fin = min(int(fin), tamano - 1) if fin else tamano - 1
+    if inicio >= tamano or fin < inicio:
+        return False
+    return inicio, fin
+
+
+def _if_range_coincide(request, etag, ultima_modificacion):
+    valor = request.headers.get('If-Range')
+    if not valor:
+        return True
+    if valor.startswith(('"', 'W/')):
+        return valor == etag
+    fecha = parse_http_date_safe(valor)
+    return fecha is not None and fecha >= ultima_modificacion
+
+
+def _cabeceras(respuesta, nombre, etag, ultima_modificacion):
+    respuesta.headers['ETag'] = etag
+    respuesta.headers['Last-Modified'] = http_date(ultima_modificacion)
+    respuesta.headers['Cache-Control'] = CACHE_INMUTABLE if es_nombre_por_contenido(nombre) else CACHE_MEDIA
+    respuesta.headers['Accept-Ranges'] = 'bytes'
+    return respuesta
+
+
+@require_safe
+def servir_media(request, ruta):
+    """Entrega un archivo de MEDIA_ROOT con soporte de caché, rangos y sendfile"""
+    if ruta.startswith(f'{CARPETA_TEMPORAL}/') or any(parte.startswith('.') for parte in ruta.split('/')):
+        raise Http404
+    try:
+        archivo = safe_join(settings.MEDIA_ROOT, ruta)
+        estado = os.stat(archivo)
+    except (SuspiciousFileOperation, OSError):
+        raise Http404
+    if not os.path.isfile(archivo):
+        raise Http404
+
+    ultima_modificacion = int(estado.st_mtime)
+    if es_nombre_por_contenido(ruta):
+        etag = quote_etag(os.path.splitext(os.path.basename(ruta))[0])
+    else:
+        etag = quote_etag(f'{estado.st_mtime_ns:x}-{estado.st_size:x}')
+    condicional = get_conditional_response(request, etag=etag, last_modified=ultima_modificacion)
+    if condicional is not None:
+        return _cabeceras(condicional, ruta, etag, ultima_modificacion)
+
+    tipo, codificacion = mimetypes.guess_type(archivo)
+    # Un .gz se entrega tal cual (no como Content-Encoding)
+    tipo = tipo if tipo and not codificacion else 'application/octet-stream'
+
+    modo = getattr(settings, 'MEDIA_SENDFILE', None)
+    if modo:
+        # El servidor web envía el archivo (y resuelve Range); Django solo valida
+        respuesta = HttpResponse(content_type=tipo)
+        if modo == 'x-accel-redirect':
+            respuesta.headers['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX.rstrip('/') + '/' + ruta
+        else:
+            respuesta.headers['X-Sendfile'] = archivo
+        return _cabeceras(respuesta, ruta, etag, ultima_modificacion)
+
+    tamano = estado.st_size
+    rango = _rango(request.headers.get('Range'), tamano) if _if_range_coincide(request, etag, ultima_modificacion) else None
+    if rango is False:
+        respuesta = HttpResponse(status=416)
+        respuesta.headers['Content-Range'] = f'bytes */{tamano}'
+        return _cabeceras(respuesta, ruta, etag, ultima_modificacion)
+
+    if request.method == 'HEAD':
+        respuesta = HttpResponse(content_type=tipo)
+        largo = tamano if rango is None else rango[1] - rango[0] + 1
+    elif rango is None:
+        # Archivo completo: el servidor WSGI puede usar os.sendfile
+        respuesta = FileResponse(open(archivo, 'rb'), content_type=tipo)
+        largo = tamano
+    else:
+        inicio, fin = rango
+        largo = fin - inicio + 1
+        abierto = open(archivo, 'rb')
+        abierto.seek(inicio)
+        respuesta = FileResponse(_ArchivoAcotado(abierto, largo), content_type=tipo)
+        respuesta.block_size = TAMANO_BLOQUE
+    if rango is not None:
+        respuesta.status_code = 206
+        respuesta.headers['Content-Range'] = f'bytes {rango[0]}-{rango[1]}/{tamano}'
+    respuesta.headers['Content-Length'] = str(largo)
+    return _cabeceras(respuesta, ruta, etag, ultima_modificacion)
@@ -0,0 +1,103 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+SQL_POSTGRESQL = """
+CREATE EXTENSION IF NOT EXISTS unaccent;
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'es_unaccent') THEN
+        CREATE TEXT SEARCH CONFIGURATION es_unaccent (COPY = spanish);
+        ALTER TEXT SEARCH CONFIGURATION es_unaccent
+            ALTER MAPPING FOR hword, hword_part, word WITH unaccent, spanish_stem;
+    END IF;
+END
+$$;
+ALTER TABLE autos_busquedavehiculo ADD COLUMN vector tsvector GENERATED ALWAYS AS (
+    setweight(to_tsvector('es_unaccent'::regconfig, titulo), 'A') ||
+    setweight(to_tsvector('es_unaccent'::regconfig, documento), 'D')
+) STORED;
+CREATE INDEX autos_busquedavehiculo_vector_gin ON autos_busquedavehiculo USING gin (vector);
+"""
+
+SQL_SQLITE = [
+    "CREATE VIRTUAL TABLE autos_busquedavehiculo_fts USING fts5("
+    "titulo, documento, tokenize = 'unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER autos_busquedavehiculo_ai AFTER INSERT ON autos_busquedavehiculo BEGIN "
+    "INSERT INTO autos_busquedavehiculo_fts (rowid, titulo, documento) "
+    "VALUES (new.vehiculo_id, new.titulo, new.documento); END",
+    "CREATE TRIGGER autos_busquedavehiculo_ad AFTER DELETE ON autos_busquedavehiculo BEGIN "
+    "DELETE FROM autos_busquedavehiculo_fts WHERE rowid = old.vehiculo_id; END",
+    "CREATE TRIGGER autos_busquedavehiculo_au AFTER UPDATE ON autos_busquedavehiculo BEGIN "
+    "DELETE FROM autos_busquedavehiculo_fts WHERE rowid = old.vehiculo_id; "
+    "INSERT INTO autos_busquedavehiculo_fts (rowid, titulo, documento) "
+    "VALUES (new.vehiculo_id, new.titulo, new.documento); END",
+]
+
+
+def crear_indice(apps, schema_editor):
+    """Crea el índice de texto completo según el motor de base de datos"""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(SQL_POSTGRESQL)
+    elif vendor == 'sqlite':
+        for sentencia in SQL_SQLITE:
+            schema_editor.execute(sentencia)
+
+
+def eliminar_indice(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute("ALTER TABLE autos_busquedavehiculo DROP COLUMN IF EXISTS vector")
+    elif vendor == 'sqlite':
+        for trigger in ('ai', 'ad', 'au'):
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS autos_busquedavehiculo_{trigger}")
+        schema_editor.execute("DROP TABLE IF EXISTS autos_busquedavehiculo_fts")
+
+
+def poblar_documentos(apps, schema_editor):
+    """Genera el documento de búsqueda de los vehículos existentes"""
+    Vehiculo = apps.get_model('autos', 'Vehiculo')
+    BusquedaVehiculo = apps.get_model('autos', 'BusquedaVehiculo')
+    vehiculos = (
+        Vehiculo.objects.select_related('marca', 'categoria')
+        .prefetch_related('condicion', 'atributos')
+    )
+    documentos = []
+    for vehiculo in vehiculos.iterator(chunk_size=500):
+        partes = [vehiculo.descripcion, vehiculo.color]
+        if vehiculo.categoria:
+            partes.append(vehiculo.categoria.nombre)
+        partes.extend(c.nombre for c in vehiculo.condicion.all())
+        partes.extend(a.nombre for a in vehiculo.atributos.all())
+        documentos.append(BusquedaVehiculo(
+            vehiculo_id=vehiculo.pk,
+            titulo=f'{vehiculo.marca.nombre} {vehiculo.modelo} {vehiculo.anio}',
+            documento=' '.join(p for p in partes if p),
+        ))
+    BusquedaVehiculo.objects.bulk_create(documentos, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('autos', '0005_rename_etiqueta_atributo_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BusquedaVehiculo',
+            fields=[
+                ('vehiculo', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='busqueda', serialize=False, to='autos.vehiculo')),
+                ('titulo', models.CharField(blank=True, help_text='Marca, modelo y año (mayor peso)', max_length=220)),
+                ('documento', models.TextField(blank=True, help_text='Descripción, color, condición y atributos')),
+            ],
+            options={
+                'verbose_name': 'Documento de búsqueda',
+                'verbose_name_plural': 'Documentos de búsqueda',
+            },
+        ),
+        migrations.RunPython(crear_indice, eliminar_indice),
+        migrations.RunPython(poblar_documentos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+from django.db import migrations
+
+SQL_POSTGRESQL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS autos_marca_nombre_trgm ON autos_marca USING gin (nombre gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS autos_vehiculo_modelo_trgm ON autos_vehiculo USING gin (modelo gin_trgm_ops)",
+]
+
+
+def crear_indices(apps, schema_editor):
+    """Índices trigram para las sugerencias por similitud (solo PostgreSQL)"""
+    if schema_editor.connection.vendor == 'postgresql':
+        for sentencia in SQL_POSTGRESQL:
+            schema_editor.execute(sentencia)
+
+
+def eliminar_indices(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS autos_marca_nombre_trgm")
+        schema_editor.execute("DROP INDEX IF EXISTS autos_vehiculo_modelo_trgm")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('autos', '0006_busquedavehiculo'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indices, eliminar_indices),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('autos', '0007_indices_trigramas'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='vehiculo',
+            index=models.Index(condition=models.Q(('disponible', True)), fields=['-fecha_ingreso', '-id'], name='vehiculo_disp_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehiculo',
+            index=models.Index(condition=models.Q(('disponible', True)), fields=['marca', '-fecha_ingreso', '-id'], name='vehiculo_disp_marca_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehiculo',
+            index=models.Index(condition=models.Q(('disponible', True)), fields=['anio'], name='vehiculo_disp_anio_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehiculo',
+            index=models.Index(condition=models.Q(('disponible', True)), fields=['precio'], name='vehiculo_disp_precio_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehiculo',
+            index=models.Index(fields=['disponible', '-fecha_ingreso'], name='vehiculo_disponible_fecha_idx'),
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def poblar_catalogo(apps, schema_editor):
+    """Genera las filas del catálogo de los vehículos disponibles existentes"""
+    Vehiculo = apps.get_model('autos', 'Vehiculo')
+    VehiculoCatalogo = apps.get_model('autos', 'VehiculoCatalogo')
+    vehiculos = (
+        Vehiculo.objects.filter(disponible=True)
+        .select_related('marca')
+        .prefetch_related('condicion', 'atributos')
+    )
+    filas = []
+    for vehiculo in vehiculos.iterator(chunk_size=500):
+        filas.append(VehiculoCatalogo(
+            vehiculo_id=vehiculo.pk,
+            marca_id=vehiculo.marca_id,
+            marca_nombre=vehiculo.marca.nombre,
+            modelo=vehiculo.modelo,
+            anio=vehiculo.anio,
+            precio=vehiculo.precio,
+            kilometraje=vehiculo.kilometraje,
+            descripcion=vehiculo.descripcion,
+            condiciones=', '.join(c.nombre for c in vehiculo.condicion.all()),
+            atributo_ids=sorted(a.pk for a in vehiculo.atributos.all()),
+            imagen_url=vehiculo.imagen.url if vehiculo.imagen else '',
+            fecha_ingreso=vehiculo.fecha_ingreso,
+            fecha_actualizacion=vehiculo.fecha_actualizacion,
+        ))
+    VehiculoCatalogo.objects.bulk_create(filas, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('autos', '0008_indices_vehiculo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VehiculoCatalogo',
+            fields=[
+                ('vehiculo', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='fila_catalogo', serialize=False, to='autos.vehiculo')),
+                ('marca_nombre', models.CharField(max_length=100)),
+                ('modelo', models.CharField(max_length=100)),
+                ('anio', models.IntegerField()),
+                ('precio', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('kilometraje', models.IntegerField(blank=True, null=True)),
+                ('descripcion', models.TextField(blank=True)),
+                ('condiciones', models.CharField(blank=True, help_text='Nombres separados por coma', max_length=255)),
+                ('atributo_ids', models.JSONField(blank=True, default=list)),
+                ('imagen_url', models.CharField(blank=True, max_length=500)),
+                ('fecha_ingreso', models.DateTimeField()),
+                ('fecha_actualizacion', models.DateTimeField()),
+                ('marca', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='autos.marca')),
+            ],
+            options={
+                'verbose_name': 'Vehículo del catálogo',
+                'verbose_name_plural': 'Vehículos del catálogo',
+                'ordering': ['-fecha_ingreso'],
+                'indexes': [models.Index(fields=['-fecha_ingreso', '-vehiculo'], name='catalogo_fecha_idx'), models.Index(fields=['marca', '-fecha_ingreso', '-vehiculo'], name='catalogo_marca_fecha_idx'), models.Index(fields=['anio'], name='catalogo_anio_idx'), models.Index(fields=['precio'], name='catalogo_precio_idx')],
+            },
+        ),
+        migrations.RunPython(poblar_catalogo, migrations.RunPython.noop),
+    ]
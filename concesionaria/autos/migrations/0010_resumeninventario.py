@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, Q, Sum
+
+
+def poblar_resumen(apps, schema_editor):
+    """Calcula el resumen de todas las marcas con el inventario existente"""
+    Vehiculo = apps.get_model('autos', 'Vehiculo')
+    ResumenInventario = apps.get_model('autos', 'ResumenInventario')
+
+    def agregados(prefijo=''):
+        vehiculo = f'{prefijo}id' if prefijo else 'pk'
+        precio = f'{prefijo}precio'
+        return {
+            'total': Count(vehiculo),
+            'disponibles': Count(vehiculo, filter=Q(**{f'{prefijo}disponible': True})),
+            'suma_precios': Sum(precio),
+            'precio_min': Min(precio),
+            'precio_max': Max(precio),
+        }
+
+    por_marca = Vehiculo.objects.values('marca_id').annotate(**agregados()).order_by()
+    por_condicion = (
+        Vehiculo.condicion.through.objects
+        .values('vehiculo__marca_id', 'condicion_id').annotate(**agregados('vehiculo__')).order_by()
+    )
+    filas = [ResumenInventario(marca_id=g.pop('marca_id'), **g) for g in por_marca]
+    filas += [ResumenInventario(marca_id=g.pop('vehiculo__marca_id'), **g) for g in por_condicion]
+    ResumenInventario.objects.bulk_create(filas, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('autos', '0009_vehiculocatalogo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenInventario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('disponibles', models.PositiveIntegerField(default=0)),
+                ('suma_precios', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('precio_min', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('precio_max', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('condicion', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='autos.condicion')),
+                ('marca', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='autos.marca')),
+            ],
+            options={
+                'verbose_name': 'Resumen de inventario',
+                'verbose_name_plural': 'Resúmenes de inventario',
+                'constraints': [models.UniqueConstraint(fields=('marca', 'condicion'), name='resumen_marca_condicion_unico'), models.UniqueConstraint(condition=models.Q(('condicion__isnull', True)), fields=('marca',), name='resumen_marca_unico')],
+            },
+        ),
+        migrations.RunPython(poblar_resumen, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('autos', '0010_resumeninventario'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='vehiculo',
+            index=models.Index(fields=['-fecha_ingreso', '-id'], name='vehiculo_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehiculo',
+            index=models.Index(fields=['precio', 'id'], name='vehiculo_precio_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehiculo',
+            index=models.Index(fields=['anio', 'id'], name='vehiculo_anio_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehiculo',
+            index=models.Index(fields=['kilometraje', 'id'], name='vehiculo_km_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('autos', '0011_indices_inventario'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HistorialPrecio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('precio_anterior', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('precio_nuevo', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('origen', models.CharField(choices=[('edicion', 'Edición'), ('masiva', 'Acción masiva'), ('reglas', 'Reglas de reprecio')], max_length=10)),
+                ('regla', models.CharField(blank=True, help_text='Regla que fijó el precio, si aplica', max_length=100)),
+                ('fecha', models.DateTimeField(auto_now_add=True)),
+                ('vehiculo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='historial_precios', to='autos.vehiculo')),
+            ],
+            options={
+                'verbose_name': 'Cambio de precio',
+                'verbose_name_plural': 'Historial de precios',
+                'ordering': ['-fecha'],
+                'indexes': [models.Index(fields=['vehiculo', '-fecha'], name='historial_vehiculo_fecha_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('autos', '0012_historialprecio'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vehiculo',
+            name='miniaturas',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Derivadas de la imagen por formato y ancho (autos/miniaturas.py)'),
+        ),
+        migrations.AddField(
+            model_name='vehiculocatalogo',
+            name='imagen_srcset',
+            field=models.JSONField(blank=True, default=dict, help_text='srcset de las miniaturas por formato'),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:55
+
+import autos.almacenamiento
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def contar_referencias(apps, schema_editor):
+    """Registra las imágenes que ya usan los vehículos (con nombre de subida, hasta deduplicarlas)"""
+    Vehiculo = apps.get_model('autos', 'Vehiculo')
+    ImagenAlmacenada = apps.get_model('autos', 'ImagenAlmacenada')
+    storage = autos.almacenamiento.almacenamiento_imagenes()
+    conteos = (
+        Vehiculo.objects.exclude(imagen='').exclude(imagen__isnull=True)
+        .values_list('imagen').annotate(total=Count('pk')).order_by()
+    )
+    ImagenAlmacenada.objects.bulk_create(
+        [
+            ImagenAlmacenada(
+                nombre=nombre, referencias=total,
+                tamano=storage.size(nombre) if storage.exists(nombre) else 0,
+            )
+            for nombre, total in conteos
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('autos', '0013_miniaturas'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='vehiculo',
+            name='imagen',
+            field=models.ImageField(blank=True, null=True, storage=autos.almacenamiento.almacenamiento_imagenes, upload_to='vehiculos/'),
+        ),
+        migrations.CreateModel(
+            name='ImagenAlmacenada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=255, unique=True)),
+                ('tamano', models.BigIntegerField(default=0, help_text='Bytes')),
+                ('referencias', models.PositiveIntegerField(default=0)),
+                ('sin_referencias_desde', models.DateTimeField(blank=True, null=True)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Imagen almacenada',
+                'verbose_name_plural': 'Imágenes almacenadas',
+                'indexes': [models.Index(condition=models.Q(('referencias', 0)), fields=['sin_referencias_desde'], name='imagen_sin_referencias_idx')],
+            },
+        ),
+        migrations.RunPython(contar_referencias, migrations.RunPython.noop),
+    ]
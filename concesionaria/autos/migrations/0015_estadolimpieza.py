@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('autos', '0014_almacenamiento_imagenes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstadoLimpieza',
+            fields=[
+                ('tarea', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('cursor', models.TextField(blank=True, help_text='Último id o archivo procesado; vacío si terminó')),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Estado de limpieza',
+                'verbose_name_plural': 'Estados de limpieza',
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('autos', '0015_estadolimpieza'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vehiculo',
+            name='estado_imagen',
+            field=models.CharField(choices=[('lista', 'Lista'), ('pendiente', 'Procesando'), ('fallida', 'Fallida')], default='lista', editable=False, help_text='Procesamiento de la imagen en la cola (autos/cola.py)', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='vehiculocatalogo',
+            name='estado_imagen',
+            field=models.CharField(default='lista', max_length=10),
+        ),
+        migrations.CreateModel(
+            name='TrabajoImagen',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('imagen', models.CharField(help_text='Nombre de la imagen al encolar', max_length=255)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('procesando', 'Procesando'), ('listo', 'Listo'), ('fallido', 'Fallido'), ('descartado', 'Descartado')], default='pendiente', max_length=10)),
+                ('intentos', models.PositiveSmallIntegerField(default=0)),
+                ('disponible_desde', models.DateTimeField(help_text='No se toma antes de esta fecha (espera entre reintentos)')),
+                ('iniciado', models.DateTimeField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+                ('vehiculo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trabajos_imagen', to='autos.vehiculo')),
+            ],
+            options={
+                'verbose_name': 'Trabajo de imagen',
+                'verbose_name_plural': 'Cola de imágenes',
+                'ordering': ['-creado'],
+                'indexes': [models.Index(condition=models.Q(('estado', 'pendiente')), fields=['disponible_desde'], name='trabajo_pendiente_idx'), models.Index(condition=models.Q(('estado', 'procesando')), fields=['iniciado'], name='trabajo_procesando_idx')],
+            },
+        ),
+    ]
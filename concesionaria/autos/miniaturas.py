@@ -0,0 +1,114 @@
+"""
+Imágenes derivadas (miniaturas) de Vehiculo.imagen.
+
+Por cada imagen se generan anchos fijos (ANCHOS_MINIATURA) en WebP y en
+JPEG como respaldo. Nunca se amplía: solo se generan los anchos menores
+que el original (o uno del tamaño original si es más chico que todos).
+
+Las derivadas se guardan en el mismo almacenamiento por contenido que los
+originales (autos/almacenamiento.py), en la subcarpeta `miniaturas`:
+`vehiculos/miniaturas/ab/cd/<sha256>.webp`. El nombre no dice de qué
+imagen ni de qué ancho salen; eso lo registra Vehiculo.miniaturas, que
+guarda {formato: {ancho: nombre en el storage}} y Vehiculo.imagen_srcset
+convierte en el atributo srcset de cada formato. Volver a generar las
+mismas derivadas da los mismos nombres (no se sobrescribe nada) y dos
+imágenes que producen la misma miniatura comparten el archivo; las que
+ninguna fila usa las borra la limpieza de media (autos/limpieza.py).
+
+Cuando cambia la imagen, las señales encolan un TrabajoImagen y el worker
+`procesar_imagenes` genera las derivadas fuera del guardado (autos/cola.py);
+el comando `generar_miniaturas` completa las de la media existente.
+"""
+import logging
+import posixpath
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .almacenamiento import almacenamiento_imagenes, es_nombre_por_contenido
+from .models import Vehiculo
+
+ANCHOS_MINIATURA = (320, 640, 1024)
+# (extensión, formato de Pillow, opciones de guardado), del preferido al respaldo
+FORMATOS_MINIATURA = (
+    ('webp', 'WEBP', {'quality': 80, 'method': 4}),
+    ('jpg', 'JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+)
+CARPETA_MINIATURAS = 'miniaturas'
+
+logger = logging.getLogger(__name__)
+
+
+def carpeta_miniaturas(nombre):
+    """Carpeta donde se guardan las derivadas de la imagen `nombre`"""
+    carpeta = posixpath.dirname(nombre)
+    if es_nombre_por_contenido(nombre):
+        # vehiculos/ab/cd/<hash>.jpg -> vehiculos/miniaturas
+        carpeta = posixpath.dirname(posixpath.dirname(carpeta))
+    return posixpath.join(carpeta, CARPETA_MINIATURAS)
+
+
+def generar_derivadas(nombre):
+    """
+    Genera y guarda las derivadas de la imagen `nombre` del storage de
+    imágenes. Devuelve {extensión: {ancho: nombre}}, o {} si la imagen no
+    se puede leer. No toca la base de datos: el comando la usa desde otros
+    procesos.
+    """
+    storage = almacenamiento_imagenes()
+    try:
+        with storage.open(nombre, 'rb') as archivo:
+            imagen = Image.open(archivo)
+            imagen = ImageOps.exif_transpose(imagen)
+            imagen.load()
+    except (OSError, ValueError) as error:
+        logger.warning('No se pudieron generar miniaturas de %s: %s', nombre, error)
+        return {}
+
+    transparente = 'A' in imagen.getbands() or 'transparency' in imagen.info
+    imagen = imagen.convert('RGBA' if transparente else 'RGB')
+    anchos = [ancho for ancho in ANCHOS_MINIATURA if ancho < imagen.width] or [imagen.width]
+
+    derivadas = {}
+    for ancho in anchos:
+        alto = max(1, round(imagen.height * ancho / imagen.width))
+        reducida = imagen.resize((ancho, alto), Image.Resampling.LANCZOS)
+        for extension, formato, opciones in FORMATOS_MINIATURA:
+            # JPEG no tiene transparencia: se aplana sobre blanco
+            salida = reducida
+            if formato == 'JPEG' and reducida.mode == 'RGBA':
+                salida = Image.new('RGB', reducida.size, 'white')
+                salida.paste(reducida, mask=reducida.getchannel('A'))
+            contenido = BytesIO()
+            salida.save(contenido, formato, **opciones)
+            # El storage solo usa la carpeta y la extensión: el nombre sale del contenido
+            destino = posixpath.join(carpeta_miniaturas(nombre), f'{ancho}w.{extension}')
+            derivadas.setdefault(extension, {})[str(ancho)] = storage.save(destino, ContentFile(contenido.getvalue()))
+    return derivadas
+
+
+def derivadas_existentes(nombre, excluir=None):
+    """
+    Derivadas ya generadas de la imagen `nombre`, o None: con el
+    almacenamiento por contenido varios vehículos comparten el mismo
+    archivo, así que si alguno ya tiene sus miniaturas se reutilizan.
+    """
+    return (
+        Vehiculo.objects.filter(imagen=nombre).exclude(pk=excluir).exclude(miniaturas={})
+        .values_list('miniaturas', flat=True).first()
+    )
+
+
+def registrar_miniaturas(vehiculo_id, nombre, derivadas):
+    """
+    Guarda las derivadas en el vehículo, lo marca con la imagen lista y
+    renueva fecha_actualizacion (que invalida tarjetas y ETags). El UPDATE
+    se condiciona al mismo nombre de imagen: si otra edición la cambió
+    mientras tanto, no se pisa. Devuelve True si el vehículo se actualizó;
+    sincronizarlo queda a cargo de quien llama (update() no dispara señales).
+    """
+    return bool(Vehiculo.objects.filter(pk=vehiculo_id, imagen=nombre).update(
+        miniaturas=derivadas, estado_imagen='lista', fecha_actualizacion=timezone.now(),
+    ))
@@ -1,5 +1,7 @@
 from django.db import models
 
+from .almacenamiento import almacenamiento_imagenes
+
 class Marca(models.Model):
     """Marca del vehículo (Toyota, Ford, BMW, etc.)"""
     nombre = models.CharField(max_length=100, unique=True)
@@ -64,6 +66,12 @@ class DetalleVehiculo(models.Model):
 
 class Vehiculo(models.Model):
     """Modelo principal de vehículos en la concesionaria (adaptado como Producto)"""
+    ESTADOS_IMAGEN = [
+        ('lista', 'Lista'),
+        ('pendiente', 'Procesando'),
+        ('fallida', 'Fallida'),
+    ]
+
     # Información básica
     marca = models.ForeignKey(Marca, on_delete=models.CASCADE, related_name='vehiculos')
     modelo = models.CharField(max_length=100, help_text="Ej: Corolla, Mustang, Serie 3")
@@ -95,13 +103,28 @@ class Vehiculo(models.Model):
     descripcion = models.TextField(blank=True, help_text="Descripción detallada del vehículo")
 
     # Multimedia
-    imagen = models.ImageField(upload_to='vehiculos/', blank=True, null=True)
+    imagen = models.ImageField(upload_to='vehiculos/', storage=almacenamiento_imagenes, blank=True, null=True)
+    miniaturas = models.JSONField(default=dict, blank=True, editable=False,
+                                  help_text="Derivadas de la imagen por formato y ancho (autos/miniaturas.py)")
+    estado_imagen = models.CharField(max_length=10, choices=ESTADOS_IMAGEN, default='lista', editable=False,
+                                     help_text="Procesamiento de la imagen en la cola (autos/cola.py)")
 
     # Control
     disponible = models.BooleanField(default=True)
     fecha_ingreso = models.DateTimeField(auto_now_add=True)
     fecha_actualizacion = models.DateTimeField(auto_now=True)
 
+    @property
+    def imagen_srcset(self):
+        """{formato: 'url 320w, url 640w, ...'} de las miniaturas de la imagen"""
+        return {
+            extension: ', '.join(
+                f'{self.imagen.storage.url(nombre)} {ancho}w'
+                for ancho, nombre in sorted(por_ancho.items(), key=lambda item: int(item[0]))
+            )
+            for extension, por_ancho in self.miniaturas.items()
+        }
+
     def __str__(self) -> str:
         marca = self.marca.nombre if self.marca else ''
         return f"{marca} {self.modelo} ({self.anio})"
@@ -110,3 +133,215 @@ class Vehiculo(models.Model):
         verbose_name = "Vehículo"
         verbose_name_plural = "Vehículos"
         ordering = ['-fecha_ingreso']
+        # Índices según los accesos de catalogo, index e inventario_view;
+        # los parciales (WHERE disponible) solo indexan lo que se publica.
+        # PlanesConsultaTests (autos/tests.py) comprueba que se usen.
+        indexes = [
+            models.Index(fields=['-fecha_ingreso', '-id'], condition=models.Q(disponible=True),
+                         name='vehiculo_disp_fecha_idx'),
+            models.Index(fields=['marca', '-fecha_ingreso', '-id'], condition=models.Q(disponible=True),
+                         name='vehiculo_disp_marca_idx'),
+            models.Index(fields=['anio'], condition=models.Q(disponible=True),
+                         name='vehiculo_disp_anio_idx'),
+            models.Index(fields=['precio'], condition=models.Q(disponible=True),
+                         name='vehiculo_disp_precio_idx'),
+            models.Index(fields=['disponible', '-fecha_ingreso'], name='vehiculo_disponible_fecha_idx'),
+            # Columnas ordenables de la tabla de inventario (incluye no disponibles);
+            # el id desempata y permite recorrer el índice en ambas direcciones
+            models.Index(fields=['-fecha_ingreso', '-id'], name='vehiculo_fecha_idx'),
+            models.Index(fields=['precio', 'id'], name='vehiculo_precio_idx'),
+            models.Index(fields=['anio', 'id'], name='vehiculo_anio_idx'),
+            models.Index(fields=['kilometraje', 'id'], name='vehiculo_km_idx'),
+        ]
+
+
+class BusquedaVehiculo(models.Model):
+    """
+    Documento de búsqueda de texto completo de cada vehículo.
+    Lo mantienen las señales de autos/signals.py; el índice real vive en la
+    base de datos (tsvector + GIN en PostgreSQL, tabla FTS5 en SQLite).
+    """
+    vehiculo = models.OneToOneField(Vehiculo, on_delete=models.CASCADE, primary_key=True, related_name='busqueda')
+    titulo = models.CharField(max_length=220, blank=True, help_text="Marca, modelo y año (mayor peso)")
+    documento = models.TextField(blank=True, help_text="Descripción, color, condición y atributos")
+
+    def __str__(self):
+        return self.titulo
+
+    class Meta:
+        verbose_name = "Documento de búsqueda"
+        verbose_name_plural = "Documentos de búsqueda"
+
+
+class VehiculoCatalogo(models.Model):
+    """
+    Modelo de lectura del catálogo: una fila plana por vehículo disponible,
+    con todo lo que muestra una tarjeta (sin joins ni prefetch). La mantiene
+    autos/catalogo.py desde las señales; `reconstruir_catalogo` la regenera.
+    La búsqueda de texto usa el índice de BusquedaVehiculo, que comparte
+    la misma clave primaria (el id del vehículo).
+    """
+    vehiculo = models.OneToOneField(Vehiculo, on_delete=models.CASCADE, primary_key=True, related_name='fila_catalogo')
+    marca = models.ForeignKey(Marca, on_delete=models.CASCADE, related_name='+')
+    marca_nombre = models.CharField(max_length=100)
+    modelo = models.CharField(max_length=100)
+    anio = models.IntegerField()
+    precio = models.DecimalField(max_digits=12, decimal_places=2)
+    kilometraje = models.IntegerField(blank=True, null=True)
+    descripcion = models.TextField(blank=True)
+    condiciones = models.CharField(max_length=255, blank=True, help_text="Nombres separados por coma")
+    atributo_ids = models.JSONField(default=list, blank=True)
+    imagen_url = models.CharField(max_length=500, blank=True)
+    imagen_srcset = models.JSONField(default=dict, blank=True, help_text="srcset de las miniaturas por formato")
+    estado_imagen = models.CharField(max_length=10, default='lista')
+    fecha_ingreso = models.DateTimeField()
+    fecha_actualizacion = models.DateTimeField()
+
+    def __str__(self) -> str:
+        return f"{self.marca_nombre} {self.modelo} ({self.anio})"
+
+    class Meta:
+        verbose_name = "Vehículo del catálogo"
+        verbose_name_plural = "Vehículos del catálogo"
+        ordering = ['-fecha_ingreso']
+        indexes = [
+            models.Index(fields=['-fecha_ingreso', '-vehiculo'], name='catalogo_fecha_idx'),
+            models.Index(fields=['marca', '-fecha_ingreso', '-vehiculo'], name='catalogo_marca_fecha_idx'),
+            models.Index(fields=['anio'], name='catalogo_anio_idx'),
+            models.Index(fields=['precio'], name='catalogo_precio_idx'),
+        ]
+
+
+class ResumenInventario(models.Model):
+    """
+    Totales precalculados del inventario para el panel administrativo.
+    Una fila por marca (condicion vacía) y una por marca y condición; un
+    vehículo con varias condiciones cuenta en cada una, por eso los totales
+    generales salen solo de las filas por marca. La mantiene
+    autos/resumen.py desde las señales, recalculando solo las marcas
+    afectadas por cada cambio.
+    """
+    marca = models.ForeignKey(Marca, on_delete=models.CASCADE, related_name='+')
+    condicion = models.ForeignKey(Condicion, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    total = models.PositiveIntegerField(default=0)
+    disponibles = models.PositiveIntegerField(default=0)
+    suma_precios = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    precio_min = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    precio_max = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+
+    def __str__(self) -> str:
+        return f"{self.marca_id} / {self.condicion_id or 'todas'}: {self.total}"
+
+    class Meta:
+        verbose_name = "Resumen de inventario"
+        verbose_name_plural = "Resúmenes de inventario"
+        constraints = [
+            models.UniqueConstraint(fields=['marca', 'condicion'], name='resumen_marca_condicion_unico'),
+            models.UniqueConstraint(fields=['marca'], condition=models.Q(condicion__isnull=True),
+                                    name='resumen_marca_unico'),
+        ]
+
+
+class HistorialPrecio(models.Model):
+    """Cada cambio de precio de un vehículo: edición, acción masiva o reglas de reprecio"""
+    ORIGENES = [
+        ('edicion', 'Edición'),
+        ('masiva', 'Acción masiva'),
+        ('reglas', 'Reglas de reprecio'),
+    ]
+
+    vehiculo = models.ForeignKey(Vehiculo, on_delete=models.CASCADE, related_name='historial_precios')
+    precio_anterior = models.DecimalField(max_digits=12, decimal_places=2)
+    precio_nuevo = models.DecimalField(max_digits=12, decimal_places=2)
+    origen = models.CharField(max_length=10, choices=ORIGENES)
+    regla = models.CharField(max_length=100, blank=True, help_text="Regla que fijó el precio, si aplica")
+    fecha = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return f"{self.vehiculo_id}: {self.precio_anterior} → {self.precio_nuevo}"
+
+    class Meta:
+        verbose_name = "Cambio de precio"
+        verbose_name_plural = "Historial de precios"
+        ordering = ['-fecha']
+        indexes = [
+            models.Index(fields=['vehiculo', '-fecha'], name='historial_vehiculo_fecha_idx'),
+        ]
+
+
+class ImagenAlmacenada(models.Model):
+    """
+    Un archivo del almacenamiento de imágenes por contenido y cuántos
+    vehículos lo usan. Lo mantienen las señales (autos/imagenes.py); al
+    llegar a cero se anota desde cuándo, para que la limpieza lo borre.
+    """
+    nombre = models.CharField(max_length=255, unique=True)
+    tamano = models.BigIntegerField(default=0, help_text="Bytes")
+    referencias = models.PositiveIntegerField(default=0)
+    sin_referencias_desde = models.DateTimeField(null=True, blank=True)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return f"{self.nombre} ({self.referencias})"
+
+    class Meta:
+        verbose_name = "Imagen almacenada"
+        verbose_name_plural = "Imágenes almacenadas"
+        indexes = [
+            models.Index(fields=['sin_referencias_desde'], name='imagen_sin_referencias_idx',
+                         condition=models.Q(referencias=0)),
+        ]
+
+
+class EstadoLimpieza(models.Model):
+    """Avance de cada tarea de autos/limpieza.py, para retomarla si se interrumpe"""
+    tarea = models.CharField(max_length=50, primary_key=True)
+    cursor = models.TextField(blank=True, help_text="Último id o archivo procesado; vacío si terminó")
+    actualizado = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"{self.tarea}: {self.cursor or 'completa'}"
+
+    class Meta:
+        verbose_name = "Estado de limpieza"
+        verbose_name_plural = "Estados de limpieza"
+
+
+class TrabajoImagen(models.Model):
+    """
+    Trabajo de la cola de imágenes: generar las miniaturas de la imagen
+    `imagen` del vehículo. Lo crea la señal al guardar y lo ejecuta el
+    comando `procesar_imagenes` (autos/cola.py).
+    """
+    ESTADOS = [
+        ('pendiente', 'Pendiente'),
+        ('procesando', 'Procesando'),
+        ('listo', 'Listo'),
+        ('fallido', 'Fallido'),
+        ('descartado', 'Descartado'),
+    ]
+
+    vehiculo = models.ForeignKey(Vehiculo, on_delete=models.CASCADE, related_name='trabajos_imagen')
+    imagen = models.CharField(max_length=255, help_text="Nombre de la imagen al encolar")
+    estado = models.CharField(max_length=10, choices=ESTADOS, default='pendiente')
+    intentos = models.PositiveSmallIntegerField(default=0)
+    disponible_desde = models.DateTimeField(help_text="No se toma antes de esta fecha (espera entre reintentos)")
+    iniciado = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    creado = models.DateTimeField(auto_now_add=True)
+    actualizado = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"{self.vehiculo_id}: {self.imagen} ({self.estado})"
+
+    class Meta:
+        verbose_name = "Trabajo de imagen"
+        verbose_name_plural = "Cola de imágenes"
+        ordering = ['-creado']
+        indexes = [
+            # Solo lo que el worker consulta: pendientes por fecha y colgados
+            models.Index(fields=['disponible_desde'], name='trabajo_pendiente_idx',
+                         condition=models.Q(estado='pendiente')),
+            models.Index(fields=['iniciado'], name='trabajo_procesando_idx',
+                         condition=models.Q(estado='procesando')),
+        ]
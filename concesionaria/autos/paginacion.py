@@ -0,0 +1,178 @@
+"""
+Paginación por cursor (keyset) para listados grandes.
+
+En vez de OFFSET, cada página pide "los N siguientes después del último
+elemento visto", de modo que el costo no crece con el número de página.
+El cursor es un token firmado y opaco con los valores de orden del último
+elemento; además lleva la clave de los filtros, así un cursor solo es
+válido para la misma combinación de filtros que lo generó.
+
+También hay un conteo aproximado (y un Paginator que lo usa) para tablas
+grandes: en PostgreSQL un COUNT(*) recorre la tabla entera, mientras que
+la estimación del planificador es instantánea.
+"""
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from .cache import cache_compartida
+
+SALT_CURSOR = 'autos.paginacion.cursor'
+
+
+def codificar_cursor(valores, contexto=''):
+    """Convierte los valores de orden del último elemento en un token opaco"""
+    return signing.dumps({'v': valores, 'c': contexto}, salt=SALT_CURSOR, compress=True)
+
+
+def decodificar_cursor(token, contexto=''):
+    """Devuelve los valores del cursor, o None si es inválido o de otros filtros"""
+    try:
+        datos = signing.loads(token, salt=SALT_CURSOR)
+    except signing.BadSignature:
+        return None
+    if not isinstance(datos, dict) or datos.get('c') != contexto:
+        return None
+    return datos.get('v')
+
+
+def _serializar(valor):
+    # isoformat conserva los microsegundos (DjangoJSONEncoder los trunca)
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return str(valor)
+    return valor
+
+
+def _condicion_despues(orden, valores):
+    """
+    Construye la condición "fila > cursor" para un orden compuesto:
+    (a < x) OR (a = x AND b < y) OR ... respetando la dirección de cada campo.
+    """
+    condicion = Q()
+    for i, campo in enumerate(orden):
+        nombre = campo.lstrip('-')
+        lookup = 'lt' if campo.startswith('-') else 'gt'
+        paso = Q(**{f'{nombre}__{lookup}': valores[i]})
+        for previo, valor in zip(orden[:i], valores[:i]):
+            paso &= Q(**{previo.lstrip('-'): valor})
+        condicion |= paso
+    return condicion
+
+
+def paginar_keyset(queryset, orden, cursor=None, por_pagina=24, contexto=''):
+    """
+    Devuelve (elementos, siguiente_cursor) para la página que sigue al cursor.
+
+    `orden` es una tupla de campos como ('-fecha_ingreso', '-id'); el último
+    campo debe ser único para que el orden sea total. `siguiente_cursor` es
+    None cuando no hay más resultados.
+    """
+    queryset = queryset.order_by(*orden)
+    valores = decodificar_cursor(cursor, contexto) if cursor else None
+    if valores is not None and len(valores) == len(orden):
+        queryset = queryset.filter(_condicion_despues(orden, valores))
+
+    # Se pide un elemento extra solo para saber si existe otra página
+    elementos = list(queryset[:por_pagina + 1])
+    siguiente = None
+    if len(elementos) > por_pagina:
+        elementos = elementos[:por_pagina]
+        ultimo = elementos[-1]
+        siguiente = codificar_cursor(
+            [_serializar(getattr(ultimo, campo.lstrip('-'))) for campo in orden],
+            contexto,
+        )
+    return elementos, siguiente
+
+
+# =====================
+# CONTEO APROXIMADO
+# =====================
+# Por debajo del umbral se cuenta exacto: ahí el COUNT es barato y un
+# número inexacto se notaría ("3 vehículos" cuando hay 2).
+UMBRAL_CONTEO_EXACTO = getattr(settings, 'UMBRAL_CONTEO_EXACTO', 10000)
+
+
+def estimar_filas(queryset):
+    """
+    Filas estimadas por el planificador de PostgreSQL, o None si no hay
+    estimación (otro motor o tabla nunca analizada). Sin filtros se lee
+    pg_class.reltuples; con filtros, las filas del plan de EXPLAIN.
+    """
+    conexion = connections[queryset.db]
+    if conexion.vendor != 'postgresql':
+        return None
+    if not queryset.query.where and not queryset.query.distinct and queryset.query.low_mark == 0 \
+            and queryset.query.high_mark is None:
+        with conexion.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                [queryset.model._meta.db_table],
+            )
+            fila = cursor.fetchone()
+        # reltuples es -1 (PostgreSQL 14+) o 0 si la tabla no se ha analizado
+        return fila[0] if fila and fila[0] > 0 else None
+    plan = json.loads(queryset.order_by().values('pk').explain(format='json'))
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def contar_aproximado(queryset, umbral=None):
+    """
+    Devuelve (total, aproximado). Usa la estimación del planificador si
+    supera el umbral; si no la hay o es menor, hace el COUNT exacto.
+    En SQLite (desarrollo) siempre es exacto.
+    """
+    umbral = UMBRAL_CONTEO_EXACTO if umbral is None else umbral
+    estimado = estimar_filas(queryset)
+    if estimado is not None and estimado >= umbral:
+        return estimado, True
+    return queryset.count(), False
+
+
+class PaginadorAproximado(Paginator):
+    """
+    Paginator cuyo total sale de contar_aproximado. Con un total estimado
+    la última página puede quedar corta o vacía; `aproximado` lo indica
+    para que la plantilla muestre "~" junto a los totales.
+    """
+
+    def __init__(self, *args, umbral=None, **kwargs):
+        self.umbral = umbral
+        super().__init__(*args, **kwargs)
+
+    @cached_property
+    def _conteo(self):
+        if not hasattr(self.object_list, 'query'):
+            return len(self.object_list), False
+        return contar_aproximado(self.object_list, self.umbral)
+
+    @cached_property
+    def count(self):
+        return self._conteo[0]
+
+    @property
+    def aproximado(self):
+        return self._conteo[1]
+
+
+def contar_cacheado(queryset, clave, timeout=60):
+    """(total, aproximado) de contar_aproximado, guardado en caché bajo `clave`"""
+    if not cache_compartida():
+        return contar_aproximado(queryset)
+    conteo = cache.get(clave)
+    if conteo is None:
+        conteo = contar_aproximado(queryset)
+        cache.set(clave, conteo, timeout)
+    return conteo
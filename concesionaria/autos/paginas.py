@@ -0,0 +1,126 @@
+"""
+Caché de página completa para visitantes anónimos.
+
+index, catalogo y detalle_vehiculo son iguales para todos los anónimos,
+así que su HTML se guarda entero y se reutiliza. Nunca se usa la caché
+con usuarios autenticados (menú, permisos) ni con mensajes pendientes del
+framework de mensajes, que deben mostrarse y consumirse en ese render.
+
+Purga precisa:
+- Listados (index, catálogo): la clave lleva la versión del inventario,
+  que ya se incrementa con cada cambio (ver autos/cache.py).
+- Detalle: una clave fija por vehículo, `pagina:detalle:<id>`, que las
+  señales borran solo para los vehículos que cambiaron.
+
+Se desactiva con CACHE_PAGINAS_ANONIMAS = False en settings, y sola si la
+caché es por proceso (LocMemCache): la versión no sería la misma en todos.
+"""
+from functools import wraps
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.core.handlers.wsgi import WSGIRequest
+from django.http import HttpResponse
+
+from .cache import cache_compartida, clave_versionada, obtener_con_revalidacion
+
+
+def clave_detalle(vehiculo_id):
+    return f'pagina:detalle:{vehiculo_id}'
+
+
+def purgar_detalles(ids):
+    """Borra la página de detalle cacheada de cada vehículo en `ids`"""
+    cache.delete_many([clave_detalle(vehiculo_id) for vehiculo_id in ids])
+
+
+def _usar_cache(request):
+    return (
+        getattr(settings, 'CACHE_PAGINAS_ANONIMAS', True)
+        and cache_compartida()
+        and request.method in ('GET', 'HEAD')
+        and not request.user.is_authenticated
+        and not len(get_messages(request))
+    )
+
+
+def _peticion_anonima(request):
+    """
+    Petición GET nueva con solo la URL, el host y el esquema de `request`,
+    y un usuario anónimo. Lo que se guarda en la caché no depende del
+    estado de la petición que lo generó, y el refresco en segundo plano no
+    usa una petición que ya fue respondida.
+    """
+    entorno = {
+        'REQUEST_METHOD': 'GET',
+        'SCRIPT_NAME': request.META.get('SCRIPT_NAME', ''),
+        'PATH_INFO': request.META.get('PATH_INFO', request.path_info),
+        'QUERY_STRING': request.META.get('QUERY_STRING', ''),
+        'SERVER_NAME': request.META.get('SERVER_NAME', ''),
+        'SERVER_PORT': request.META.get('SERVER_PORT', ''),
+        'SERVER_PROTOCOL': request.META.get('SERVER_PROTOCOL', 'HTTP/1.1'),
+        'wsgi.url_scheme': request.scheme,
+        'wsgi.input': BytesIO(),
+    }
+    if 'HTTP_HOST' in request.META:
+        entorno['HTTP_HOST'] = request.META['HTTP_HOST']
+    nueva = WSGIRequest(entorno)
+    nueva.user = AnonymousUser()
+    return nueva
+
+
+def _cachear(obtener_clave):
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(request, *args, **kwargs):
+            if not _usar_cache(request):
+                return vista(request, *args, **kwargs)
+            clave = obtener_clave(request, *args, **kwargs)
+            if clave is None:
+                return vista(request, *args, **kwargs)
+
+            generada = []
+            anonima = _peticion_anonima(request)
+
+            def calcular():
+                # También corre en un hilo, después de responder: solo usa
+                # la petición anónima, que depende de la URL y nada más
+                respuesta = vista(anonima, *args, **kwargs)
+                generada.append(respuesta)
+                # Solo respuestas 200 completas, sin cookies propias y que
+                # la vista no marcó como no-cache
+                if (respuesta.status_code == 200 and not respuesta.streaming
+                        and not respuesta.cookies
+                        and 'no-cache' not in respuesta.get('Cache-Control', '')):
+                    return respuesta.content, respuesta['Content-Type']
+                return None
+
+            # Una página vencida se sirve mientras se recalcula en segundo
+            # plano, y los fallos simultáneos renderizan una sola vez
+            guardada = obtener_con_revalidacion(clave, calcular)
+            if generada:
+                return generada[0]
+            if guardada is None:
+                return vista(request, *args, **kwargs)
+            contenido, tipo = guardada
+            return HttpResponse(contenido, content_type=tipo)
+        return envoltura
+    return decorador
+
+
+def cache_listado(vista):
+    """Caché anónima de un listado: por URL completa y versión del inventario"""
+    return _cachear(
+        lambda request, *args, **kwargs: clave_versionada(f'pagina:{vista.__name__}', request.get_full_path())
+    )(vista)
+
+
+def cache_detalle(vista):
+    """Caché anónima del detalle de un vehículo: una clave por vehículo"""
+    def clave(request, vehiculo_id):
+        # Con querystring no se cachea: la clave por vehículo debe ser única
+        return None if request.GET else clave_detalle(vehiculo_id)
+    return _cachear(clave)(vista)
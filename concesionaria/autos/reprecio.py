@@ -0,0 +1,196 @@
+"""
+Motor de reprecio por reglas, ejecutado como SQL por conjuntos.
+
+Las reglas son declarativas (por ejemplo, un archivo JSON) y se evalúan
+en orden: a cada vehículo le aplica la primera que cumple. Se compilan a
+una sola expresión CASE, así cada lote es un SELECT (para el reporte y el
+historial) y un único UPDATE ... SET precio = CASE ... END.
+
+Formato de una regla:
+
+    {
+        "nombre": "Más de 10 años y 150.000 km",
+        "si": {"antiguedad__gte": 10, "kilometraje__gte": 150000, "condicion__nombre": "Usado"},
+        "porcentaje": -8,           # o "monto": -500000
+        "precio_minimo": 2000000    # opcional
+    }
+
+Condiciones sobre CAMPOS_REGLAS con los lookups de LOOKUPS_REGLAS, más dos
+derivadas: `antiguedad` (años desde `anio`) y `dias_en_stock` (días desde
+`fecha_ingreso`), que se traducen a filtros sobre esas columnas indexadas.
+"""
+from datetime import timedelta
+from decimal import Decimal, DecimalException
+
+from django.db import transaction
+from django.db.models import Case, CharField, F, Q, Value, When
+from django.db.models.functions import Greatest, Round
+from django.utils import timezone
+
+from .models import HistorialPrecio, Vehiculo
+from .signals import sincronizar_al_confirmar
+
+CAMPOS_REGLAS = {
+    'anio', 'kilometraje', 'precio', 'color', 'disponible', 'fecha_ingreso',
+    'marca__nombre', 'categoria__nombre', 'condicion__nombre', 'atributos__nombre',
+}
+LOOKUPS_REGLAS = {'exact', 'iexact', 'gt', 'gte', 'lt', 'lte', 'in'}
+# Lookup equivalente al invertir el sentido (más antigüedad = año menor)
+_LOOKUP_INVERSO = {'exact': 'exact', 'in': 'in', 'gt': 'lt', 'gte': 'lte', 'lt': 'gt', 'lte': 'gte'}
+TAMANO_LOTE = 1000
+# Mayor valor que admite Vehiculo.precio (numeric(12, 2))
+PRECIO_MAXIMO = Decimal('9999999999.99')
+
+
+def _numero(valor, descripcion):
+    """Decimal de un valor numérico de la regla, o ValueError"""
+    if isinstance(valor, (int, float, str, Decimal)) and not isinstance(valor, bool):
+        try:
+            numero = Decimal(str(valor))
+        except DecimalException:
+            pass
+        else:
+            if numero.is_finite():
+                return numero
+    raise ValueError(f'{descripcion}: {valor!r} no es un número')
+
+
+def _condicion(clave, valor, ahora):
+    """Traduce una condición de regla a un filtro sobre columnas de Vehiculo"""
+    campo, _, lookup = clave.rpartition('__')
+    if lookup not in LOOKUPS_REGLAS:
+        campo, lookup = clave, 'exact'
+    if lookup == 'in' and not isinstance(valor, list):
+        raise ValueError(f'{clave}: "in" espera una lista de valores')
+    if isinstance(valor, dict) or (lookup != 'in' and isinstance(valor, list)):
+        raise ValueError(f'{clave}: valor no válido {valor!r}')
+
+    if campo in ('antiguedad', 'dias_en_stock'):
+        if lookup not in _LOOKUP_INVERSO:
+            raise ValueError(f'Lookup no soportado para {campo}: {lookup}')
+        if campo == 'dias_en_stock' and lookup in ('exact', 'in'):
+            raise ValueError('dias_en_stock solo admite comparaciones (gt, gte, lt, lte)')
+        convertir = (
+            (lambda anios: ahora.year - int(_numero(anios, clave))) if campo == 'antiguedad'
+            else (lambda dias: ahora - timedelta(days=int(_numero(dias, clave))))
+        )
+        valor = [convertir(v) for v in valor] if lookup == 'in' else convertir(valor)
+        columna = 'anio' if campo == 'antiguedad' else 'fecha_ingreso'
+        return {f'{columna}__{_LOOKUP_INVERSO[lookup]}': valor}
+
+    if campo not in CAMPOS_REGLAS:
+        raise ValueError(f'Campo no permitido en reglas: {campo}')
+    return {f'{campo}__{lookup}': valor}
+
+
+def compilar_reglas(reglas, ahora=None):
+    """
+    Valida las reglas y devuelve [(nombre, filtro Q, expresión del precio
+    nuevo)]. Las condiciones sobre relaciones se resuelven con una
+    subconsulta de ids: un UPDATE no admite joins. Una regla mal formada
+    levanta ValueError.
+    """
+    ahora = ahora or timezone.now()
+    compiladas = []
+    for posicion, regla in enumerate(reglas, 1):
+        if not isinstance(regla, dict):
+            raise ValueError(f'Regla {posicion}: debe ser un objeto, no {type(regla).__name__}')
+        nombre = str(regla.get('nombre') or f'Regla {posicion}')[:100]
+        if ('porcentaje' in regla) == ('monto' in regla):
+            raise ValueError(f'{nombre}: indica "porcentaje" o "monto" (solo uno)')
+        condiciones = regla.get('si') or {}
+        if not isinstance(condiciones, dict):
+            raise ValueError(f'{nombre}: "si" debe ser un objeto {{"campo__lookup": valor}}')
+        filtros = {}
+        for clave, valor in condiciones.items():
+            filtros.update(_condicion(clave, valor, ahora))
+        if not filtros:
+            # Sin condiciones aplica a todos (When no admite un Q() vacío)
+            filtro = Q(pk__isnull=False)
+        elif any('__' in clave.rsplit('__', 1)[0] for clave in filtros):
+            filtro = Q(pk__in=Vehiculo.objects.filter(**filtros).values('pk'))
+        else:
+            filtro = Q(**filtros)
+
+        if 'porcentaje' in regla:
+            nuevo = F('precio') * Value(1 + _numero(regla['porcentaje'], f'{nombre}: porcentaje') / 100)
+        else:
+            nuevo = F('precio') + Value(_numero(regla['monto'], f'{nombre}: monto'))
+        minimo = _numero(regla.get('precio_minimo', 0), f'{nombre}: precio_minimo')
+        compiladas.append((nombre, filtro, Greatest(Round(nuevo, 2), Value(minimo))))
+    return compiladas
+
+
+def _case_precio(compiladas):
+    return Case(*[When(filtro, then=nuevo) for _, filtro, nuevo in compiladas], default=F('precio'))
+
+
+def _case_regla(compiladas):
+    return Case(*[When(filtro, then=Value(nombre)) for nombre, filtro, _ in compiladas],
+                default=Value(''), output_field=CharField())
+
+
+def aplicar_reglas(reglas, vehiculos=None, aplicar=False, origen='reglas', tamano_lote=TAMANO_LOTE):
+    """
+    Reprecia `vehiculos` (por defecto, todos los disponibles) según las
+    reglas. Con aplicar=False (simulación) no escribe nada. Devuelve los
+    cambios: [{'id', 'vehiculo', 'regla', 'precio_anterior', 'precio_nuevo'}].
+    Al aplicar, cada lote corre en su transacción: un SELECT ... FOR UPDATE,
+    el historial con un INSERT masivo y un único UPDATE con CASE. Un precio
+    nuevo mayor que PRECIO_MAXIMO levanta ValueError antes de escribir el lote.
+    """
+    compiladas = compilar_reglas(reglas)
+    if not compiladas:
+        return []
+    if vehiculos is None:
+        vehiculos = Vehiculo.objects.filter(disponible=True)
+    alguna = Q()
+    for _, filtro, _ in compiladas:
+        alguna |= filtro
+    candidatos = vehiculos.filter(alguna).order_by('pk')
+
+    cambios = []
+    ultimo = 0
+    while True:
+        # Lotes por rango de id (keyset): cada lote es una consulta indexada
+        with transaction.atomic():
+            lote = candidatos.filter(pk__gt=ultimo)
+            if aplicar:
+                lote = lote.select_for_update(of=('self',))
+            filas = list(
+                lote.annotate(precio_nuevo=_case_precio(compiladas), regla=_case_regla(compiladas))
+                .values('pk', 'marca__nombre', 'modelo', 'anio', 'precio', 'precio_nuevo', 'regla')[:tamano_lote]
+            )
+            if not filas:
+                break
+            ultimo = filas[-1]['pk']
+            distintos = [fila for fila in filas if Decimal(fila['precio_nuevo']) != fila['precio']]
+            excedidos = [fila['pk'] for fila in distintos if Decimal(fila['precio_nuevo']) > PRECIO_MAXIMO]
+            if excedidos:
+                raise ValueError(f'El precio nuevo supera {PRECIO_MAXIMO} en los vehículos {excedidos[:10]}')
+            if aplicar and distintos:
+                ids = [fila['pk'] for fila in distintos]
+                HistorialPrecio.objects.bulk_create([
+                    HistorialPrecio(
+                        vehiculo_id=fila['pk'], precio_anterior=fila['precio'],
+                        precio_nuevo=Decimal(fila['precio_nuevo']), origen=origen, regla=fila['regla'],
+                    )
+                    for fila in distintos
+                ])
+                Vehiculo.objects.filter(pk__in=ids).update(
+                    precio=_case_precio(compiladas), fecha_actualizacion=timezone.now(),
+                )
+                sincronizar_al_confirmar(ids)
+        cambios.extend(
+            {
+                'id': fila['pk'],
+                'vehiculo': f"{fila['marca__nombre']} {fila['modelo']} ({fila['anio']})",
+                'regla': fila['regla'],
+                'precio_anterior': fila['precio'],
+                'precio_nuevo': Decimal(fila['precio_nuevo']).quantize(Decimal('0.01')),
+            }
+            for fila in distintos
+        )
+        if len(filas) < tamano_lote:
+            break
+    return cambios
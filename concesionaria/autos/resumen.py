@@ -0,0 +1,207 @@
+"""
+Estadísticas del inventario precalculadas en ResumenInventario.
+
+- `aplicar_cambios_resumen`: mantenimiento incremental. Las señales le
+  pasan lo que un vehículo dejó de aportar y lo que aporta ahora (marca,
+  condición, precio, disponible) y se suman las diferencias a las filas,
+  en la misma transacción que el cambio. Mínimo y máximo se recalculan
+  solo para el grupo cuyo extremo se quitó.
+- `recalcular_resumen`: rehace las filas de las marcas indicadas con dos
+  consultas agregadas (Count/Sum/Min/Max condicionales, agrupadas por marca
+  y por marca y condición). La usan las acciones masivas (update() no
+  dispara señales) y `reconstruir_resumen`.
+
+Las dos toman antes el bloqueo de las filas de Marca afectadas (FOR NO KEY
+UPDATE, que no frena las FK de vehículos nuevos): dos cambios simultáneos
+de una misma marca se aplican uno después del otro.
+
+El panel lee `estadisticas_inventario`, que agrega las filas por marca: su
+costo depende de la cantidad de marcas, no del tamaño del inventario.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Count, Max, Min, Q, Sum
+
+from .models import Marca, ResumenInventario, Vehiculo
+
+
+def _agregados(prefijo=''):
+    """Agregados de un grupo de vehículos; `prefijo` para consultar vía otra tabla"""
+    vehiculo = f'{prefijo}id' if prefijo else 'pk'
+    precio = f'{prefijo}precio'
+    return {
+        'total': Count(vehiculo),
+        'disponibles': Count(vehiculo, filter=Q(**{f'{prefijo}disponible': True})),
+        'suma_precios': Sum(precio),
+        'precio_min': Min(precio),
+        'precio_max': Max(precio),
+    }
+
+
+def _bloquear_marcas(marca_ids):
+    """Bloquea las filas de Marca hasta el final de la transacción (en orden: sin interbloqueos)"""
+    marcas = Marca.objects.filter(pk__in=marca_ids).order_by('pk')
+    if connection.features.has_select_for_no_key_update:
+        marcas = marcas.select_for_update(no_key=True)
+    else:
+        marcas = marcas.select_for_update()
+    list(marcas.values_list('pk', flat=True))
+
+
+def recalcular_resumen(marca_ids):
+    """Rehace las filas del resumen de las marcas indicadas"""
+    marca_ids = {marca_id for marca_id in marca_ids if marca_id is not None}
+    if not marca_ids:
+        return
+    with transaction.atomic():
+        _bloquear_marcas(marca_ids)
+        _rehacer_filas(marca_ids)
+
+
+def _rehacer_filas(marca_ids):
+    por_marca = (
+        Vehiculo.objects.filter(marca_id__in=marca_ids)
+        .values('marca_id').annotate(**_agregados()).order_by()
+    )
+    por_condicion = (
+        Vehiculo.condicion.through.objects.filter(vehiculo__marca_id__in=marca_ids)
+        .values('vehiculo__marca_id', 'condicion_id').annotate(**_agregados('vehiculo__')).order_by()
+    )
+    filas = [
+        ResumenInventario(marca_id=grupo.pop('marca_id'), **grupo)
+        for grupo in por_marca
+    ] + [
+        ResumenInventario(marca_id=grupo.pop('vehiculo__marca_id'), **grupo)
+        for grupo in por_condicion
+    ]
+    ResumenInventario.objects.filter(marca_id__in=marca_ids).delete()
+    ResumenInventario.objects.bulk_create(filas)
+
+
+def aporte_vehiculo(marca_id, precio, disponible, condicion_ids=(), fila_marca=True):
+    """
+    Lo que un vehículo aporta al resumen: (marca, condición, precio,
+    disponible) para cada una de sus condiciones y, con `fila_marca`, para
+    la fila de la marca
+    """
+    grupos = [None, *condicion_ids] if fila_marca else list(condicion_ids)
+    return [(marca_id, condicion_id, precio, disponible) for condicion_id in grupos]
+
+
+def _extremos(marca_id, condicion_id):
+    """Precio mínimo y máximo actuales de un grupo, desde los vehículos"""
+    if condicion_id is None:
+        vehiculos = Vehiculo.objects.filter(marca_id=marca_id)
+    else:
+        vehiculos = Vehiculo.objects.filter(marca_id=marca_id, condicion__pk=condicion_id)
+    extremos = vehiculos.aggregate(precio_min=Min('precio'), precio_max=Max('precio'))
+    return extremos['precio_min'], extremos['precio_max']
+
+
+def aplicar_cambios_resumen(quitar=(), agregar=()):
+    """
+    Suma al resumen la diferencia entre lo que dejó de aportarse (`quitar`)
+    y lo que se aporta ahora (`agregar`), ambos listas de aporte_vehiculo.
+    Se llama dentro de la transacción del cambio, después de escribirlo.
+    """
+    if sorted(quitar, key=repr) == sorted(agregar, key=repr):
+        return  # el vehículo cambió, pero no en nada que cuente el resumen
+    cambios = defaultdict(lambda: {'total': 0, 'disponibles': 0, 'suma': Decimal('0'), 'quitados': set()})
+    for signo, aportes in ((-1, quitar), (1, agregar)):
+        for marca_id, condicion_id, precio, disponible in aportes:
+            if marca_id is None:
+                continue
+            precio = Decimal(str(precio))
+            cambio = cambios[(marca_id, condicion_id)]
+            cambio['total'] += signo
+            cambio['disponibles'] += signo * bool(disponible)
+            cambio['suma'] += signo * precio
+            if signo < 0:
+                cambio['quitados'].add(precio)
+            else:
+                cambio.setdefault('agregados', set()).add(precio)
+    marca_ids = {marca_id for marca_id, _ in cambios}
+    if not marca_ids:
+        return
+
+    with transaction.atomic():
+        _bloquear_marcas(marca_ids)
+        filas = {
+            (fila.marca_id, fila.condicion_id): fila
+            for fila in ResumenInventario.objects.filter(marca_id__in=marca_ids)
+        }
+        crear, actualizar, borrar, desfasadas = [], [], [], set()
+        for (marca_id, condicion_id), cambio in cambios.items():
+            fila = filas.get((marca_id, condicion_id))
+            nueva = fila is None
+            if nueva:
+                fila = ResumenInventario(marca_id=marca_id, condicion_id=condicion_id)
+            fila.total += cambio['total']
+            fila.disponibles += cambio['disponibles']
+            fila.suma_precios += cambio['suma']
+            if fila.total < 0 or fila.disponibles < 0 or fila.disponibles > fila.total:
+                # El resumen no coincidía con los vehículos: se rehace la marca
+                desfasadas.add(marca_id)
+                continue
+            if fila.total == 0:
+                if not nueva:
+                    borrar.append(fila.pk)
+                continue
+            if cambio['quitados'] & {fila.precio_min, fila.precio_max}:
+                # Se fue un extremo: solo este grupo se vuelve a consultar
+                fila.precio_min, fila.precio_max = _extremos(marca_id, condicion_id)
+            else:
+                for precio in cambio.get('agregados', ()):
+                    fila.precio_min = precio if fila.precio_min is None else min(fila.precio_min, precio)
+                    fila.precio_max = precio if fila.precio_max is None else max(fila.precio_max, precio)
+            (crear if nueva else actualizar).append(fila)
+
+        crear = [fila for fila in crear if fila.marca_id not in desfasadas]
+        actualizar = [fila for fila in actualizar if fila.marca_id not in desfasadas]
+        ResumenInventario.objects.filter(pk__in=borrar).delete()
+        ResumenInventario.objects.bulk_update(
+            actualizar, ['total', 'disponibles', 'suma_precios', 'precio_min', 'precio_max'],
+        )
+        ResumenInventario.objects.bulk_create(crear)
+        if desfasadas:
+            _rehacer_filas(desfasadas)
+
+
+def reconstruir_resumen():
+    """Regenera el resumen de todas las marcas; devuelve cuántas filas quedaron"""
+    with transaction.atomic():
+        marca_ids = list(Marca.objects.values_list('pk', flat=True))
+        _bloquear_marcas(marca_ids)
+        ResumenInventario.objects.all().delete()
+        _rehacer_filas(marca_ids)
+    return ResumenInventario.objects.count()
+
+
+def estadisticas_inventario():
+    """Totales del panel de inventario: una consulta sobre las filas por marca"""
+    por_marca = ResumenInventario.objects.filter(condicion__isnull=True)
+    totales = por_marca.aggregate(
+        total=Sum('total'),
+        disponibles=Sum('disponibles'),
+        suma_precios=Sum('suma_precios'),
+        precio_min=Min('precio_min'),
+        precio_max=Max('precio_max'),
+    )
+    total = totales['total'] or 0
+    suma = totales['suma_precios'] or Decimal('0')
+    return {
+        'total_vehiculos': total,
+        'disponibles': totales['disponibles'] or 0,
+        'valor_promedio': suma / total if total else 0,
+        'precio_min': totales['precio_min'],
+        'precio_max': totales['precio_max'],
+        'resumen_marcas': list(por_marca.select_related('marca').order_by('-total', 'marca__nombre')),
+        'resumen_condiciones': list(
+            ResumenInventario.objects.filter(condicion__isnull=False)
+            .values('condicion__nombre')
+            .annotate(total=Sum('total'), disponibles=Sum('disponibles'))
+            .order_by('-total', 'condicion__nombre')
+        ),
+    }
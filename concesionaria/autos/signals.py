@@ -0,0 +1,261 @@
+"""
+Señales que mantienen sincronizadas las estructuras derivadas de Vehiculo
+(documentos de búsqueda, filas de VehiculoCatalogo, índice de
+autocompletado, etc.). Se conectan en AutosConfig.ready().
+"""
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import autocompletar
+from .busqueda import reindexar_vehiculos
+from .cache import incrementar_version_inventario
+from .catalogo import sincronizar_vehiculos
+from .cola import descartar_pendientes, encolar_imagen
+from .imagenes import liberar_imagen, referenciar_imagen
+from .miniaturas import derivadas_existentes, registrar_miniaturas
+from .models import Atributo, Categoria, Condicion, DetalleVehiculo, HistorialPrecio, Marca, Vehiculo
+from .paginas import purgar_detalles
+from .resumen import aplicar_cambios_resumen, aporte_vehiculo, recalcular_resumen
+
+
+def _sincronizar(ids, marcas=(), resumen=True):
+    reindexar_vehiculos(ids)
+    sincronizar_vehiculos(ids)
+    if resumen:
+        # Resumen del panel: las marcas actuales de los vehículos y las previas
+        marcas = set(marcas) | set(Vehiculo.objects.filter(pk__in=ids).values_list('marca_id', flat=True))
+        recalcular_resumen(marcas)
+    # La versión nueva invalida los listados; el detalle se purga por vehículo
+    incrementar_version_inventario()
+    purgar_detalles(ids)
+
+
+def sincronizar_al_confirmar(ids, marcas=(), resumen=True):
+    """
+    Reindexa y sincroniza el catálogo cuando la transacción se confirme.
+    Las acciones masivas (autos/acciones.py) la llaman directamente porque
+    update() y bulk_create() no disparan señales; con ellas también se
+    recalcula el resumen de las marcas. Las señales de un solo vehículo
+    pasan resumen=False: ya le aplicaron la diferencia en la transacción.
+    """
+    ids = set(ids)
+    marcas = set(marcas)
+    if ids:
+        transaction.on_commit(lambda: _sincronizar(ids, marcas, resumen))
+
+
+@receiver(pre_save, sender=Vehiculo)
+def vehiculo_valores_previos(sender, instance, raw=False, **kwargs):
+    # Marca, precio y disponibilidad anteriores: el resumen resta lo que el
+    # vehículo aportaba; si cambia el precio, queda en el historial
+    if raw:
+        return
+    previos = None
+    if instance.pk:
+        previos = Vehiculo.objects.filter(pk=instance.pk).values_list(
+            'marca_id', 'precio', 'disponible', 'imagen',
+        ).first()
+    instance._marca_previa, instance._precio_previo, instance._disponible_previo, imagen_previa = (
+        previos or (None, None, None, '')
+    )
+    # Imagen nueva o quitada: las miniaturas anteriores ya no corresponden
+    # y la nueva queda pendiente hasta que la procese la cola
+    instance._imagen_previa = imagen_previa or ''
+    instance._imagen_cambiada = (instance.imagen.name or '') != instance._imagen_previa
+    if instance._imagen_cambiada:
+        instance.miniaturas = {}
+        instance.estado_imagen = 'pendiente' if instance.imagen else 'lista'
+
+
+@receiver(post_save, sender=Vehiculo)
+def vehiculo_guardado(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    precio_previo = getattr(instance, '_precio_previo', None)
+    if precio_previo is not None and precio_previo != instance.precio:
+        HistorialPrecio.objects.create(
+            vehiculo=instance, precio_anterior=precio_previo, precio_nuevo=instance.precio, origen='edicion',
+        )
+    _resumen_guardado(instance)
+    sincronizar_al_confirmar([instance.pk], resumen=False)
+    if not getattr(instance, '_imagen_cambiada', False):
+        return
+    # Referencias del almacenamiento por contenido y trabajo de la cola, en
+    # la misma transacción: el worker no ve el trabajo hasta que se confirme
+    liberar_imagen(instance._imagen_previa)
+    if instance.imagen:
+        nombre = instance.imagen.name
+        referenciar_imagen(nombre)
+        # El mismo archivo ya procesado para otro vehículo no pasa por la cola
+        existentes = derivadas_existentes(nombre, excluir=instance.pk)
+        if existentes and registrar_miniaturas(instance.pk, nombre, existentes):
+            instance.miniaturas, instance.estado_imagen = existentes, 'lista'
+        else:
+            encolar_imagen(instance.pk, nombre)
+    else:
+        descartar_pendientes(instance.pk)
+
+
+def _resumen_guardado(instance):
+    marca_previa = getattr(instance, '_marca_previa', None)
+    previos = (marca_previa, instance._precio_previo, instance._disponible_previo)
+    if previos == (instance.marca_id, instance.precio, instance.disponible):
+        return
+    # Las condiciones no cambian al guardar (un vehículo nuevo todavía no tiene)
+    condiciones = list(instance.condicion.values_list('pk', flat=True)) if marca_previa else []
+    aplicar_cambios_resumen(
+        quitar=aporte_vehiculo(*previos, condiciones) if marca_previa else [],
+        agregar=aporte_vehiculo(instance.marca_id, instance.precio, instance.disponible, condiciones),
+    )
+
+
+@receiver(m2m_changed, sender=Vehiculo.condicion.through)
+def condiciones_resumen(sender, instance, action, reverse, pk_set, **kwargs):
+    # Las filas por condición del resumen suman o restan el vehículo. Lo que
+    # se quita se lee antes (pk_set de remove() trae también ids sin relación)
+    # y se resta después, para que mínimo y máximo se recalculen sin él
+    if action == 'post_add':
+        if reverse:
+            vehiculos = Vehiculo.objects.filter(pk__in=pk_set)
+            aportes = [(marca_id, instance.pk, precio, disponible)
+                       for marca_id, precio, disponible in vehiculos.values_list('marca_id', 'precio', 'disponible')]
+        else:
+            aportes = aporte_vehiculo(instance.marca_id, instance.precio, instance.disponible, pk_set, False)
+        aplicar_cambios_resumen(agregar=aportes)
+    elif action in ('pre_remove', 'pre_clear'):
+        if reverse:
+            vehiculos = instance.vehiculos.all()
+            if action == 'pre_remove':
+                vehiculos = vehiculos.filter(pk__in=pk_set)
+            instance._aportes_quitados = [
+                (marca_id, instance.pk, precio, disponible)
+                for marca_id, precio, disponible in vehiculos.values_list('marca_id', 'precio', 'disponible')
+            ]
+        else:
+            condiciones = instance.condicion.all()
+            if action == 'pre_remove':
+                condiciones = condiciones.filter(pk__in=pk_set)
+            instance._aportes_quitados = aporte_vehiculo(
+                instance.marca_id, instance.precio, instance.disponible,
+                condiciones.values_list('pk', flat=True), False,
+            )
+    elif action in ('post_remove', 'post_clear'):
+        aplicar_cambios_resumen(quitar=instance.__dict__.pop('_aportes_quitados', []))
+
+
+@receiver(m2m_changed, sender=Vehiculo.condicion.through)
+@receiver(m2m_changed, sender=Vehiculo.atributos.through)
+def relaciones_vehiculo_cambiadas(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            sincronizar_al_confirmar([instance.pk], resumen=False)
+    elif action in ('post_add', 'post_remove'):
+        # Desde Condicion/Atributo: pk_set son ids de vehículos
+        sincronizar_al_confirmar(pk_set or [], resumen=False)
+    elif action == 'pre_clear':
+        # clear() corre en una transacción: los ids se leen antes de borrar
+        # y el reindexado se ejecuta al confirmar, ya sin la relación
+        sincronizar_al_confirmar(instance.vehiculos.values_list('pk', flat=True), resumen=False)
+
+
+@receiver(post_delete, sender=Vehiculo)
+@receiver(post_save, sender=Marca)
+@receiver(post_save, sender=Condicion)
+@receiver(post_save, sender=Atributo)
+@receiver(post_delete, sender=Marca)
+@receiver(post_delete, sender=Condicion)
+@receiver(post_delete, sender=Atributo)
+def inventario_cambiado(sender, raw=False, **kwargs):
+    # Borrados y opciones nuevas de filtro también cambian listados y facetas
+    if not raw:
+        transaction.on_commit(incrementar_version_inventario)
+
+
+@receiver(pre_delete, sender=Vehiculo)
+def vehiculo_aporte_previo(sender, instance, **kwargs):
+    # Las filas de condiciones se borran antes que el vehículo: se leen ahora
+    instance._aporte_resumen = aporte_vehiculo(
+        instance.marca_id, instance.precio, instance.disponible,
+        Vehiculo.condicion.through.objects.filter(vehiculo_id=instance.pk).values_list('condicion_id', flat=True),
+    )
+
+
+@receiver(post_delete, sender=Vehiculo)
+def vehiculo_eliminado(sender, instance, **kwargs):
+    vehiculo_id = instance.pk
+    liberar_imagen(instance.imagen.name)
+    # El OneToOne está en Vehiculo: el borrado no llega solo al detalle
+    if instance.detalles_id:
+        DetalleVehiculo.objects.filter(pk=instance.detalles_id).delete()
+    aplicar_cambios_resumen(quitar=getattr(instance, '_aporte_resumen', []))
+    transaction.on_commit(lambda: purgar_detalles([vehiculo_id]))
+
+
+@receiver(post_save, sender=Marca)
+@receiver(post_save, sender=Categoria)
+@receiver(post_save, sender=Condicion)
+@receiver(post_save, sender=Atributo)
+def nombre_relacionado_cambiado(sender, instance, created=False, raw=False, **kwargs):
+    # Un nombre nuevo aparece en el documento y la fila de todos sus vehículos
+    if raw or created:
+        return
+    sincronizar_al_confirmar(instance.vehiculos.values_list('pk', flat=True), resumen=False)
+
+
+# =====================
+# ÍNDICE DE AUTOCOMPLETADO
+# =====================
+# Solo se trabaja si este proceso ya construyó el índice; si no, se
+# construirá completo (y actualizado) en la primera consulta.
+
+def _actualizar_autocompletado(terminos):
+    if terminos:
+        transaction.on_commit(lambda: autocompletar.actualizar_terminos(terminos))
+
+
+@receiver(pre_save, sender=Vehiculo)
+@receiver(pre_delete, sender=Vehiculo)
+def vehiculo_terminos_previos(sender, instance, raw=False, **kwargs):
+    # Marca/modelo anteriores: si cambian, el término viejo pierde peso
+    if raw or not instance.pk or not autocompletar.indice_construido():
+        return
+    instance._terminos_previos = autocompletar.terminos_de_vehiculo(instance.pk)
+
+
+@receiver(post_save, sender=Vehiculo)
+def vehiculo_autocompletado(sender, instance, raw=False, **kwargs):
+    if raw or not autocompletar.indice_construido():
+        return
+    previos = getattr(instance, '_terminos_previos', set())
+    _actualizar_autocompletado(previos | autocompletar.terminos_de_vehiculo(instance.pk))
+
+
+@receiver(post_delete, sender=Vehiculo)
+def vehiculo_eliminado_autocompletado(sender, instance, **kwargs):
+    _actualizar_autocompletado(getattr(instance, '_terminos_previos', set()))
+
+
+@receiver(m2m_changed, sender=Vehiculo.atributos.through)
+def atributos_autocompletado(sender, instance, action, reverse, pk_set, **kwargs):
+    if not autocompletar.indice_construido():
+        return
+    if reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            _actualizar_autocompletado({(autocompletar.TIPO_ATRIBUTO, instance.nombre)})
+    elif action in ('post_add', 'post_remove'):
+        nombres = Atributo.objects.filter(pk__in=pk_set).values_list('nombre', flat=True)
+        _actualizar_autocompletado({(autocompletar.TIPO_ATRIBUTO, nombre) for nombre in nombres})
+    elif action == 'pre_clear':
+        nombres = instance.atributos.values_list('nombre', flat=True)
+        _actualizar_autocompletado({(autocompletar.TIPO_ATRIBUTO, nombre) for nombre in nombres})
+
+
+@receiver(post_save, sender=Marca)
+@receiver(post_save, sender=Atributo)
+@receiver(post_delete, sender=Marca)
+@receiver(post_delete, sender=Atributo)
+def termino_renombrado(sender, instance, created=False, **kwargs):
+    # Renombrar o borrar una marca/atributo es raro: se reconstruye todo
+    if not created:
+        transaction.on_commit(autocompletar.invalidar_indice)
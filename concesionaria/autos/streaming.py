@@ -0,0 +1,48 @@
+"""
+Render por partes para páginas con tablas muy grandes.
+
+La página se renderiza una vez con un marcador en el lugar de las filas y
+se corta ahí: el encabezado (base.html, estadísticas, cabecera de la
+tabla) sale de inmediato y las filas se van generando desde
+`queryset.iterator(chunk_size=...)` dentro de un StreamingHttpResponse.
+Así el tiempo hasta el primer byte no depende del tamaño del inventario
+y en memoria solo vive un lote de filas a la vez (en PostgreSQL,
+iterator() usa un cursor del lado del servidor).
+"""
+from django.http import HttpResponse, StreamingHttpResponse
+from django.template.loader import get_template, render_to_string
+from django.utils.safestring import mark_safe
+
+MARCADOR_FILAS = '<!-- filas -->'
+TAMANO_LOTE = 500
+
+
+def render_en_partes(request, plantilla, contexto, plantilla_fila, filas, nombre='objeto',
+                     contexto_fila=None, tamano_lote=TAMANO_LOTE):
+    """
+    StreamingHttpResponse de `plantilla`, que debe incluir
+    {{ marcador_filas }} donde van las filas. Cada objeto de `filas` se
+    renderiza con `plantilla_fila` bajo la variable `nombre` (más
+    `contexto_fila`); las filas no reciben el request (sin context
+    processors, mucho más baratas).
+    """
+    pagina = render_to_string(plantilla, dict(contexto, marcador_filas=mark_safe(MARCADOR_FILAS)), request)
+    if MARCADOR_FILAS not in pagina:
+        # La plantilla no mostró filas (inventario vacío, sin resultados)
+        return HttpResponse(pagina)
+    inicio, fin = pagina.split(MARCADOR_FILAS, 1)
+    fila = get_template(plantilla_fila)
+
+    def generar():
+        yield inicio
+        lote = []
+        for objeto in filas.iterator(chunk_size=tamano_lote):
+            lote.append(fila.render(dict(contexto_fila or {}, **{nombre: objeto})))
+            if len(lote) >= tamano_lote:
+                yield ''.join(lote)
+                lote = []
+        if lote:
+            yield ''.join(lote)
+        yield fin
+
+    return StreamingHttpResponse(generar(), content_type='text/html; charset=utf-8')
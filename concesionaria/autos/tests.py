@@ -1,3 +1,1227 @@
-from django.test import TestCase
+import itertools
+import json
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock, skipIf, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, connection, connections
+from django.http import Http404, HttpResponse
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from . import autocompletar, views
+from .acciones import agregar_atributos, ajustar_precio, asignar_categoria, cambiar_disponibilidad
+from .almacenamiento import almacenamiento_imagenes, es_nombre_por_contenido
+from .busqueda import buscar, reindexar_todo, sugerir
+from .cache import cache_compartida, obtener_con_revalidacion, renderizar_tarjetas, version_inventario
+from .catalogo import reconstruir_catalogo
+from .facetas import obtener_facetas
+from .cola import (
+    ESPERA_REINTENTO, MAX_INTENTOS, TIEMPO_MAXIMO, completar, fallar, recuperar_colgados, tomar_trabajos,
+)
+from .filtros import aplicar_filtros, normalizar_filtros
+from .limpieza import limpiar_media
+from .management.commands import generar_miniaturas
+from .management.commands.procesar_imagenes import Command as ProcesarImagenes
+from .media import servir_media
+from .miniaturas import ANCHOS_MINIATURA, generar_derivadas
+from .models import (
+    Atributo, Categoria, Condicion, DetalleVehiculo, HistorialPrecio, Marca, ResumenInventario, TrabajoImagen,
+    Vehiculo, VehiculoCatalogo,
+)
+from .paginacion import PaginadorAproximado, _condicion_despues, contar_aproximado
+from .paginas import cache_listado, purgar_detalles
+from .reprecio import PRECIO_MAXIMO, TAMANO_LOTE, aplicar_reglas, compilar_reglas
+from .resumen import reconstruir_resumen
+
+
+# Los tests corren sin DEBUG y sin `collectstatic`: {% static %} no puede usar
+# el manifiesto de EstaticosComprimidos. La caché (compartida, en archivos)
+# va a una carpeta propia para no mezclar versiones con la del servidor
+_carpeta_cache = tempfile.TemporaryDirectory(prefix='autos-tests-cache-')
+ajustes_de_prueba = override_settings(
+    STORAGES={
+        **settings.STORAGES,
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    },
+    CACHES={'default': {**settings.CACHES['default'], 'LOCATION': _carpeta_cache.name}},
+)
+
+
+def sembrar_vehiculos(cantidad, marcas=20, semilla=7):
+    """
+    Vehículos sintéticos con bulk_create (no disparan señales) y el
+    catálogo reconstruido. Devuelve la lista de vehículos creados.
+    """
+    aleatorio = random.Random(semilla)
+    marcas = [Marca.objects.get_or_create(nombre=f'Marca {numero}')[0] for numero in range(marcas)]
+    vehiculos = Vehiculo.objects.bulk_create([
+        Vehiculo(
+            marca=aleatorio.choice(marcas),
+            modelo=f'Modelo {aleatorio.randint(1, 500)}',
+            anio=aleatorio.randint(1990, 2025),
+            precio=Decimal(aleatorio.randint(1_000, 80_000)) * 1000,
+            disponible=aleatorio.random() < 0.7,
+        )
+        for _ in range(cantidad)
+    ], batch_size=1000)
+    reconstruir_catalogo()
+    return vehiculos
+
+
+class NormalizarFiltrosTests(SimpleTestCase):
+    def test_precio_canonico(self):
+        self.assertEqual(normalizar_filtros({'precio_min': '15000000.00'}), {'precio_min': '15000000'})
+        self.assertEqual(normalizar_filtros({'precio_max': '1E+3'}), {'precio_max': '1000'})
+        self.assertEqual(normalizar_filtros({'precio_min': '0.10'}), {'precio_min': '0.1'})
+
+    def test_precio_fuera_de_rango_se_ignora(self):
+        for valor in ('1e999999999', '-1e999999999', '1e-999999999', '10000000000', '0.001', '1' * 100,
+                      'nan', 'inf', 'abc'):
+            with self.subTest(valor=valor):
+                self.assertEqual(normalizar_filtros({'precio_min': valor}), {})
+
+    def test_entero_fuera_de_rango_se_ignora(self):
+        self.assertEqual(normalizar_filtros({'anio_min': '99999999999999', 'marca': '3'}), {'marca': '3'})
+
+
+@ajustes_de_prueba
+class FiltrosVistasTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_precio_desbordado_no_rompe_las_vistas(self):
+        usuario = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'clave')
+        self.client.force_login(usuario)
+        for url in ('/catalogo/', '/inventario/'):
+            with self.subTest(url=url):
+                respuesta = self.client.get(url, {'precio_min': '1e999999999'})
+                self.assertEqual(respuesta.status_code, 200)
+
+
+class AutocompletarTests(SimpleTestCase):
+    def setUp(self):
+        self.anterior = autocompletar.TriePrefijos()
+        self.anterior.cargar([(autocompletar.TIPO_MARCA, 'Toyota', 3)])
+        autocompletar._indice = self.anterior
+        autocompletar._construido_en = float('-inf')
+        self.addCleanup(setattr, autocompletar, '_indice', None)
+
+    def test_reconstruye_en_segundo_plano_sin_bloquear(self):
+        nuevo = autocompletar.TriePrefijos()
+        nuevo.cargar([(autocompletar.TIPO_MARCA, 'Tesla', 5)])
+        liberar = threading.Event()
+        hilos = []
+        crear_hilo = threading.Thread
+
+        def construir():
+            liberar.wait(5)
+            return nuevo
+
+        def hilo(*args, **kwargs):
+            hilos.append(crear_hilo(*args, **kwargs))
+            return hilos[-1]
+
+        with mock.patch.object(autocompletar, 'construir_indice', construir), \
+                mock.patch.object(autocompletar.threading, 'Thread', hilo), \
+                mock.patch.object(autocompletar.connection, 'close'):
+            # Mientras se construye el nuevo responde el anterior, sin esperar
+            self.assertEqual([r['texto'] for r in autocompletar.autocompletar('t')], ['Toyota'])
+            self.assertEqual([r['texto'] for r in autocompletar.autocompletar('t')], ['Toyota'])
+            liberar.set()
+            self.assertEqual(len(hilos), 1)
+            hilos[0].join(5)
+        self.assertIs(autocompletar._indice, nuevo)
+        self.assertFalse(autocompletar._reconstruyendo)
+        self.assertEqual([r['texto'] for r in autocompletar.autocompletar('t')], ['Tesla'])
+
+
+class BusquedaTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        toyota = Marca.objects.create(nombre='Toyota')
+        ford = Marca.objects.create(nombre='Ford')
+        cls.corolla = Vehiculo.objects.create(marca=toyota, modelo='Corolla', anio=2020, precio=20_000_000)
+        cls.hilux = Vehiculo.objects.create(
+            marca=toyota, modelo='Hilux', anio=2019, precio=30_000_000, descripcion='Camión de trabajo',
+        )
+        cls.focus = Vehiculo.objects.create(
+            marca=ford, modelo='Focus', anio=2018, precio=15_000_000, descripcion='Repuestos de Toyota Corolla',
+        )
+        # Los documentos se regeneran al confirmar la transacción; acá no hay commit
+        reindexar_todo()
+
+    def _buscar(self, texto):
+        return list(buscar(Vehiculo.objects.all(), texto).order_by('-relevancia', 'pk'))
+
+    @skipUnless(connection.vendor == 'sqlite', 'Índice FTS5 de SQLite')
+    def test_fts5_titulo_pesa_mas_que_documento(self):
+        self.assertEqual(self._buscar('toyota'), [self.corolla, self.hilux, self.focus])
+        self.assertEqual(self._buscar('corolla'), [self.corolla, self.focus])
+
+    @skipUnless(connection.vendor == 'sqlite', 'Índice FTS5 de SQLite')
+    def test_fts5_varias_palabras_prefijos_y_tildes(self):
+        # Todas las palabras deben aparecer, en el título o en el documento
+        self.assertEqual(set(self._buscar('toyota corolla')), {self.corolla, self.focus})
+        self.assertEqual(self._buscar('toyota hilux'), [self.hilux])
+        self.assertEqual(self._buscar('coro'), [self.corolla, self.focus])
+        self.assertEqual(self._buscar('camion'), [self.hilux])
+        self.assertEqual(self._buscar('toyota mustang'), [])
+        self.assertEqual(self._buscar('¿?'), [])
+
+    def test_otros_motores_usan_icontains(self):
+        with mock.patch.object(connection, 'vendor', 'mysql'):
+            resultados = buscar(Vehiculo.objects.all(), 'toyota')
+            self.assertEqual(set(resultados), {self.corolla, self.hilux, self.focus})
+            self.assertEqual({vehiculo.relevancia for vehiculo in resultados}, {0.0})
+            self.assertEqual(list(buscar(Vehiculo.objects.all(), 'FOC')), [self.focus])
+            self.assertEqual(list(buscar(Vehiculo.objects.all(), 'corolla toyota')), [])
+
+
+@ajustes_de_prueba
+class SugerenciasTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        toyota = Marca.objects.create(nombre='Toyota')
+        ford = Marca.objects.create(nombre='Ford')
+        for modelo, disponible in (('Corolla', True), ('Corolla', True), ('Hilux', True), ('Hilux', False)):
+            Vehiculo.objects.create(marca=toyota, modelo=modelo, anio=2020, precio=20_000_000, disponible=disponible)
+        Vehiculo.objects.create(marca=ford, modelo='Focus', anio=2018, precio=15_000_000)
+        reindexar_todo()
+        reconstruir_catalogo()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_error_de_tipeo_sugiere_la_marca(self):
+        # Solo cuentan los disponibles; a igual similitud, primero el de más vehículos
+        self.assertEqual(sugerir('toyta'), [
+            {'texto': 'Toyota Corolla', 'marca': 'Toyota', 'modelo': 'Corolla', 'total': 2},
+            {'texto': 'Toyota Hilux', 'marca': 'Toyota', 'modelo': 'Hilux', 'total': 1},
+        ])
+        self.assertEqual(sugerir('toyta corola')[0]['texto'], 'Toyota Corolla')
+        self.assertEqual(sugerir('xyzw'), [])
+        self.assertEqual(sugerir('to'), [])
+
+    def test_vistas_sin_resultados_muestran_sugerencias(self):
+        for url in (reverse('catalogo'), reverse('buscar_automovil')):
+            with self.subTest(url=url):
+                respuesta = self.client.get(url, {'q': 'toyta'})
+                self.assertEqual(respuesta.status_code, 200)
+                self.assertEqual(
+                    [(s['texto'], s['total']) for s in respuesta.context['sugerencias']],
+                    [('Toyota Corolla', 2), ('Toyota Hilux', 1)],
+                )
+                self.assertContains(respuesta, '¿Quisiste decir?')
+                self.assertContains(respuesta, f'{url}?q=Toyota%20Corolla')
+
+    def test_vistas_con_resultados_no_sugieren(self):
+        for url in (reverse('catalogo'), reverse('buscar_automovil')):
+            with self.subTest(url=url):
+                respuesta = self.client.get(url, {'q': 'toyota'})
+                self.assertEqual(respuesta.context['sugerencias'], [])
+                self.assertNotContains(respuesta, '¿Quisiste decir?')
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Los planes se verifican en PostgreSQL')
+class PlanesConsultaTests(TestCase):
+    """
+    Ninguna combinación de filtros de catalogo, index, facetas e
+    inventario_view lee autos_vehiculo o autos_vehiculocatalogo completa.
+    Con enable_seqscan desactivado el planificador solo elige un Seq Scan
+    si no existe índice utilizable, sin importar el tamaño de la tabla.
+    """
+    TABLAS = {Vehiculo._meta.db_table, VehiculoCatalogo._meta.db_table}
+    ORDEN = ('-fecha_ingreso', '-pk')
+
+    @classmethod
+    def setUpTestData(cls):
+        sembrar_vehiculos(2000)
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE autos_vehiculo')
+            cursor.execute('ANALYZE autos_vehiculocatalogo')
+            cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def _consultas(self):
+        valores = {
+            'marca': {'marca': str(Marca.objects.values_list('pk', flat=True).first())},
+            'anio': {'anio_min': '2010', 'anio_max': '2015'},
+            'precio': {'precio_min': '5000000', 'precio_max': '9000000'},
+        }
+        catalogo = VehiculoCatalogo.objects.all()
+        disponibles = Vehiculo.objects.filter(disponible=True)
+        yield 'index: destacados', catalogo.order_by(*self.ORDEN)[:6]
+        yield 'inventario: disponibles', disponibles.order_by('-fecha_ingreso').values('pk')
+        for campo in ('precio', 'anio', 'kilometraje', 'fecha_ingreso'):
+            for orden in (campo, f'-{campo}'):
+                desempate = '-pk' if orden.startswith('-') else 'pk'
+                yield f'inventario: orden {orden}', Vehiculo.objects.order_by(orden, desempate)[:25]
+        for largo in range(len(valores) + 1):
+            for combinacion in itertools.combinations(valores, largo):
+                filtros = {}
+                for nombre in combinacion:
+                    filtros.update(valores[nombre])
+                etiqueta = '+'.join(combinacion) or 'sin filtros'
+                vehiculos = aplicar_filtros(catalogo, filtros)
+                yield f'catalogo [{etiqueta}]: página', vehiculos.order_by(*self.ORDEN)[:25]
+                yield f'catalogo [{etiqueta}]: cursor', vehiculos.filter(
+                    _condicion_despues(self.ORDEN, ['2024-01-01T00:00:00+00:00', 10 ** 9])
+                ).order_by(*self.ORDEN)[:25]
+                yield f'catalogo [{etiqueta}]: conteo', vehiculos.order_by().values('pk')
+                yield f'facetas [{etiqueta}]', aplicar_filtros(disponibles, filtros).order_by().values('pk')
+
+    def _lecturas_completas(self, queryset):
+        plan = json.loads(queryset.explain(format='json'))
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        pendientes = [plan[0]['Plan']]
+        while pendientes:
+            nodo = pendientes.pop()
+            if nodo.get('Node Type') == 'Seq Scan' and nodo.get('Relation Name') in self.TABLAS:
+                yield f"Seq Scan on {nodo['Relation Name']}"
+            pendientes.extend(nodo.get('Plans', []))
+
+    def test_filtros_usan_indices(self):
+        for nombre, queryset in self._consultas():
+            with self.subTest(consulta=nombre):
+                self.assertEqual(list(self._lecturas_completas(queryset)), [])
+
+
+@skipIf(connection.vendor == 'postgresql', 'En PostgreSQL el conteo puede ser una estimación')
+class ConteosTests(TestCase):
+    """Sin estimaciones del planificador, contar_aproximado es COUNT(*) exacto"""
+
+    @classmethod
+    def setUpTestData(cls):
+        sembrar_vehiculos(300, marcas=5)
+
+    def _consultas(self):
+        marca = Marca.objects.values_list('pk', flat=True).first()
+        catalogo = VehiculoCatalogo.objects.all()
+        yield 'inventario: sin filtros', Vehiculo.objects.all()
+        yield 'inventario: disponibles', Vehiculo.objects.filter(disponible=True)
+        yield 'inventario: marca', Vehiculo.objects.filter(marca_id=marca)
+        yield 'catalogo: sin filtros', catalogo
+        yield 'catalogo: años 2010-2015', aplicar_filtros(catalogo, {'anio_min': '2010', 'anio_max': '2015'})
+        yield 'catalogo: marca', aplicar_filtros(catalogo, {'marca': str(marca)})
+        yield 'catalogo: sin resultados', aplicar_filtros(catalogo, {'anio_min': '2030'})
+
+    def test_conteos_coinciden_con_count(self):
+        for nombre, queryset in self._consultas():
+            real = queryset.count()
+            # umbral=0: cualquier estimación disponible se usaría
+            for umbral in (0, None):
+                with self.subTest(consulta=nombre, umbral=umbral):
+                    self.assertEqual(contar_aproximado(queryset, umbral), (real, False))
+                    paginador = PaginadorAproximado(queryset.order_by('pk'), 25, umbral=umbral)
+                    self.assertEqual(paginador.count, real)
+                    self.assertFalse(paginador.aproximado)
+                    self.assertEqual(paginador.num_pages, max(1, -(-real // 25)))
+                    ultima = paginador.page(paginador.num_pages)
+                    self.assertEqual(len(ultima), real - 25 * (paginador.num_pages - 1))
+        self.assertGreater(Vehiculo.objects.count(), 0)
+
+
+@ajustes_de_prueba
+class FacetasTests(TestCase):
+    """Cada conteo de obtener_facetas coincide con un .count() sin la propia faceta"""
+    CAMPOS = {
+        'marca': ('marca_id',),
+        'condicion': ('condicion',),
+        'atributo': ('atributos',),
+        'anio': ('anio__gte', 'anio__lte'),
+        'precio': ('precio__gte', 'precio__lte'),
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        aleatorio = random.Random(3)
+        vehiculos = sembrar_vehiculos(200, marcas=4)
+        cls.condiciones = [Condicion.objects.create(nombre=nombre) for nombre in ('Nuevo', 'Usado', 'Seminuevo')]
+        cls.atributos = [Atributo.objects.create(nombre=nombre) for nombre in ('Aire', 'GPS', 'Techo')]
+        Vehiculo.condicion.through.objects.bulk_create([
+            Vehiculo.condicion.through(vehiculo=vehiculo, condicion=aleatorio.choice(cls.condiciones))
+            for vehiculo in vehiculos
+        ])
+        Vehiculo.atributos.through.objects.bulk_create([
+            Vehiculo.atributos.through(vehiculo=vehiculo, atributo=atributo)
+            for vehiculo in vehiculos for atributo in cls.atributos if aleatorio.random() < 0.4
+        ])
+        cls.marca = Marca.objects.order_by('pk').first()
+
+    def setUp(self):
+        cache.clear()
+
+    def _combinaciones(self):
+        yield {}
+        yield {'marca': str(self.marca.pk)}
+        yield {'marca': str(self.marca.pk), 'condicion': str(self.condiciones[0].pk)}
+        yield {'atributo': str(self.atributos[1].pk), 'anio_min': '2010'}
+        yield {'condicion': str(self.condiciones[1].pk), 'precio_min': '10000000', 'precio_max': '40000000'}
+        yield {'anio_min': '2000', 'anio_max': '2014', 'atributo': str(self.atributos[0].pk)}
+
+    def _contar(self, filtros, sin, **extra):
+        """.count() de los disponibles con los filtros de la URL salvo la faceta `sin`"""
+        condiciones = {
+            'marca_id': filtros.get('marca'),
+            'condicion': filtros.get('condicion'),
+            'atributos': filtros.get('atributo'),
+            'anio__gte': filtros.get('anio_min'),
+            'anio__lte': filtros.get('anio_max'),
+            'precio__gte': filtros.get('precio_min'),
+            'precio__lte': filtros.get('precio_max'),
+        }
+        condiciones = {
+            campo: valor for campo, valor in condiciones.items()
+            if valor is not None and campo not in self.CAMPOS[sin]
+        }
+        return Vehiculo.objects.filter(disponible=True, **condiciones, **extra).count()
+
+    def _rango(self, campo, minimo, maximo):
+        extra = {}
+        if minimo is not None:
+            extra[f'{campo}__gte'] = minimo
+        if maximo is not None:
+            extra[f'{campo}__lte'] = maximo
+        return extra
+
+    def test_conteos_coinciden_con_count(self):
+        for filtros in self._combinaciones():
+            facetas = obtener_facetas(filtros)
+            with self.subTest(filtros=filtros):
+                for faceta, sin, campo in (
+                    ('marcas', 'marca', 'marca_id'),
+                    ('condiciones', 'condicion', 'condicion'),
+                    ('atributos', 'atributo', 'atributos'),
+                ):
+                    for opcion in facetas[faceta]:
+                        self.assertEqual(
+                            opcion['total'], self._contar(filtros, sin, **{campo: opcion['id']}), opcion['nombre']
+                        )
+                for faceta, sin in (('anios', 'anio'), ('precios', 'precio')):
+                    for rango in facetas[faceta]:
+                        esperado = self._contar(filtros, sin, **self._rango(sin, rango['min'], rango['max']))
+                        self.assertEqual(rango['total'], esperado, rango['etiqueta'])
+
+    def test_el_filtro_activo_no_restringe_su_faceta(self):
+        sin_filtro = obtener_facetas({})['marcas']
+        con_marca = obtener_facetas({'marca': str(self.marca.pk)})['marcas']
+        self.assertEqual(con_marca, sin_filtro)
+        self.assertGreater(sum(1 for opcion in con_marca if opcion['total'] and opcion['id'] != self.marca.pk), 0)
+        # El resto de las facetas sí queda restringido a la marca
+        anios = obtener_facetas({'marca': str(self.marca.pk)})['anios']
+        self.assertEqual(sum(rango['total'] for rango in anios), self._contar({'marca': str(self.marca.pk)}, 'anio'))
+        self.assertLess(sum(rango['total'] for rango in anios), Vehiculo.objects.filter(disponible=True).count())
+
+
+@ajustes_de_prueba
+class CacheCompartidaTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_por_defecto_la_cache_es_compartida(self):
+        self.assertTrue(cache_compartida())
+        self.assertTrue(self.client.get('/catalogo/').has_header('ETag'))
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_cache_por_proceso_desactiva_lo_versionado(self):
+        self.assertFalse(cache_compartida())
+        sembrar_vehiculos(3, marcas=1)
+        self.assertTrue(VehiculoCatalogo.objects.exists())
+        respuesta = self.client.get('/catalogo/')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertFalse(respuesta.has_header('ETag'))
+        self.assertEqual(respuesta.content.count(b'product-card '), VehiculoCatalogo.objects.count())
+        # Sin versión compartida nada se reutiliza: el cambio se ve enseguida
+        VehiculoCatalogo.objects.all().delete()
+        self.assertEqual(self.client.get('/catalogo/').content.count(b'product-card '), 0)
+
+
+@ajustes_de_prueba
+class TarjetasTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.condicion = Condicion.objects.create(nombre='Seminuevo')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.marca = Marca.objects.create(nombre='Toyota')
+            self.vehiculo = Vehiculo.objects.create(marca=self.marca, modelo='Corolla', anio=2020, precio=15000)
+            self.vehiculo.condicion.add(self.condicion)
+
+    def _tarjeta(self):
+        return str(renderizar_tarjetas(VehiculoCatalogo.objects.filter(pk=self.vehiculo.pk))[0])
+
+    def test_renombrar_marca_cambia_la_tarjeta(self):
+        self.assertIn('Toyota Corolla', self._tarjeta())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.marca.nombre = 'Lexus'
+            self.marca.save()
+        self.assertIn('Lexus Corolla', self._tarjeta())
+
+    def test_quitar_condicion_cambia_la_tarjeta(self):
+        self.assertIn('Seminuevo', self._tarjeta())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.vehiculo.condicion.remove(self.condicion)
+        self.assertNotIn('Seminuevo', self._tarjeta())
+
+
+@ajustes_de_prueba
+class ResumenIncrementalTests(TestCase):
+    """Cada cambio suma su diferencia y deja el resumen igual a recalcularlo"""
+
+    def setUp(self):
+        self.toyota, self.ford = Marca.objects.create(nombre='Toyota'), Marca.objects.create(nombre='Ford')
+        self.nuevo, self.usado = Condicion.objects.create(nombre='Nuevo'), Condicion.objects.create(nombre='Usado')
+
+    def _filas(self):
+        return sorted(ResumenInventario.objects.values_list(
+            'marca_id', 'condicion_id', 'total', 'disponibles', 'suma_precios', 'precio_min', 'precio_max',
+        ), key=repr)
+
+    def assertResumenCompleto(self):
+        incremental = self._filas()
+        reconstruir_resumen()
+        self.assertEqual(incremental, self._filas())
+
+    def test_cambios_de_un_vehiculo(self):
+        with mock.patch('autos.resumen._rehacer_filas') as rehacer, self.captureOnCommitCallbacks(execute=True):
+            corolla = Vehiculo.objects.create(marca=self.toyota, modelo='Corolla', anio=2020, precio=15000)
+            yaris = Vehiculo.objects.create(marca=self.toyota, modelo='Yaris', anio=2021, precio=9000)
+            corolla.condicion.add(self.nuevo, self.usado)
+            yaris.condicion.add(self.usado)
+        rehacer.assert_not_called()  # ningún guardado individual recalcula la marca
+        self.assertResumenCompleto()
+
+        pasos = [
+            lambda: setattr(yaris, 'precio', 7000) or yaris.save(),        # nuevo mínimo
+            lambda: setattr(yaris, 'precio', 20000) or yaris.save(),       # el mínimo se va
+            lambda: setattr(corolla, 'disponible', False) or corolla.save(),
+            lambda: setattr(corolla, 'marca', self.ford) or corolla.save(),
+            lambda: corolla.condicion.remove(self.usado, self.nuevo),
+            lambda: self.usado.vehiculos.add(corolla),
+            lambda: self.usado.vehiculos.remove(yaris),
+            lambda: yaris.condicion.remove(self.nuevo),                    # sin relación: no resta
+            lambda: self.usado.vehiculos.clear(),
+            lambda: yaris.condicion.set([self.nuevo]),
+            lambda: yaris.delete(),
+            lambda: self.ford.delete(),
+        ]
+        for numero, paso in enumerate(pasos):
+            with self.subTest(paso=numero):
+                with self.captureOnCommitCallbacks(execute=True):
+                    paso()
+                self.assertResumenCompleto()
+
+    def test_las_acciones_masivas_recalculan(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            vehiculo = Vehiculo.objects.create(marca=self.toyota, modelo='Hilux', anio=2019, precio=30000)
+            cambiar_disponibilidad([vehiculo.pk], False)
+        self.assertResumenCompleto()
+        self.assertEqual(ResumenInventario.objects.get(marca=self.toyota, condicion=None).disponibles, 0)
+
+
+@ajustes_de_prueba
+class AccionesMasivasTests(TestCase):
+    def setUp(self):
+        marca = Marca.objects.create(nombre='Toyota')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.vehiculos = [
+                Vehiculo.objects.create(marca=marca, modelo=modelo, anio=2020, precio=precio)
+                for modelo, precio in (('Corolla', 15000), ('Yaris', 9999.99))
+            ]
+        self.ids = [vehiculo.pk for vehiculo in self.vehiculos]
+
+    def _precios(self):
+        return dict(Vehiculo.objects.values_list('pk', 'precio'))
+
+    def test_ajustar_precio(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(ajustar_precio(self.ids, porcentaje=Decimal('10')), 2)
+        self.assertEqual(self._precios(), {self.ids[0]: Decimal('16500.00'), self.ids[1]: Decimal('10999.99')})
+        self.assertEqual(
+            sorted(VehiculoCatalogo.objects.values_list('precio', flat=True)), [Decimal('10999.99'), Decimal('16500.00')],
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            ajustar_precio(self.ids, monto=Decimal('-20000'))
+        # Nunca por debajo de cero; cada cambio queda en el historial
+        self.assertEqual(set(self._precios().values()), {Decimal('0.00')})
+        self.assertEqual(HistorialPrecio.objects.filter(origen='masiva').count(), 4)
+
+    def test_precio_de_varios_lotes_en_una_transaccion(self):
+        ids = self.ids + [vehiculo.pk for vehiculo in sembrar_vehiculos(TAMANO_LOTE + 10, marcas=3)]
+        antes = self._precios()
+        original, llamadas = HistorialPrecio.objects.bulk_create, []
+
+        def falla_en_el_segundo_lote(*args, **kwargs):
+            llamadas.append(1)
+            if len(llamadas) == 2:
+                raise DatabaseError('falla simulada')
+            return original(*args, **kwargs)
+
+        with mock.patch.object(HistorialPrecio.objects, 'bulk_create', side_effect=falla_en_el_segundo_lote):
+            with self.assertRaises(DatabaseError):
+                ajustar_precio(ids, porcentaje=Decimal('5'))
+        self.assertEqual(len(llamadas), 2)
+        # El primer lote tampoco quedó aplicado
+        self.assertEqual(self._precios(), antes)
+        self.assertFalse(HistorialPrecio.objects.exists())
+
+    def test_precio_que_no_entra_en_la_columna(self):
+        with self.assertRaises(ValueError):
+            ajustar_precio(self.ids, monto=PRECIO_MAXIMO)
+        self.assertEqual(self._precios()[self.ids[0]], Decimal('15000.00'))
+
+    def test_asignar_categoria(self):
+        categoria = Categoria.objects.create(nombre='Sedán')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(asignar_categoria(self.ids, categoria), 2)
+        self.assertEqual(set(Vehiculo.objects.values_list('categoria', flat=True)), {categoria.pk})
+        with self.captureOnCommitCallbacks(execute=True):
+            asignar_categoria(self.ids[:1], None)
+        self.assertIsNone(Vehiculo.objects.get(pk=self.ids[0]).categoria_id)
+
+    def test_agregar_atributos(self):
+        gps, techo = Atributo.objects.create(nombre='GPS'), Atributo.objects.create(nombre='Techo solar')
+        self.vehiculos[0].atributos.add(gps)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(agregar_atributos(self.ids, [gps, techo]), 2)
+        for vehiculo in self.vehiculos:
+            self.assertEqual(set(vehiculo.atributos.values_list('pk', flat=True)), {gps.pk, techo.pk})
+        self.assertEqual(
+            [sorted(fila) for fila in VehiculoCatalogo.objects.values_list('atributo_ids', flat=True)],
+            [sorted([gps.pk, techo.pk])] * 2,
+        )
+
+
+@ajustes_de_prueba
+class RepreciarTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        toyota, ford = Marca.objects.create(nombre='Toyota'), Marca.objects.create(nombre='Ford')
+        cls.usado = Condicion.objects.create(nombre='Usado')
+        crear = Vehiculo.objects.create
+        cls.viejo = crear(marca=toyota, modelo='Corolla', anio=2005, precio=10000, kilometraje=200000)
+        cls.nuevo = crear(marca=toyota, modelo='Yaris', anio=2024, precio=20000, kilometraje=1000)
+        cls.ford = crear(marca=ford, modelo='Focus', anio=2018, precio=8000, kilometraje=90000)
+        cls.vendido = crear(marca=ford, modelo='Fiesta', anio=2008, precio=5000, disponible=False)
+        cls.viejo.condicion.add(cls.usado)
+        cls.ford.condicion.add(cls.usado)
+
+    def _precios(self):
+        return dict(Vehiculo.objects.values_list('pk', 'precio'))
+
+    def test_simulacion_no_escribe(self):
+        antes = self._precios()
+        cambios = aplicar_reglas([{'nombre': 'Todos -10%', 'porcentaje': -10}])
+        self.assertEqual(
+            {cambio['id']: cambio['precio_nuevo'] for cambio in cambios},
+            {self.viejo.pk: Decimal('9000.00'), self.nuevo.pk: Decimal('18000.00'), self.ford.pk: Decimal('7200.00')},
+        )
+        self.assertEqual(self._precios(), antes)
+        self.assertFalse(HistorialPrecio.objects.exists())
+
+    def test_gana_la_primera_regla_que_cumple(self):
+        reglas = [
+            {'nombre': 'Antiguos', 'si': {'antiguedad__gte': 15}, 'porcentaje': -20},
+            {'nombre': 'Toyota', 'si': {'marca__nombre': 'Toyota'}, 'monto': 500},
+            {'nombre': 'Resto', 'monto': -100},
+        ]
+        cambios = {cambio['id']: (cambio['regla'], cambio['precio_nuevo']) for cambio in aplicar_reglas(reglas)}
+        self.assertEqual(cambios, {
+            self.viejo.pk: ('Antiguos', Decimal('8000.00')),
+            self.nuevo.pk: ('Toyota', Decimal('20500.00')),
+            self.ford.pk: ('Resto', Decimal('7900.00')),
+        })
+
+    def test_precio_minimo(self):
+        cambios = aplicar_reglas([{'monto': -9000, 'precio_minimo': 2000}])
+        self.assertEqual(
+            {cambio['id']: cambio['precio_nuevo'] for cambio in cambios},
+            {self.viejo.pk: Decimal('2000.00'), self.nuevo.pk: Decimal('11000.00'), self.ford.pk: Decimal('2000.00')},
+        )
+
+    def test_condicion_sobre_relacion_usa_subconsulta(self):
+        [(_, filtro, _)] = compilar_reglas([{'si': {'condicion__nombre': 'Usado'}, 'porcentaje': 5}])
+        self.assertEqual(filtro.children[0][0], 'pk__in')
+        reglas = [{'si': {'condicion__nombre': 'Usado', 'kilometraje__gte': 100000}, 'porcentaje': 5}]
+        with self.captureOnCommitCallbacks(execute=True):
+            cambios = aplicar_reglas(reglas, aplicar=True)
+        self.assertEqual([cambio['id'] for cambio in cambios], [self.viejo.pk])
+        self.assertEqual(self._precios()[self.viejo.pk], Decimal('10500.00'))
+        self.assertEqual(self._precios()[self.ford.pk], Decimal('8000.00'))
+
+    def test_aplicar_deja_historial(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            aplicar_reglas([{'nombre': 'Ford', 'si': {'marca__nombre': 'Ford'}, 'monto': 1000}],
+                           Vehiculo.objects.all(), aplicar=True)
+        historial = HistorialPrecio.objects.order_by('vehiculo_id').values_list(
+            'vehiculo_id', 'precio_anterior', 'precio_nuevo', 'origen', 'regla',
+        )
+        self.assertEqual(list(historial), [
+            (self.ford.pk, Decimal('8000.00'), Decimal('9000.00'), 'reglas', 'Ford'),
+            (self.vendido.pk, Decimal('5000.00'), Decimal('6000.00'), 'reglas', 'Ford'),
+        ])
+        self.assertEqual(VehiculoCatalogo.objects.get(pk=self.ford.pk).precio, Decimal('9000.00'))
+
+    def test_reglas_mal_formadas(self):
+        for reglas in (['-10%'], [{'si': ['anio__gte', 2010], 'porcentaje': 5}], [{'si': 'Usado', 'monto': 1}],
+                       [{'porcentaje': 'mucho'}], [{'monto': 1, 'precio_minimo': [1]}],
+                       [{'si': {'anio__in': 2010}, 'monto': 1}], [{'si': {'antiguedad__gte': 'diez'}, 'monto': 1}],
+                       [{'si': {'color': {'a': 1}}, 'monto': 1}]):
+            with self.subTest(reglas=reglas):
+                with self.assertRaises(ValueError):
+                    compilar_reglas(reglas)
+
+    def test_comando_informa_reglas_mal_formadas(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as archivo:
+            json.dump([{'si': ['anio'], 'porcentaje': 5}], archivo)
+        self.addCleanup(os.remove, archivo.name)
+        with self.assertRaisesMessage(CommandError, '"si" debe ser un objeto'):
+            call_command('repreciar', archivo.name, stdout=StringIO())
+
+
+@ajustes_de_prueba
+class CacheConcurrenteTests(TransactionTestCase):
+    """Un fallo de caché o un valor vencido se calculan una sola vez aunque lleguen juntos"""
+    HILOS = 20
+
+    def setUp(self):
+        cache.clear()
+        sembrar_vehiculos(30, marcas=3)
+
+    def _en_paralelo(self, funcion):
+        barrera = threading.Barrier(self.HILOS)
+
+        def tarea():
+            barrera.wait()
+            try:
+                return funcion()
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(self.HILOS) as ejecutor:
+            return [futuro.result() for futuro in [ejecutor.submit(tarea) for _ in range(self.HILOS)]]
+
+    def _render_contado(self):
+        """Reemplaza views.render para contar cuántas veces corre el cuerpo de una vista"""
+        ejecuciones = []
+
+        def render(*args, **kwargs):
+            ejecuciones.append(1)
+            time.sleep(0.2)
+            return render_original(*args, **kwargs)
+
+        render_original = views.render
+        parche = mock.patch.object(views, 'render', render)
+        parche.start()
+        self.addCleanup(parche.stop)
+        return ejecuciones
+
+    def test_fallos_simultaneos(self):
+        ejecuciones = []
+
+        def calcular():
+            ejecuciones.append(1)
+            time.sleep(0.3)
+            return 'valor'
+
+        resultados = self._en_paralelo(lambda: obtener_con_revalidacion('prueba:fallos', calcular, frescura=60))
+        self.assertEqual(set(resultados), {'valor'})
+        self.assertEqual(len(ejecuciones), 1)
+
+    def test_valor_vencido_se_sirve_y_se_refresca_una_vez(self):
+        obtener_con_revalidacion('prueba:vencido', lambda: 'viejo', frescura=0.1, timeout=60)
+        time.sleep(0.2)
+        ejecuciones = []
+
+        def calcular():
+            ejecuciones.append(1)
+            time.sleep(0.3)
+            return 'nuevo'
+
+        inicio = time.perf_counter()
+        resultados = self._en_paralelo(lambda: obtener_con_revalidacion('prueba:vencido', calcular, frescura=60))
+        self.assertLess(time.perf_counter() - inicio, 0.3)
+        self.assertEqual(set(resultados), {'viejo'})
+        time.sleep(0.5)
+        self.assertEqual(len(ejecuciones), 1)
+        self.assertEqual(obtener_con_revalidacion('prueba:vencido', calcular, frescura=60), 'nuevo')
+
+    def test_destacados_de_otra_version_se_sirven_y_se_refrescan(self):
+        self.assertEqual(Client().get('/').status_code, 200)
+        self.assertEqual(cache.get('index:destacados')[0][1], version_inventario())
+        Vehiculo.objects.create(marca=Marca.objects.first(), modelo='Recién llegado', anio=2025, precio=1_000_000)
+        version = version_inventario()
+
+        # La clave no cambia: se sirve el bloque anterior sin guardar la página
+        respuesta = Client().get('/')
+        self.assertNotContains(respuesta, 'Recién llegado')
+        self.assertIn('no-cache', respuesta['Cache-Control'])
+        limite = time.monotonic() + 5
+        while cache.get('index:destacados')[0][1] != version and time.monotonic() < limite:
+            time.sleep(0.05)
+        self.assertEqual(cache.get('index:destacados')[0][1], version)
+
+        respuesta = Client().get('/')
+        self.assertContains(respuesta, 'Recién llegado')
+        self.assertFalse(respuesta.has_header('Cache-Control'))
+
+    def test_listado_en_paralelo(self):
+        ejecuciones = self._render_contado()
+        estados = self._en_paralelo(lambda: Client().get('/catalogo/').status_code)
+        self.assertEqual(set(estados), {200})
+        self.assertEqual(len(ejecuciones), 1)
+
+    def test_detalle_en_paralelo(self):
+        vehiculo = Vehiculo.objects.first()
+        purgar_detalles([vehiculo.pk])
+        ejecuciones = self._render_contado()
+        estados = self._en_paralelo(lambda: Client().get(f'/vehiculo/{vehiculo.pk}/').status_code)
+        self.assertEqual(set(estados), {200})
+        self.assertEqual(len(ejecuciones), 1)
+
+
+@ajustes_de_prueba
+class AdminConsultasTests(TestCase):
+    """
+    Las páginas del admin de vehículos y detalles hacen una cantidad fija de
+    consultas (un N+1 sumaría una por fila) y no listan filas con SELECT
+    DISTINCT (el de las opciones del filtro por año es aparte y usa su índice).
+    Sembrar 50.000 filas haría el test muy lento y en SQLite no hay
+    estimación del planificador: el caso de una tabla grande se simula
+    reemplazando estimar_filas.
+    """
+    FILAS_DISTINCT = re.compile(r'SELECT DISTINCT\s+"autos_(vehiculo|detallevehiculo)"\."id"', re.IGNORECASE)
+
+    @classmethod
+    def setUpTestData(cls):
+        vehiculos = sembrar_vehiculos(120, marcas=5)
+        condiciones = [Condicion.objects.create(nombre=nombre) for nombre in ('Nuevo', 'Usado', 'Seminuevo')]
+        detalles = DetalleVehiculo.objects.bulk_create(
+            [DetalleVehiculo(dimensiones=f'{400 + numero} cm') for numero in range(len(vehiculos))]
+        )
+        for vehiculo, detalle in zip(vehiculos, detalles):
+            vehiculo.detalles = detalle
+        Vehiculo.objects.bulk_update(vehiculos, ['detalles'])
+        Relacion = Vehiculo.condicion.through
+        Relacion.objects.bulk_create([
+            Relacion(vehiculo_id=vehiculo.pk, condicion_id=condiciones[numero % 3].pk)
+            for numero, vehiculo in enumerate(vehiculos)
+        ])
+        cls.vehiculo, cls.condicion = vehiculos[-1], condiciones[0]
+        cls.usuario = get_user_model().objects.create_superuser('admin-consultas', 'admin@example.com', 'x')
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def _verificar(self, url, consultas):
+        with CaptureQueriesContext(connection) as capturadas, self.assertNumQueries(consultas):
+            respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 200)
+        distinct = [c['sql'] for c in capturadas.captured_queries if self.FILAS_DISTINCT.search(c['sql'])]
+        self.assertEqual(distinct, [])
+
+    def _paginas(self):
+        listado = reverse('admin:autos_vehiculo_changelist')
+        yield listado, 7
+        yield f'{listado}?p=2', 7
+        yield f'{listado}?condicion={self.condicion.pk}', 7
+        yield f'{listado}?q=Modelo', 7
+        yield reverse('admin:autos_vehiculo_change', args=[self.vehiculo.pk]), 10
+        yield reverse('admin:autos_vehiculo_add'), 2
+        yield reverse('admin:autos_detallevehiculo_changelist'), 4
+        yield reverse('admin:autos_detallevehiculo_change', args=[self.vehiculo.detalles_id]), 4
+        yield reverse('admin:autocomplete') + '?app_label=autos&model_name=vehiculo&field_name=detalles&term=cm', 4
+
+    def test_consultas_por_pagina(self):
+        for url, consultas in self._paginas():
+            with self.subTest(url=url):
+                self._verificar(url, consultas)
+
+    def test_tabla_grande_usa_el_total_estimado(self):
+        with mock.patch('autos.paginacion.estimar_filas', return_value=50_000):
+            for nombre, tabla in (('vehiculo', 'autos_vehiculo'), ('detallevehiculo', 'autos_detallevehiculo')):
+                with self.subTest(modelo=nombre), CaptureQueriesContext(connection) as capturadas:
+                    respuesta = self.client.get(reverse(f'admin:autos_{nombre}_changelist'), {'p': 2})
+                    self.assertEqual(respuesta.status_code, 200)
+                    paginador = respuesta.context['cl'].paginator
+                    self.assertIsInstance(paginador, PaginadorAproximado)
+                    self.assertTrue(paginador.aproximado)
+                    self.assertEqual(paginador.count, 50_000)
+                    self.assertEqual(paginador.num_pages, 500)
+                    # Las filas de la página salen de la tabla real (120)
+                    self.assertEqual(len(respuesta.context['cl'].result_list), 20)
+                    # Ni el total filtrado ni el total sin filtros se cuentan
+                    conteos = [
+                        c['sql'] for c in capturadas.captured_queries
+                        if 'COUNT(' in c['sql'].upper() and f'FROM "{tabla}"' in c['sql']
+                    ]
+                    self.assertEqual(conteos, [])
+
+
+def imagen_de_prueba(ancho=800, alto=600, color='navy'):
+    """JPEG en memoria para subir como Vehiculo.imagen"""
+    contenido = BytesIO()
+    Image.new('RGB', (ancho, alto), color).save(contenido, 'JPEG')
+    return ContentFile(contenido.getvalue(), name='foto.jpg')
+
+
+def usar_media_temporal(caso):
+    """MEDIA_ROOT en una carpeta temporal durante el test; devuelve el storage de imágenes"""
+    carpeta = tempfile.TemporaryDirectory(prefix='autos-tests-media-')
+    caso.addCleanup(carpeta.cleanup)
+    ajustes = override_settings(MEDIA_ROOT=carpeta.name)
+    ajustes.enable()
+    caso.addCleanup(ajustes.disable)
+    return almacenamiento_imagenes()
+
+
+class MiniaturasTests(TestCase):
+    def setUp(self):
+        self.storage = usar_media_temporal(self)
+
+    def test_derivadas_por_contenido(self):
+        nombre = self.storage.save('vehiculos/foto.jpg', imagen_de_prueba())
+        derivadas = generar_derivadas(nombre)
+        self.assertEqual(set(derivadas), {'webp', 'jpg'})
+        for por_ancho in derivadas.values():
+            self.assertEqual(set(por_ancho), {str(ancho) for ancho in ANCHOS_MINIATURA if ancho < 800})
+            for derivada in por_ancho.values():
+                self.assertTrue(derivada.startswith('vehiculos/miniaturas/'), derivada)
+                self.assertTrue(es_nombre_por_contenido(derivada), derivada)
+                self.assertTrue(self.storage.exists(derivada))
+        # Regenerar da los mismos archivos, sin copias ni sufijos
+        self.assertEqual(generar_derivadas(nombre), derivadas)
+
+    def test_limpieza_conserva_miniaturas_compartidas(self):
+        nombre = self.storage.save('vehiculos/foto.jpg', imagen_de_prueba())
+        otra = self.storage.save('vehiculos/otra.jpg', imagen_de_prueba(color='red'))
+        derivadas = generar_derivadas(nombre)
+        compartidas = {derivada for por_ancho in derivadas.values() for derivada in por_ancho.values()}
+        marca = Marca.objects.create(nombre='Toyota')
+        # Sin señales: los dos vehículos apuntan a la misma imagen y las mismas derivadas
+        primero, segundo = Vehiculo.objects.bulk_create([
+            Vehiculo(marca=marca, modelo=modelo, anio=2020, precio=15000, imagen=nombre, miniaturas=derivadas)
+            for modelo in ('Corolla', 'Yaris')
+        ])
+        Vehiculo.objects.filter(pk=primero.pk).update(imagen=otra, miniaturas={})
+
+        huerfanos, _ = limpiar_media(aplicar=True, pausa=0, gracia=timedelta(0))
+        self.assertEqual(set(huerfanos) & (compartidas | {nombre}), set())
+        for archivo in compartidas | {nombre, otra}:
+            self.assertTrue(self.storage.exists(archivo), archivo)
+
+        # Sin ningún vehículo que las liste, se borran
+        Vehiculo.objects.filter(pk=segundo.pk).update(imagen=otra, miniaturas={})
+        huerfanos, _ = limpiar_media(aplicar=True, pausa=0, gracia=timedelta(0))
+        self.assertEqual(set(huerfanos), compartidas | {nombre})
+        self.assertFalse(any(self.storage.exists(archivo) for archivo in compartidas | {nombre}))
+        self.assertTrue(self.storage.exists(otra))
+
+    def test_comando_sigue_si_una_imagen_falla(self):
+        marca = Marca.objects.create(nombre='Toyota')
+        grande, chica = Vehiculo.objects.bulk_create([
+            Vehiculo(marca=marca, modelo=modelo, anio=2020, precio=15000,
+                     imagen=self.storage.save(f'vehiculos/{modelo}.jpg', imagen_de_prueba(ancho, ancho)))
+            for modelo, ancho in (('Hilux', 200), ('Yaris', 40))
+        ])
+        # Más del doble de MAX_IMAGE_PIXELS: PIL lanza DecompressionBombError,
+        # que no es OSError. Los procesos del pool heredan los parches (fork)
+        salida = StringIO()
+        with mock.patch.object(Image, 'MAX_IMAGE_PIXELS', 5000), \
+                mock.patch.object(generar_miniaturas.logger, 'exception'):
+            call_command('generar_miniaturas', procesos=1, stdout=salida)
+        self.assertIn('Miniaturas generadas: 1; imágenes con error: 1.', salida.getvalue())
+        grande.refresh_from_db()
+        chica.refresh_from_db()
+        self.assertEqual(grande.miniaturas, {})
+        self.assertEqual(set(chica.miniaturas), {'webp', 'jpg'})
+
+
+@ajustes_de_prueba
+class ColaImagenesTests(TransactionTestCase):
+    def setUp(self):
+        self.storage = usar_media_temporal(self)
+        self.marca = Marca.objects.create(nombre='Toyota')
+
+    def _vehiculo(self, imagen=None, modelo='Corolla'):
+        return Vehiculo.objects.create(marca=self.marca, modelo=modelo, anio=2020, precio=15000, imagen=imagen)
+
+    def _encolados(self, cantidad):
+        # Sin señales: solo los trabajos, con vehículos sin imagen
+        vehiculo = self._vehiculo()
+        return TrabajoImagen.objects.bulk_create([
+            TrabajoImagen(vehiculo=vehiculo, imagen=f'vehiculos/{numero}.jpg', disponible_desde=timezone.now())
+            for numero in range(cantidad)
+        ])
+
+    @skipUnless(connection.features.has_select_for_update_skip_locked, 'Escrituras concurrentes (PostgreSQL)')
+    def test_workers_en_paralelo_no_toman_el_mismo_trabajo(self):
+        self._encolados(40)
+        barrera = threading.Barrier(4)
+
+        def worker():
+            barrera.wait()
+            tomados = []
+            try:
+                while lote := tomar_trabajos(3):
+                    tomados.extend(trabajo.pk for trabajo in lote)
+            finally:
+                connections.close_all()
+            return tomados
+
+        with ThreadPoolExecutor(4) as ejecutor:
+            por_worker = [futuro.result() for futuro in [ejecutor.submit(worker) for _ in range(4)]]
+        tomados = list(itertools.chain.from_iterable(por_worker))
+        self.assertEqual(sorted(tomados), sorted(set(tomados)))
+        self.assertEqual(len(tomados), 40)
+        self.assertEqual(set(TrabajoImagen.objects.values_list('intentos', flat=True)), {1})
+
+    def test_sin_skip_locked_un_trabajo_ya_tomado_no_se_reclama(self):
+        trabajos = self._encolados(6)
+        ajenos = [trabajo.pk for trabajo in trabajos[:3]]
+        otro_worker = []
+
+        def tomar_antes(execute, sql, params, many, context):
+            # Otro worker reclama tres trabajos entre la lectura y el primer UPDATE
+            if sql.startswith('UPDATE') and not otro_worker:
+                otro_worker.append(True)
+                TrabajoImagen.objects.filter(pk__in=ajenos).update(estado='procesando')
+            return execute(sql, params, many, context)
+
+        with mock.patch.object(connection.features, 'has_select_for_update_skip_locked', False), \
+                connection.execute_wrapper(tomar_antes):
+            tomados = tomar_trabajos(6)
+        self.assertEqual([trabajo.pk for trabajo in tomados], [trabajo.pk for trabajo in trabajos[3:]])
+        self.assertEqual(
+            dict(TrabajoImagen.objects.values_list('pk', 'intentos')),
+            {trabajo.pk: int(trabajo.pk not in ajenos) for trabajo in trabajos},
+        )
+
+    def test_reintentos_con_espera_creciente_y_fallo_final(self):
+        self._encolados(1)
+        vehiculo = Vehiculo.objects.get()
+        Vehiculo.objects.filter(pk=vehiculo.pk).update(imagen='vehiculos/0.jpg', estado_imagen='pendiente')
+        esperas = []
+        for intento in range(1, MAX_INTENTOS + 1):
+            [trabajo] = tomar_trabajos(5)
+            self.assertEqual(trabajo.intentos, intento)
+            self.assertEqual(tomar_trabajos(5), [])  # ya está tomado
+            antes = timezone.now()
+            cambiado = fallar(trabajo, OSError('imagen ilegible'))
+            trabajo.refresh_from_db()
+            if intento < MAX_INTENTOS:
+                self.assertFalse(cambiado)
+                self.assertEqual(trabajo.estado, 'pendiente')
+                self.assertEqual(trabajo.error, 'imagen ilegible')
+                esperas.append(trabajo.disponible_desde - antes)
+                self.assertEqual(tomar_trabajos(5), [])  # todavía esperando
+                TrabajoImagen.objects.filter(pk=trabajo.pk).update(disponible_desde=timezone.now())
+        self.assertTrue(cambiado)
+        self.assertEqual(trabajo.estado, 'fallido')
+        self.assertEqual(Vehiculo.objects.get(pk=vehiculo.pk).estado_imagen, 'fallida')
+        # Cada espera duplica la anterior
+        for anterior, siguiente in itertools.pairwise(esperas):
+            self.assertAlmostEqual(siguiente / anterior, 2, places=1)
+        self.assertGreaterEqual(esperas[0], ESPERA_REINTENTO - timedelta(seconds=1))
+
+    def test_trabajos_colgados_vuelven_a_la_cola(self):
+        colgado, reciente, agotado = self._encolados(3)
+        tomar_trabajos(3)
+        hace_rato = timezone.now() - TIEMPO_MAXIMO - timedelta(minutes=1)
+        TrabajoImagen.objects.filter(pk__in=[colgado.pk, agotado.pk]).update(iniciado=hace_rato)
+        TrabajoImagen.objects.filter(pk=agotado.pk).update(intentos=MAX_INTENTOS)
+        recuperar_colgados()
+        estados = dict(TrabajoImagen.objects.values_list('pk', 'estado'))
+        self.assertEqual(estados, {colgado.pk: 'pendiente', reciente.pk: 'procesando', agotado.pk: 'fallido'})
+        TrabajoImagen.objects.filter(pk=colgado.pk).update(disponible_desde=timezone.now())
+        self.assertEqual([trabajo.pk for trabajo in tomar_trabajos(3)], [colgado.pk])
+
+    def test_el_worker_genera_las_miniaturas(self):
+        vehiculo = self._vehiculo(imagen_de_prueba())
+        self.assertEqual(vehiculo.estado_imagen, 'pendiente')
+        self.assertEqual(TrabajoImagen.objects.filter(estado='pendiente').count(), 1)
+        call_command('procesar_imagenes', '--una-vez', '--procesos', '1', stdout=StringIO())
+        vehiculo.refresh_from_db()
+        self.assertEqual(vehiculo.estado_imagen, 'lista')
+        self.assertEqual(set(vehiculo.miniaturas), {'webp', 'jpg'})
+        self.assertEqual(TrabajoImagen.objects.get().estado, 'listo')
+        self.assertEqual(VehiculoCatalogo.objects.get(pk=vehiculo.pk).imagen_srcset.keys(), {'webp', 'jpg'})
+
+    def test_se_reutilizan_las_derivadas_existentes(self):
+        primero = self._vehiculo(imagen_de_prueba())
+        segundo = self._vehiculo(imagen_de_prueba(), modelo='Yaris')
+        self.assertEqual(primero.imagen.name, segundo.imagen.name)  # mismo contenido, mismo archivo
+        self.assertEqual(TrabajoImagen.objects.filter(estado='pendiente').count(), 2)
+        derivadas = generar_derivadas(primero.imagen.name)
+        completar(TrabajoImagen.objects.get(vehiculo=primero), derivadas)
+
+        # El trabajo del segundo no pasa por el pool de procesos
+        procesos = mock.Mock()
+        comando = ProcesarImagenes(stdout=StringIO())
+        self.assertEqual(comando._procesar(procesos, tomar_trabajos(5)), (1, 0))
+        procesos.submit.assert_not_called()
+        segundo.refresh_from_db()
+        self.assertEqual((segundo.estado_imagen, segundo.miniaturas), ('lista', derivadas))
+
+        # Y un tercero con la misma imagen ya no se encola
+        tercero = self._vehiculo(imagen_de_prueba(), modelo='Etios')
+        self.assertEqual((tercero.estado_imagen, tercero.miniaturas), ('lista', derivadas))
+        self.assertFalse(TrabajoImagen.objects.filter(vehiculo=tercero).exists())
+
+
+class MediaTests(SimpleTestCase):
+    CONTENIDO = bytes(range(256)) * 4
+
+    def setUp(self):
+        self.storage = usar_media_temporal(self)
+        self.nombre = self.storage.save('vehiculos/ficha.bin', ContentFile(self.CONTENIDO))
+        self.url = f'{settings.MEDIA_URL}{self.nombre}'
+
+    def test_archivo_completo(self):
+        respuesta = self.client.get(self.url)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(b''.join(respuesta.streaming_content), self.CONTENIDO)
+        self.assertEqual(respuesta['Content-Length'], str(len(self.CONTENIDO)))
+        self.assertEqual(respuesta['Accept-Ranges'], 'bytes')
+        # Nombre por contenido: nunca cambia
+        self.assertEqual(respuesta['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(respuesta['ETag'], f'"{self.nombre.rsplit("/", 1)[1].split(".")[0]}"')
+
+    def test_rango(self):
+        for cabecera, inicio, fin in (('bytes=10-19', 10, 19), ('bytes=1000-', 1000, 1023), ('bytes=-4', 1020, 1023)):
+            with self.subTest(rango=cabecera):
+                respuesta = self.client.get(self.url, HTTP_RANGE=cabecera)
+                self.assertEqual(respuesta.status_code, 206)
+                self.assertEqual(respuesta['Content-Range'], f'bytes {inicio}-{fin}/1024')
+                self.assertEqual(respuesta['Content-Length'], str(fin - inicio + 1))
+                self.assertEqual(b''.join(respuesta.streaming_content), self.CONTENIDO[inicio:fin + 1])
+
+    def test_rango_imposible(self):
+        respuesta = self.client.get(self.url, HTTP_RANGE='bytes=2000-2100')
+        self.assertEqual(respuesta.status_code, 416)
+        self.assertEqual(respuesta['Content-Range'], 'bytes */1024')
+
+    def test_if_range_distinto_envia_todo(self):
+        respuesta = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"otra-version"')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(b''.join(respuesta.streaming_content), self.CONTENIDO)
+        etag = respuesta['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=etag).status_code, 206)
+
+    def test_if_none_match(self):
+        etag = self.client.get(self.url)['ETag']
+        respuesta = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 304)
+        self.assertEqual(respuesta['ETag'], etag)
+        self.assertEqual(respuesta.content, b'')
+
+    def test_rutas_fuera_de_media(self):
+        afuera = os.path.join(os.path.dirname(settings.MEDIA_ROOT), 'secreto.txt')
+        with open(afuera, 'w') as archivo:
+            archivo.write('secreto')
+        self.addCleanup(os.remove, afuera)
+        for ruta in ('../secreto.txt', 'vehiculos/../../secreto.txt', '%2e%2e/secreto.txt', '/etc/passwd',
+                     'tmp/algo', '.oculto', 'vehiculos/no-existe.jpg', 'vehiculos'):
+            with self.subTest(ruta=ruta):
+                self.assertEqual(self.client.get(f'{settings.MEDIA_URL}{ruta}').status_code, 404)
+                # También llamando a la vista directo, sin la normalización de la URL
+                with self.assertRaises(Http404):
+                    servir_media(RequestFactory().get('/'), ruta)
+
+    @override_settings(MEDIA_SENDFILE='x-accel-redirect', MEDIA_ACCEL_PREFIX='/media-interna/')
+    def test_x_accel_redirect(self):
+        respuesta = self.client.get(self.url)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta['X-Accel-Redirect'], f'/media-interna/{self.nombre}')
+        self.assertEqual(respuesta.content, b'')
+        self.assertIn('ETag', respuesta)
+
+
+@ajustes_de_prueba
+class CachePaginasTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_la_pagina_se_genera_con_una_peticion_anonima_nueva(self):
+        recibidas = []
+
+        @cache_listado
+        def vista(request):
+            recibidas.append(request)
+            return HttpResponse(request.get_full_path())
+
+        original = RequestFactory().get('/catalogo/', {'marca': '1'})
+        original.user = AnonymousUser()
+        original.marcador = 'estado de esta petición'
+        respuesta = vista(original)
+        self.assertEqual(respuesta.content, b'/catalogo/?marca=1')
+        self.assertEqual(len(recibidas), 1)
+        self.assertIsNot(recibidas[0], original)
+        self.assertFalse(hasattr(recibidas[0], 'marcador'))
+        self.assertFalse(recibidas[0].user.is_authenticated)
+        # La segunda sale de la caché, sin llamar a la vista
+        self.assertEqual(vista(original).content, b'/catalogo/?marca=1')
+        self.assertEqual(len(recibidas), 1)
+
+
+@ajustes_de_prueba
+class RespuestasCondicionalesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.marca = Marca.objects.create(nombre='Toyota')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.vehiculo = Vehiculo.objects.create(marca=self.marca, modelo='Corolla', anio=2020, precio=20_000_000)
+        self.urls = (reverse('catalogo'), reverse('detalle_vehiculo', args=[self.vehiculo.pk]))
+
+    def _etags(self):
+        return [self.client.get(url)['ETag'] for url in self.urls]
+
+    def test_etag_coincidente_da_304(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                respuesta = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(respuesta.status_code, 304)
+                self.assertEqual(respuesta.content, b'')
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='"otra"').status_code, 200)
+
+    def test_editar_el_vehiculo_cambia_la_etag(self):
+        antes = self._etags()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.vehiculo.precio = 21_000_000
+            self.vehiculo.save()
+        despues = self._etags()
+        for url, anterior, nueva in zip(self.urls, antes, despues):
+            with self.subTest(url=url):
+                self.assertNotEqual(anterior, nueva)
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=anterior).status_code, 200)
+
+    def test_renombrar_la_marca_cambia_la_etag(self):
+        antes = self._etags()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.marca.nombre = 'Toyota Motor'
+            self.marca.save()
+        despues = self._etags()
+        for url, anterior, nueva in zip(self.urls, antes, despues):
+            with self.subTest(url=url):
+                self.assertNotEqual(anterior, nueva)
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=anterior).status_code, 200)
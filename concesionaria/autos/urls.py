@@ -4,6 +4,9 @@ from . import views
 urlpatterns = [
     path('', views.index, name='index'),
     path('catalogo/', views.catalogo, name='catalogo'),
+    path('catalogo/autocompletar/', views.autocompletar_catalogo, name='autocompletar_catalogo'),
+    path('catalogo/facetas/', views.facetas_catalogo, name='facetas_catalogo'),
+    path('buscar/', views.buscar_automovil, name='buscar_automovil'),
     path('vehiculo/<int:vehiculo_id>/', views.detalle_vehiculo, name='detalle_vehiculo'),
     path('contacto/', views.contacto, name='contacto'),
     
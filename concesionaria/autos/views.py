@@ -1,60 +1,163 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from .models import Vehiculo, Marca
+from .models import Vehiculo, VehiculoCatalogo
 from .forms import VehiculoForm, ContactoForm, DetalleVehiculoForm
-from django.db.models import Q
+from .filtros import normalizar_filtros, aplicar_filtros, clave_filtros
+from .paginacion import paginar_keyset, contar_cacheado
+from .busqueda import buscar, sugerir
+from .autocompletar import autocompletar
+from .facetas import obtener_facetas
+from .cache import (
+    TIEMPO_CACHE_RESULTADOS, clave_versionada, obtener_o_calcular, obtener_con_revalidacion, renderizar_tarjetas,
+    version_inventario,
+)
+from .paginas import cache_listado, cache_detalle
+from .condicional import etag_catalogo, ultima_modificacion_catalogo, etag_detalle, ultima_modificacion_detalle
+from django.http import JsonResponse
 from django.contrib.auth.decorators import login_required
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
 
+# Paginación del catálogo público
+VEHICULOS_POR_PAGINA = 24
+ORDEN_CATALOGO = ('-fecha_ingreso', '-pk')
+ORDEN_BUSQUEDA = ('-relevancia',) + ORDEN_CATALOGO
+LIMITE_AUTOCOMPLETADO = 10
+
+@cache_listado
 def index(request):
     """Página de inicio con vehículos destacados"""
-    vehiculos_destacados = Vehiculo.objects.filter(disponible=True).order_by('-fecha_ingreso')[:6]
-    return render(request, 'index.html', {'vehiculos_destacados': vehiculos_destacados})
+    # Bloque "destacados" compartido por anónimos y autenticados, en una
+    # clave fija con la versión del inventario dentro del valor: al cambiar
+    # se sigue sirviendo el anterior mientras un solo request lo recalcula
+    version = version_inventario()
+    tarjetas_destacadas, version_destacadas = obtener_con_revalidacion(
+        'index:destacados',
+        lambda: (renderizar_tarjetas(VehiculoCatalogo.objects.order_by(*ORDEN_CATALOGO)[:6]), version),
+        vigente=lambda guardado: guardado[1] == version,
+    )
+    respuesta = render(request, 'index.html', {'tarjetas_destacadas': tarjetas_destacadas})
+    if version_destacadas != version:
+        # Destacados de la versión anterior: la caché de páginas no la guarda
+        patch_cache_control(respuesta, no_cache=True)
+    return respuesta
+
+def _rangos_con_enlace(request, rangos, filtros, campo_min, campo_max):
+    """Agrega a cada rango de una faceta su querystring y si está activo"""
+    resultado = []
+    for rango in rangos:
+        params = request.GET.copy()
+        params.pop('cursor', None)
+        for campo, valor in ((campo_min, rango['min']), (campo_max, rango['max'])):
+            if valor is None:
+                params.pop(campo, None)
+            else:
+                params[campo] = valor
+        activo = (filtros.get(campo_min) == (str(rango['min']) if rango['min'] is not None else None)
+                  and filtros.get(campo_max) == (str(rango['max']) if rango['max'] is not None else None))
+        resultado.append(dict(rango, querystring=params.urlencode(), activo=activo))
+    return resultado
 
+@condition(etag_func=etag_catalogo, last_modified_func=ultima_modificacion_catalogo)
+@cache_listado
 def catalogo(request):
-    """Catálogo de vehículos con filtros de búsqueda"""
-    vehiculos = Vehiculo.objects.filter(disponible=True).select_related('marca').prefetch_related('condicion')
-    marcas = Marca.objects.all()
-    
-    # Filtrado por marca
-    marca_id = request.GET.get('marca')
-    if marca_id:
-        vehiculos = vehiculos.filter(marca_id=marca_id)
-    
-    # Filtrado por año
-    anio_min = request.GET.get('anio_min')
-    anio_max = request.GET.get('anio_max')
-    if anio_min:
-        vehiculos = vehiculos.filter(anio__gte=anio_min)
-    if anio_max:
-        vehiculos = vehiculos.filter(anio__lte=anio_max)
-    
-    # Filtrado por precio
-    precio_min = request.GET.get('precio_min')
-    precio_max = request.GET.get('precio_max')
-    if precio_min:
-        vehiculos = vehiculos.filter(precio__gte=precio_min)
-    if precio_max:
-        vehiculos = vehiculos.filter(precio__lte=precio_max)
-
-    # Búsqueda por texto (marca, modelo, descripción)
-    query = request.GET.get('q')
-    if query:
-        vehiculos = vehiculos.filter(
-            Q(modelo__icontains=query) | 
-            Q(descripcion__icontains=query) |
-            Q(marca__nombre__icontains=query)
-        )
+    """Catálogo de vehículos con filtros de búsqueda y paginación por cursor"""
+    # Tabla de lectura: solo disponibles y con todo lo que muestra la tarjeta
+    vehiculos = VehiculoCatalogo.objects.all()
+
+    # Filtros: marca, condición, atributo, año, precio y búsqueda por texto
+    filtros = normalizar_filtros(request.GET)
+    vehiculos = aplicar_filtros(vehiculos, filtros)
+    clave = clave_filtros(filtros)
+
+    # El contador sale de un COUNT cacheado, sin materializar las filas (o de
+    # la estimación del planificador si son muchas).
+    # Las claves llevan la versión del inventario: un cambio las invalida todas
+    total_vehiculos, total_aproximado = contar_cacheado(
+        vehiculos, clave_versionada('catalogo:conteo', clave), TIEMPO_CACHE_RESULTADOS
+    )
+
+    # Página actual: los siguientes VEHICULOS_POR_PAGINA después del cursor
+    # Con búsqueda por texto se ordena primero por relevancia
+    orden = ORDEN_BUSQUEDA if 'q' in filtros else ORDEN_CATALOGO
+    cursor = request.GET.get('cursor')
+    pagina, siguiente_cursor = obtener_o_calcular(
+        clave_versionada('catalogo:pagina', clave, cursor or ''),
+        lambda: paginar_keyset(vehiculos, orden, cursor, VEHICULOS_POR_PAGINA, contexto=clave),
+    )
+
+    # Búsqueda sin resultados: sugerencias por similitud ("toyta" -> "Toyota")
+    sugerencias = sugerir(filtros['q']) if 'q' in filtros and total_vehiculos == 0 else []
+
+    # Conteos por faceta para mostrar junto a cada opción de filtro
+    facetas = obtener_facetas(filtros)
+    rangos_anio = _rangos_con_enlace(request, facetas['anios'], filtros, 'anio_min', 'anio_max')
+    rangos_precio = _rangos_con_enlace(request, facetas['precios'], filtros, 'precio_min', 'precio_max')
+
+    # Los enlaces de paginación conservan los filtros de la URL actual
+    params = request.GET.copy()
+    params.pop('cursor', None)
+    querystring_inicio = params.urlencode()
+    querystring_siguiente = None
+    if siguiente_cursor:
+        params['cursor'] = siguiente_cursor
+        querystring_siguiente = params.urlencode()
 
     return render(request, 'catalogo.html', {
-        'vehiculos': vehiculos,
-        'marcas': marcas,
+        'vehiculos': pagina,
+        'tarjetas': renderizar_tarjetas(pagina),
+        'total_vehiculos': total_vehiculos,
+        'total_aproximado': total_aproximado,
+        'facetas': facetas,
+        'rangos_anio': rangos_anio,
+        'rangos_precio': rangos_precio,
+        'query': filtros.get('q'),
+        'marca_seleccionada': int(filtros['marca']) if 'marca' in filtros else None,
+        'condicion_seleccionada': int(filtros['condicion']) if 'condicion' in filtros else None,
+        'atributo_seleccionado': int(filtros['atributo']) if 'atributo' in filtros else None,
+        'anio_min': filtros.get('anio_min'),
+        'anio_max': filtros.get('anio_max'),
+        'precio_min': filtros.get('precio_min'),
+        'precio_max': filtros.get('precio_max'),
+        'es_primera_pagina': not cursor,
+        'querystring_inicio': querystring_inicio,
+        'querystring_siguiente': querystring_siguiente,
+        'sugerencias': sugerencias,
+    })
+
+def buscar_automovil(request):
+    """Búsqueda simple por marca o modelo (vista heredada), con sugerencias"""
+    query = ' '.join(request.GET.get('q', '').split())
+    resultados = []
+    sugerencias = []
+    if query:
+        resultados = list(
+            buscar(Vehiculo.objects.filter(disponible=True).select_related('marca'), query)
+            .order_by(*ORDEN_BUSQUEDA)[:VEHICULOS_POR_PAGINA]
+        )
+        if not resultados:
+            sugerencias = sugerir(query)
+    return render(request, 'buscar_automovil.html', {
+        'resultados': resultados,
         'query': query,
-        'marca_seleccionada': int(marca_id) if marca_id else None,
-        'anio_min': anio_min,
-        'anio_max': anio_max,
-        'precio_min': precio_min,
-        'precio_max': precio_max,
+        'sugerencias': sugerencias,
     })
 
+def autocompletar_catalogo(request):
+    """Sugerencias JSON para el buscador del catálogo (sin consultar la base de datos)"""
+    prefijo = request.GET.get('q', '').strip()
+    try:
+        limite = min(max(int(request.GET.get('limite', LIMITE_AUTOCOMPLETADO)), 1), LIMITE_AUTOCOMPLETADO)
+    except ValueError:
+        limite = LIMITE_AUTOCOMPLETADO
+    sugerencias = autocompletar(prefijo, limite) if prefijo else []
+    return JsonResponse({'q': prefijo, 'sugerencias': sugerencias})
+
+def facetas_catalogo(request):
+    """Conteos por faceta del catálogo en JSON para los filtros de la URL"""
+    return JsonResponse(obtener_facetas(normalizar_filtros(request.GET)))
+
+@condition(etag_func=etag_detalle, last_modified_func=ultima_modificacion_detalle)
+@cache_detalle
 def detalle_vehiculo(request, vehiculo_id):
     """Detalle de un vehículo específico"""
     vehiculo = get_object_or_404(
@@ -0,0 +1,159 @@
+"""
+Archivos estáticos con hash en el nombre, precomprimidos y cacheables.
+
+- EstaticosComprimidos (STORAGES['staticfiles']): en `collectstatic`
+  escribe cada archivo con el hash de su contenido en el nombre
+  (catalogo.3f2a9c1b.css) y el manifiesto staticfiles.json que usa
+  {% static %}; además deja junto a cada archivo de texto su versión .gz
+  y, si está instalado el paquete `brotli`, .br.
+- MiddlewareEstaticos: sirve STATIC_ROOT desde el propio proceso (sin
+  DEBUG). Elige la variante precomprimida según Accept-Encoding, sin
+  comprimir nada al responder, y marca como inmutables por un año los
+  nombres con hash: un cambio en el archivo produce otra URL.
+"""
+import gzip
+import json
+import mimetypes
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import FileResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+try:
+    import brotli
+except ImportError:  # opcional: sin él solo se generan las variantes .gz
+    brotli = None
+
+EXTENSIONES_COMPRIMIBLES = ('.css', '.js', '.mjs', '.svg', '.json', '.map', '.txt', '.html', '.xml', '.ico')
+# Solo se guarda la variante si ahorra al menos un 5%
+PROPORCION_MAXIMA = 0.95
+CACHE_INMUTABLE = 'public, max-age=31536000, immutable'
+CACHE_SIN_HASH = 'public, max-age=60'
+# (Content-Encoding, extensión), en orden de preferencia
+VARIANTES = (('br', '.br'), ('gzip', '.gz'))
+
+
+def _comprimir(contenido):
+    variantes = {'.gz': gzip.compress(contenido, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variantes['.br'] = brotli.compress(contenido, quality=11)
+    return variantes
+
+
+class EstaticosComprimidos(ManifestStaticFilesStorage):
+    """ManifestStaticFilesStorage que además precomprime los archivos con hash"""
+
+    # Una referencia a un archivo que no existe no debe tumbar la página
+    manifest_strict = False
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        for nombre in set(self.hashed_files.values()):
+            if not nombre.endswith(EXTENSIONES_COMPRIMIBLES) or not self.exists(nombre):
+                continue
+            with self.open(nombre) as archivo:
+                contenido = archivo.read()
+            for extension, comprimido in _comprimir(contenido).items():
+                ruta = self.path(nombre + extension)
+                if len(comprimido) <= len(contenido) * PROPORCION_MAXIMA:
+                    with open(ruta, 'wb') as destino:
+                        destino.write(comprimido)
+                elif os.path.exists(ruta):
+                    os.remove(ruta)
+
+
+def _codificaciones_aceptadas(cabecera):
+    """Codificaciones de Accept-Encoding con q > 0"""
+    aceptadas = set()
+    for parte in cabecera.split(','):
+        nombre, _, parametros = parte.partition(';')
+        calidad = 1.0
+        parametros = parametros.strip().replace(' ', '')
+        if parametros.startswith('q='):
+            try:
+                calidad = float(parametros[2:])
+            except ValueError:
+                calidad = 0.0
+        if calidad > 0:
+            aceptadas.add(nombre.strip().lower())
+    return aceptadas
+
+
+class MiddlewareEstaticos:
+    """
+    Sirve STATIC_URL desde STATIC_ROOT. El índice de archivos se arma una
+    vez al iniciar el proceso (después de `collectstatic`). Las variantes
+    .gz/.br van aparte: solo se envían con Content-Encoding, nunca pedidas
+    por su propio nombre. Con DEBUG se desactiva: en desarrollo los sirve
+    static() de las urls.
+    """
+
+    def __init__(self, get_response):
+        if settings.DEBUG or not settings.STATIC_ROOT:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.prefijo = '/' + settings.STATIC_URL.lstrip('/')
+        self.archivos, self.variantes = self._indexar(settings.STATIC_ROOT)
+        self.con_hash = self._nombres_con_hash(settings.STATIC_ROOT)
+
+    @staticmethod
+    def _indexar(raiz):
+        archivos = {}
+        for carpeta, _, nombres in os.walk(raiz):
+            for nombre in nombres:
+                ruta = os.path.join(carpeta, nombre)
+                relativo = os.path.relpath(ruta, raiz).replace(os.sep, '/')
+                estado = os.stat(ruta)
+                archivos[relativo] = (ruta, estado.st_size, estado.st_mtime)
+        # Un .gz/.br junto a su original es una variante; uno suelto se sirve tal cual
+        variantes = {
+            relativo: archivos[relativo] for relativo in list(archivos)
+            if any(relativo.endswith(extension) and relativo[:-len(extension)] in archivos for _, extension in VARIANTES)
+        }
+        for relativo in variantes:
+            del archivos[relativo]
+        return archivos, variantes
+
+    @staticmethod
+    def _nombres_con_hash(raiz):
+        try:
+            with open(os.path.join(raiz, ManifestStaticFilesStorage.manifest_name), encoding='utf-8') as manifiesto:
+                return set(json.load(manifiesto).get('paths', {}).values())
+        except (OSError, ValueError):
+            return set()
+
+    def __call__(self, request):
+        if request.method in ('GET', 'HEAD') and request.path_info.startswith(self.prefijo):
+            nombre = request.path_info[len(self.prefijo):]
+            if nombre in self.archivos:
+                return self._servir(request, nombre)
+        return self.get_response(request)
+
+    def _servir(self, request, nombre):
+        aceptadas = _codificaciones_aceptadas(request.headers.get('Accept-Encoding', ''))
+        codificacion, variante = None, nombre
+        for candidata, extension in VARIANTES:
+            if candidata in aceptadas and nombre + extension in self.variantes:
+                codificacion, variante = candidata, nombre + extension
+                break
+        ruta, tamano, modificado = self.variantes[variante] if codificacion else self.archivos[nombre]
+
+        etag = quote_etag(f'{int(modificado * 1000):x}-{tamano:x}')
+        respuesta = get_conditional_response(request, etag=etag, last_modified=int(modificado))
+        if respuesta is None:
+            tipo = mimetypes.guess_type(nombre)[0] or 'application/octet-stream'
+            respuesta = FileResponse(open(ruta, 'rb'), content_type=tipo)
+            if codificacion:
+                respuesta.headers['Content-Encoding'] = codificacion
+        respuesta.headers['ETag'] = etag
+        respuesta.headers['Last-Modified'] = http_date(int(modificado))
+        respuesta.headers['Cache-Control'] = CACHE_INMUTABLE if nombre in self.con_hash else CACHE_SIN_HASH
+        if any(nombre + extension in self.variantes for _, extension in VARIANTES):
+            patch_vary_headers(respuesta, ('Accept-Encoding',))
+        return respuesta
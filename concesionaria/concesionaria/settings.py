@@ -44,6 +44,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Estáticos con hash y precomprimidos, antes que sesión y CSRF (sin DEBUG)
+    'concesionaria.estaticos.MiddlewareEstaticos',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -93,6 +95,30 @@ DATABASES = {
 # }
 
 
+# Caché
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Resultados del catálogo, facetas, tarjetas y páginas (ver autos/cache.py).
+# Las invalidaciones incrementan una versión guardada en la caché: todos los
+# workers deben ver la misma, así que la caché tiene que ser compartida.
+# Por defecto, archivos en disco (sirve a todos los procesos del servidor);
+# con varios servidores, Redis o Memcached. LocMemCache es por proceso y
+# desactiva esas cachés (ver autos/cache.py).
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    }
+}
+
+# Caché de página completa para visitantes anónimos (autos/paginas.py)
+CACHE_PAGINAS_ANONIMAS = True
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -139,6 +165,22 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Entrega de media (autos/media.py): None la envía Django con FileResponse;
+# 'x-accel-redirect' (nginx) o 'x-sendfile' (Apache/lighttpd) la delegan al
+# servidor web. Para nginx, MEDIA_ACCEL_PREFIX es una location `internal`
+# con `alias` a MEDIA_ROOT.
+MEDIA_SENDFILE = None
+MEDIA_ACCEL_PREFIX = '/media-interna/'
+
+# Almacenamientos. "imagenes" guarda las fotos de vehículos por contenido
+# (un archivo por imagen distinta, nombrado por su hash; ver autos/almacenamiento.py)
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    # collectstatic: nombres con hash, manifiesto y variantes .gz/.br (concesionaria/estaticos.py)
+    'staticfiles': {'BACKEND': 'concesionaria.estaticos.EstaticosComprimidos'},
+    'imagenes': {'BACKEND': 'autos.almacenamiento.AlmacenamientoDeduplicado'},
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -0,0 +1,88 @@
+import gzip
+import json
+import os
+import tempfile
+import zlib
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from . import estaticos
+from .estaticos import MiddlewareEstaticos
+
+
+class EstaticosTests(SimpleTestCase):
+    """collectstatic con EstaticosComprimidos y la entrega de MiddlewareEstaticos"""
+    NOMBRE = 'autos/css/catalogo.css'
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        carpeta = tempfile.TemporaryDirectory(prefix='estaticos-tests-')
+        cls.addClassCleanup(carpeta.cleanup)
+        cls.ajustes = override_settings(
+            DEBUG=False,
+            STATIC_ROOT=carpeta.name,
+            STORAGES={**settings.STORAGES, 'staticfiles': {'BACKEND': 'concesionaria.estaticos.EstaticosComprimidos'}},
+        )
+        cls.ajustes.enable()
+        cls.addClassCleanup(cls.ajustes.disable)
+        # Sin el paquete brotli instalado, un compresor de reemplazo muestra que se escribe el .br
+        brotli = estaticos.brotli or mock.Mock(compress=lambda contenido, quality: zlib.compress(contenido, 9))
+        with mock.patch.object(estaticos, 'brotli', brotli):
+            call_command('collectstatic', interactive=False, verbosity=0)
+        with open(os.path.join(carpeta.name, 'staticfiles.json'), encoding='utf-8') as manifiesto:
+            cls.hasheado = json.load(manifiesto)['paths'][cls.NOMBRE]
+        cls.raiz = carpeta.name
+
+    def _leer(self, nombre):
+        with open(os.path.join(self.raiz, nombre), 'rb') as archivo:
+            return archivo.read()
+
+    def _middleware(self):
+        return MiddlewareEstaticos(lambda request: HttpResponse('vista', status=404))
+
+    def _get(self, nombre, **cabeceras):
+        return self._middleware()(RequestFactory().get(f'/{settings.STATIC_URL.lstrip("/")}{nombre}', **cabeceras))
+
+    def test_post_process_escribe_variantes(self):
+        original = self._leer(self.hasheado)
+        self.assertEqual(gzip.decompress(self._leer(self.hasheado + '.gz')), original)
+        self.assertTrue(os.path.exists(os.path.join(self.raiz, self.hasheado + '.br')))
+        # Solo los nombres con hash y solo formatos de texto
+        self.assertFalse(os.path.exists(os.path.join(self.raiz, self.NOMBRE + '.gz')))
+        self.assertFalse(any(nombre.endswith(('.png.gz', '.jpg.gz')) for nombre in self._middleware().variantes))
+
+    def test_variante_segun_accept_encoding(self):
+        for cabecera, codificacion, sufijo in (
+            ('gzip, deflate, br', 'br', '.br'),
+            ('gzip', 'gzip', '.gz'),
+            ('br;q=0, gzip', 'gzip', '.gz'),
+            ('', None, ''),
+        ):
+            with self.subTest(accept_encoding=cabecera):
+                respuesta = self._get(self.hasheado, HTTP_ACCEPT_ENCODING=cabecera)
+                self.assertEqual(respuesta.status_code, 200)
+                self.assertEqual(respuesta.get('Content-Encoding'), codificacion)
+                self.assertEqual(respuesta['Content-Type'], 'text/css')
+                self.assertEqual(respuesta['Vary'], 'Accept-Encoding')
+                self.assertEqual(b''.join(respuesta.streaming_content), self._leer(self.hasheado + sufijo))
+
+    def test_etag_coincidente_da_304(self):
+        etag = self._get(self.hasheado, HTTP_ACCEPT_ENCODING='gzip')['ETag']
+        respuesta = self._get(self.hasheado, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 304)
+        # El ETag es de la variante: otra codificación no coincide
+        self.assertEqual(self._get(self.hasheado, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_cache_control(self):
+        self.assertEqual(self._get(self.hasheado)['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(self._get(self.NOMBRE)['Cache-Control'], 'public, max-age=60')
+
+    def test_las_variantes_no_se_sirven_por_su_nombre(self):
+        for sufijo in ('.gz', '.br'):
+            with self.subTest(variante=sufijo):
+                self.assertEqual(self._get(self.hasheado + sufijo).content, b'vista')
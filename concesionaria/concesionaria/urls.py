@@ -1,14 +1,19 @@
+import re
+
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 
+from autos.media import servir_media
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('autos.urls')),
     path('', include('login.urls')),
+    # Media también en producción: caché, rangos y X-Sendfile (autos/media.py)
+    re_path(rf'^{re.escape(settings.MEDIA_URL.lstrip("/"))}(?P<ruta>.+)$', servir_media, name='media'),
 ]
 
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
@@ -2,6 +2,9 @@ from django import forms
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group, Permission
 from django.contrib.auth.forms import UserCreationForm
+from django.db.models import Max
+from autos.models import Atributo, Categoria, Vehiculo
+from autos.reprecio import PRECIO_MAXIMO
 
 User = get_user_model()
 
@@ -59,3 +62,66 @@ class AdminUserCreationForm(UserCreationForm):
     class Meta:
         model = User
         fields = ('username', 'email', 'password1', 'password2', 'groups', 'user_permissions')
+
+
+class IdsVehiculosField(forms.Field):
+    """Lista de ids enviada como varios valores con el mismo nombre (checkboxes)"""
+    widget = forms.MultipleHiddenInput
+    default_error_messages = {
+        'required': 'Selecciona al menos un vehículo.',
+        'invalid': 'La selección de vehículos no es válida.',
+    }
+
+    def to_python(self, value):
+        try:
+            return [int(valor) for valor in value or []]
+        except (TypeError, ValueError):
+            raise forms.ValidationError(self.error_messages['invalid'], code='invalid')
+
+
+class AccionMasivaForm(forms.Form):
+    """Acción sobre los vehículos seleccionados en la tabla del inventario"""
+    PORCENTAJE_MAXIMO = 1000
+    ACCIONES = [
+        ('disponible', 'Marcar como disponibles'),
+        ('no_disponible', 'Marcar como no disponibles'),
+        ('precio_porcentaje', 'Ajustar precio (%)'),
+        ('precio_monto', 'Ajustar precio ($)'),
+        ('categoria', 'Asignar categoría'),
+        ('atributos', 'Agregar atributos'),
+    ]
+
+    ids = IdsVehiculosField(label='Vehículos')
+    accion = forms.ChoiceField(choices=ACCIONES, widget=forms.Select(attrs={'class': 'form-select form-select-sm'}))
+    valor = forms.DecimalField(
+        required=False, max_digits=12, decimal_places=2,
+        widget=forms.NumberInput(attrs={'class': 'form-control form-control-sm', 'step': '0.01', 'placeholder': 'Ej: -5 o 250000'}),
+        help_text="Porcentaje o monto; negativo para bajar",
+    )
+    categoria = forms.ModelChoiceField(
+        queryset=Categoria.objects.all(), required=False, empty_label='Sin categoría',
+        widget=forms.Select(attrs={'class': 'form-select form-select-sm'}),
+    )
+    atributos = forms.ModelMultipleChoiceField(
+        queryset=Atributo.objects.all(), required=False,
+        widget=forms.SelectMultiple(attrs={'class': 'form-select form-select-sm'}),
+    )
+
+    def clean(self):
+        datos = super().clean()
+        accion = datos.get('accion')
+        if accion in ('precio_porcentaje', 'precio_monto') and datos.get('valor') is None:
+            self.add_error('valor', 'Indica el porcentaje o monto a aplicar.')
+        valor = datos.get('valor')
+        if accion == 'precio_porcentaje' and valor is not None and not -100 < valor <= self.PORCENTAJE_MAXIMO:
+            self.add_error('valor', f'El porcentaje debe ser mayor que -100 y hasta {self.PORCENTAJE_MAXIMO}.')
+        elif accion in ('precio_porcentaje', 'precio_monto') and valor is not None and datos.get('ids'):
+            # El precio resultante tiene que entrar en la columna (numeric(12, 2))
+            maximo = Vehiculo.objects.filter(pk__in=datos['ids']).aggregate(maximo=Max('precio'))['maximo']
+            if maximo is not None:
+                nuevo = maximo * (1 + valor / 100) if accion == 'precio_porcentaje' else maximo + valor
+                if nuevo > PRECIO_MAXIMO:
+                    self.add_error('valor', f'El precio resultante superaría el máximo permitido ({PRECIO_MAXIMO:,}).')
+        if accion == 'atributos' and not datos.get('atributos'):
+            self.add_error('atributos', 'Selecciona al menos un atributo.')
+        return datos
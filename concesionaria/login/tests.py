@@ -1,3 +1,133 @@
+import re
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.messages import get_messages
+from django.http import StreamingHttpResponse
+from django.template.loader import render_to_string
 from django.test import TestCase
+from django.urls import reverse
+
+from autos import streaming
+from autos.models import Marca, Vehiculo
+from autos.resumen import reconstruir_resumen
+from autos.tests import ajustes_de_prueba
+
+from . import views
+from .forms import AccionMasivaForm
+
+
+@ajustes_de_prueba
+class AccionMasivaFormTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        marca = Marca.objects.create(nombre='Toyota')
+        cls.vehiculo = Vehiculo.objects.create(marca=marca, modelo='Corolla', anio=2020, precio=15000)
+
+    def _form(self, accion, valor):
+        return AccionMasivaForm({'ids': [self.vehiculo.pk], 'accion': accion, 'valor': valor})
+
+    def test_porcentaje_fuera_de_rango(self):
+        for valor in ('-100', '99999999', '1000.01'):
+            with self.subTest(valor=valor):
+                self.assertIn('valor', self._form('precio_porcentaje', valor).errors)
+        self.assertTrue(self._form('precio_porcentaje', '-5').is_valid())
+
+    def test_precio_resultante_demasiado_grande(self):
+        self.assertIn('valor', self._form('precio_monto', '9999999999').errors)
+        self.assertTrue(self._form('precio_monto', '250000').is_valid())
+        # Un porcentaje dentro del rango también se rechaza si el precio mayor no entra
+        caro = Vehiculo.objects.create(marca=self.vehiculo.marca, modelo='Century', anio=2024, precio=6_000_000_000)
+        form = AccionMasivaForm({'ids': [self.vehiculo.pk, caro.pk], 'accion': 'precio_porcentaje', 'valor': '100'})
+        self.assertIn('valor', form.errors)
+
+    def test_la_vista_muestra_el_error_sin_cambiar_precios(self):
+        usuario = get_user_model().objects.create_superuser('acciones', 'acciones@example.com', 'x')
+        self.client.force_login(usuario)
+        respuesta = self.client.post(reverse('panel:acciones_inventario'), {
+            'ids': [self.vehiculo.pk], 'accion': 'precio_porcentaje', 'valor': '99999999',
+        })
+        self.assertRedirects(respuesta, reverse('panel:inventario'), fetch_redirect_response=False)
+        self.assertIn('No se aplicó la acción', [str(mensaje) for mensaje in get_messages(respuesta.wsgi_request)][0])
+        self.vehiculo.refresh_from_db()
+        self.assertEqual(self.vehiculo.precio, Decimal('15000.00'))
+
+
+@ajustes_de_prueba
+class InventarioTests(TestCase):
+    TOKEN_CSRF = re.compile(r'name="csrfmiddlewaretoken" value="[^"]+"')
+
+    @classmethod
+    def setUpTestData(cls):
+        marca = Marca.objects.create(nombre='Toyota')
+        Vehiculo.objects.bulk_create([
+            Vehiculo(marca=marca, modelo=f'Modelo {numero}', anio=2000 + numero % 25, precio=1_000_000 + numero * 1000,
+                     kilometraje=numero * 100, disponible=numero % 3 != 0)
+            for numero in range(60)
+        ])
+        reconstruir_resumen()
+        cls.usuario = get_user_model().objects.create_superuser('inventario', 'inventario@example.com', 'x')
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def test_todos_por_partes_igual_que_sin_partes(self):
+        completas = []
+
+        def render_en_partes_y_completa(request, plantilla, contexto, plantilla_fila, filas, **kwargs):
+            completas.append(render_to_string(plantilla, dict(contexto, vehiculos_pagina=filas), request))
+            # Lotes chicos: las 60 filas salen en varias partes
+            return streaming.render_en_partes(request, plantilla, contexto, plantilla_fila, filas,
+                                              **dict(kwargs, tamano_lote=7))
+
+        with mock.patch.object(views, 'render_en_partes', render_en_partes_y_completa):
+            respuesta = self.client.get(reverse('panel:inventario'), {'por_pagina': 'todos'})
+        self.assertIsInstance(respuesta, StreamingHttpResponse)
+        partes = [parte.decode('utf-8') for parte in respuesta.streaming_content]
+        self.assertGreater(len(partes), 3)
+        cuerpo = ''.join(partes)
+        self.assertEqual(cuerpo.count('class="vehicle-row"'), 60)
+        # El token CSRF se enmascara distinto en cada render
+        self.assertEqual(self.TOKEN_CSRF.sub('', cuerpo), self.TOKEN_CSRF.sub('', completas[0]))
+
+    def _pagina(self, **params):
+        respuesta = self.client.get(reverse('panel:inventario'), params)
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta
+
+    def test_orden_por_columna(self):
+        for orden, esperado in (
+            ('precio', ('precio', 'pk')),
+            ('-anio', ('-anio', '-pk')),
+            ('kilometraje', ('kilometraje', 'pk')),
+        ):
+            with self.subTest(orden=orden):
+                respuesta = self._pagina(orden=orden, parcial='1')
+                self.assertEqual(respuesta.context['orden'], orden)
+                self.assertEqual(
+                    [vehiculo.pk for vehiculo in respuesta.context['vehiculos_pagina']],
+                    list(Vehiculo.objects.order_by(*esperado).values_list('pk', flat=True)[:25]),
+                )
+
+    def test_orden_desconocido_usa_el_por_defecto(self):
+        por_defecto = list(Vehiculo.objects.order_by('-fecha_ingreso', '-pk').values_list('pk', flat=True)[:25])
+        for orden in ('descripcion', '-marca__nombre', 'precio;DROP', '?'):
+            with self.subTest(orden=orden):
+                respuesta = self._pagina(orden=orden, parcial='1')
+                self.assertEqual(respuesta.context['orden'], '-fecha_ingreso')
+                self.assertEqual([vehiculo.pk for vehiculo in respuesta.context['vehiculos_pagina']], por_defecto)
 
-# Create your tests here.
\ No newline at end of file
+    def test_parcial_devuelve_solo_la_tabla(self):
+        respuesta = self._pagina(parcial='1', pagina='2', estado='disponible')
+        self.assertTemplateUsed(respuesta, '_tabla_inventario.html')
+        self.assertTemplateNotUsed(respuesta, 'inventario.html')
+        self.assertTemplateNotUsed(respuesta, 'base.html')
+        contenido = respuesta.content.decode('utf-8')
+        self.assertNotIn('<html', contenido)
+        self.assertNotIn('<!-- filas -->', contenido)
+        # Los 40 disponibles: la segunda página tiene las 15 filas restantes
+        self.assertEqual(contenido.count('class="vehicle-row"'), 15)
+        # Los enlaces conservan los filtros pero no piden otra vez el fragmento
+        self.assertIn('href="?estado=disponible&amp;pagina=1" data-parcial', contenido)
+        self.assertNotIn('parcial=1', contenido)
@@ -17,6 +17,7 @@ urlpatterns = [
     
     # GESTIÓN DE INVENTARIO - Requiere permisos específicos
     path('inventario/', views.inventario_view, name='inventario'),
+    path('inventario/acciones/', views.acciones_inventario_view, name='acciones_inventario'),
     
     # CRUD DE AUTOMÓVILES - Operaciones administrativas
     path('crear/', views.crear_automovil_view, name='crear_automovil'),
@@ -2,11 +2,18 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.models import Group
 from django.contrib import messages
+from django.urls import reverse
+from django.utils.http import url_has_allowed_host_and_scheme
+from autos import acciones
 from autos.models import Vehiculo
+from autos.filtros import normalizar_filtros, aplicar_filtros
+from autos.paginacion import PaginadorAproximado, contar_aproximado
 from autos.forms import VehiculoForm
+from autos.resumen import estadisticas_inventario
+from autos.streaming import render_en_partes
 from .mixins import verificar_login_y_permisos
 from django.contrib.auth import get_user_model
-from .forms import UserEditForm, AdminUserCreationForm, CustomUserCreationForm
+from .forms import UserEditForm, AdminUserCreationForm, CustomUserCreationForm, AccionMasivaForm
 
 # VISTAS DE AUTENTICACIÓN - Registro, Login y Logout
 def register_view(request):
@@ -41,10 +48,52 @@ def logout_view(request):
     return render(request, 'logout.html')
 
 # VISTAS ADMINISTRATIVAS - Requieren autenticación y permisos específicos
+
+# Tabla del inventario: columnas ordenables (cada una con su índice en
+# Vehiculo.Meta.indexes) y tamaños de página permitidos
+COLUMNAS_ORDEN_INVENTARIO = (
+    ('precio', 'Precio', 'fa-dollar-sign'),
+    ('anio', 'Año', 'fa-calendar'),
+    ('kilometraje', 'Km', 'fa-road'),
+    ('fecha_ingreso', 'Ingreso', 'fa-clock'),
+)
+ORDEN_INVENTARIO = '-fecha_ingreso'
+TAMANOS_PAGINA_INVENTARIO = (25, 50, 100)
+
+
+def _querystring(request, **cambios):
+    """Querystring actual con los cambios indicados (None quita el parámetro)"""
+    params = request.GET.copy()
+    params.pop('parcial', None)
+    for clave, valor in cambios.items():
+        if valor is None:
+            params.pop(clave, None)
+        else:
+            params[clave] = valor
+    return params.urlencode()
+
+
+def _columnas_orden(request, orden):
+    """Enlaces de orden de cada columna: alterna ascendente/descendente"""
+    columnas = []
+    for campo, titulo, icono in COLUMNAS_ORDEN_INVENTARIO:
+        direccion = 'asc' if orden == campo else 'desc' if orden == f'-{campo}' else None
+        siguiente = campo if direccion == 'desc' else f'-{campo}'
+        columnas.append({
+            'titulo': titulo,
+            'icono': icono,
+            'direccion': direccion,
+            'querystring': _querystring(request, orden=siguiente, pagina=None),
+        })
+    return columnas
+
+
 def inventario_view(request):
     """
     Vista administrativa para mostrar el inventario completo de vehículos.
-    Permite ver todos los vehículos (disponibles y no disponibles).
+    Permite ver todos los vehículos (disponibles y no disponibles), con
+    filtros, orden por columna y paginación en el servidor. Con ?parcial=1
+    devuelve solo la tabla (la pide inventory.js al paginar u ordenar).
     Requiere: autenticación + permiso InventarioView (usando mixin)
     """
     # PASO 1: Verificar login y permisos
@@ -53,20 +102,108 @@ def inventario_view(request):
         return resultado
     
     # PASO 2: Si llegamos aquí, todo está bien, hacer el trabajo normal
-    vehiculos = Vehiculo.objects.all().select_related('marca').order_by('-fecha_ingreso')
-    total_vehiculos = vehiculos.count()
-    disponibles = vehiculos.filter(disponible=True).count()
-    if total_vehiculos > 0:
-        valor_promedio = sum([v.precio for v in vehiculos]) / total_vehiculos
+    # Filtros: los mismos del catálogo (marca, q, año, precio...) más el estado
+    filtros = normalizar_filtros(request.GET)
+    vehiculos = aplicar_filtros(Vehiculo.objects.select_related('marca'), filtros)
+    estado = request.GET.get('estado')
+    if estado == 'disponible':
+        vehiculos = vehiculos.filter(disponible=True)
+    elif estado == 'vendido':
+        vehiculos = vehiculos.filter(disponible=False)
+
+    # Orden: la columna elegida y el id en la misma dirección para desempatar
+    orden = request.GET.get('orden', ORDEN_INVENTARIO)
+    if orden.lstrip('-') not in [campo for campo, _, _ in COLUMNAS_ORDEN_INVENTARIO]:
+        orden = ORDEN_INVENTARIO
+    vehiculos = vehiculos.order_by(orden, '-pk' if orden.startswith('-') else 'pk')
+
+    # Paginación: "todos" envía el inventario filtrado completo por partes.
+    # Con miles de filas el total es la estimación del planificador
+    por_pagina = request.GET.get('por_pagina')
+    if por_pagina != 'todos':
+        por_pagina = int(por_pagina) if por_pagina in map(str, TAMANOS_PAGINA_INVENTARIO) else TAMANOS_PAGINA_INVENTARIO[0]
+        pagina = PaginadorAproximado(vehiculos, por_pagina).get_page(request.GET.get('pagina'))
+        filas = pagina.object_list
+        total_filtrados, total_aproximado = pagina.paginator.count, pagina.paginator.aproximado
     else:
-        valor_promedio = 0
-    context = {
-        'vehiculos': vehiculos,
-        'total_vehiculos': total_vehiculos,
-        'disponibles': disponibles,
-        'valor_promedio': valor_promedio,
-    }
-    return render(request, 'inventario.html', context)
+        pagina = None
+        filas = vehiculos
+        total_filtrados, total_aproximado = contar_aproximado(vehiculos)
+
+    # Totales, promedio y desglose por marca/condición salen del resumen
+    # precalculado: no se cuenta ni se suma el inventario en cada visita
+    querystring_paginas = _querystring(request, pagina=None)
+    context = estadisticas_inventario()
+    context.update({
+        'pagina': pagina,
+        'total_filtrados': total_filtrados,
+        'total_aproximado': total_aproximado,
+        'orden': orden,
+        'columnas_orden': _columnas_orden(request, orden),
+        'querystring_paginas': f'{querystring_paginas}&' if querystring_paginas else '',
+        'por_pagina': por_pagina,
+        'tamanos_pagina': TAMANOS_PAGINA_INVENTARIO,
+        'estado': estado,
+        'query': filtros.get('q'),
+        'marca_seleccionada': int(filtros['marca']) if 'marca' in filtros else None,
+    })
+    # Con permiso de edición, las filas llevan casilla para acciones masivas
+    seleccionable = request.user.has_perm('login.EditarAutomovilView')
+    context['seleccionable'] = seleccionable
+    if seleccionable:
+        context['form_acciones'] = AccionMasivaForm()
+    if request.GET.get('parcial'):
+        # Solo la tabla: la página de filas es corta, se renderiza de una vez
+        context['vehiculos_pagina'] = filas
+        return render(request, '_tabla_inventario.html', context)
+
+    # PASO 3: La página sale por partes; las filas se generan por lotes
+    return render_en_partes(request, 'inventario.html', context, '_fila_inventario.html', filas,
+                            nombre='vehiculo', contexto_fila={'seleccionable': seleccionable})
+
+def acciones_inventario_view(request):
+    """
+    Aplica una acción masiva a los vehículos seleccionados en el inventario:
+    disponibilidad, ajuste de precio, categoría o atributos. Cada acción es
+    un solo UPDATE (o INSERT masivo) en una transacción.
+    Requiere: autenticación + permiso EditarAutomovilView
+    """
+    # PASO 1: Verificar login y permisos
+    resultado = verificar_login_y_permisos(request, 'login.EditarAutomovilView')
+    if resultado:
+        return resultado
+
+    # PASO 2: Solo POST; se vuelve a la misma vista del inventario (filtros y página)
+    siguiente = request.POST.get('siguiente', '')
+    if not url_has_allowed_host_and_scheme(siguiente, allowed_hosts={request.get_host()}):
+        siguiente = reverse('panel:inventario')
+    if request.method != 'POST':
+        return redirect(siguiente)
+
+    form = AccionMasivaForm(request.POST)
+    if not form.is_valid():
+        errores = '; '.join(error for lista in form.errors.values() for error in lista)
+        messages.error(request, f'No se aplicó la acción: {errores}')
+        return redirect(siguiente)
+
+    ids = form.cleaned_data['ids']
+    accion = form.cleaned_data['accion']
+    valor = form.cleaned_data['valor']
+    if accion == 'disponible':
+        total = acciones.cambiar_disponibilidad(ids, True)
+    elif accion == 'no_disponible':
+        total = acciones.cambiar_disponibilidad(ids, False)
+    elif accion == 'precio_porcentaje':
+        total = acciones.ajustar_precio(ids, porcentaje=valor)
+    elif accion == 'precio_monto':
+        total = acciones.ajustar_precio(ids, monto=valor)
+    elif accion == 'categoria':
+        total = acciones.asignar_categoria(ids, form.cleaned_data['categoria'])
+    else:
+        total = acciones.agregar_atributos(ids, form.cleaned_data['atributos'])
+    etiqueta = dict(AccionMasivaForm.ACCIONES)[accion]
+    messages.success(request, f'{etiqueta}: {total} vehículo{"s" if total != 1 else ""} actualizado{"s" if total != 1 else ""}.')
+    return redirect(siguiente)
 
 def crear_automovil_view(request):
     """
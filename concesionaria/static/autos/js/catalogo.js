@@ -0,0 +1,47 @@
+/**
+ * Catálogo JavaScript - AutoVentas Concesionaria
+ * Autocompletado del buscador usando el endpoint JSON del catálogo
+ */
+
+document.addEventListener('DOMContentLoaded', function() {
+    const input = document.querySelector('input[data-autocompletar-url]');
+    if (!input) {
+        return;
+    }
+
+    const lista = document.getElementById(input.getAttribute('list'));
+    const url = input.dataset.autocompletarUrl;
+    let temporizador = null;
+    let ultimoPrefijo = '';
+
+    // Espera a que el usuario deje de escribir antes de consultar
+    input.addEventListener('input', function() {
+        clearTimeout(temporizador);
+        temporizador = setTimeout(function() {
+            const prefijo = input.value.trim();
+            if (!prefijo || prefijo === ultimoPrefijo) {
+                return;
+            }
+            ultimoPrefijo = prefijo;
+
+            fetch(url + '?q=' + encodeURIComponent(prefijo))
+                .then(function(respuesta) { return respuesta.json(); })
+                .then(function(datos) {
+                    // Ignorar respuestas de prefijos ya reemplazados
+                    if (datos.q !== input.value.trim()) {
+                        return;
+                    }
+                    lista.innerHTML = '';
+                    datos.sugerencias.forEach(function(sugerencia) {
+                        const opcion = document.createElement('option');
+                        opcion.value = sugerencia.texto;
+                        opcion.label = sugerencia.texto + ' (' + sugerencia.total + ')';
+                        lista.appendChild(opcion);
+                    });
+                })
+                .catch(function() {
+                    lista.innerHTML = '';
+                });
+        }, 150);
+    });
+});
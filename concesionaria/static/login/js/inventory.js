@@ -7,24 +7,95 @@
 // FUNCIONES DEL INVENTARIO
 // ==========================================================================
 
-// Funcionalidad de búsqueda de vehículos
-function initializeVehicleSearch() {
-    const searchInput = document.getElementById('searchVehicle');
-    if (searchInput) {
-        searchInput.addEventListener('input', function() {
-            const searchTerm = this.value.toLowerCase();
-            const rows = document.querySelectorAll('.vehicle-row');
-            
-            rows.forEach(row => {
-                const text = row.textContent.toLowerCase();
-                if (text.includes(searchTerm)) {
-                    row.style.display = '';
-                } else {
-                    row.style.display = 'none';
+// Tabla del inventario: paginar, ordenar y filtrar sin recargar el panel.
+// El servidor devuelve solo la tabla con ?parcial=1; sin JavaScript los
+// mismos enlaces y el formulario cargan la página completa.
+function initializeInventoryTable() {
+    const tabla = document.getElementById('inventario-tabla');
+    const filtros = document.getElementById('inventario-filtros');
+    if (!tabla) return;
+
+    const cargarTabla = (url, guardarHistorial = true) => {
+        const destino = new URL(url, window.location.href);
+        const parcial = new URL(destino);
+        parcial.searchParams.set('parcial', '1');
+        tabla.classList.add('opacity-50');
+        fetch(parcial, { headers: { 'X-Requested-With': 'XMLHttpRequest' } })
+            .then(response => {
+                if (!response.ok) throw new Error(response.status);
+                return response.text();
+            })
+            .then(html => {
+                tabla.innerHTML = html;
+                if (guardarHistorial) {
+                    history.pushState({ inventario: true }, '', destino);
                 }
-            });
+                initializeInventoryTooltips();
+            })
+            .catch(() => { window.location.href = destino; })
+            .finally(() => tabla.classList.remove('opacity-50'));
+    };
+
+    tabla.addEventListener('click', function(e) {
+        const enlace = e.target.closest('a[data-parcial]');
+        if (!enlace) return;
+        e.preventDefault();
+        cargarTabla(enlace.href);
+    });
+
+    if (filtros) {
+        filtros.addEventListener('submit', function(e) {
+            e.preventDefault();
+            const params = new URLSearchParams(new FormData(filtros));
+            for (const [clave, valor] of [...params]) {
+                if (!valor) params.delete(clave);
+            }
+            cargarTabla(`${filtros.action}?${params}`);
         });
     }
+
+    window.addEventListener('popstate', () => cargarTabla(window.location.href, false));
+}
+
+// Acciones masivas: casillas de selección y campos según la acción elegida
+function initializeInventoryActions() {
+    const form = document.getElementById('inventario-acciones');
+    const tabla = document.getElementById('inventario-tabla');
+    if (!form || !tabla) return;
+
+    const contador = document.getElementById('inventario-seleccionados');
+    const accion = form.querySelector('[name="accion"]');
+    const seleccionadas = () => tabla.querySelectorAll('.inventario-seleccion:checked');
+    const actualizarContador = () => { contador.textContent = seleccionadas().length; };
+    const mostrarCampos = () => {
+        form.querySelectorAll('[data-accion]').forEach(campo => {
+            campo.classList.toggle('d-none', !campo.dataset.accion.split(' ').includes(accion.value));
+        });
+    };
+
+    // La tabla se reemplaza al paginar: se delega en el contenedor
+    tabla.addEventListener('change', function(e) {
+        if (e.target.id === 'inventario-seleccionar-todos') {
+            tabla.querySelectorAll('.inventario-seleccion').forEach(casilla => {
+                casilla.checked = e.target.checked;
+            });
+        }
+        actualizarContador();
+    });
+    new MutationObserver(actualizarContador).observe(tabla, { childList: true });
+
+    accion.addEventListener('change', mostrarCampos);
+    mostrarCampos();
+
+    form.addEventListener('submit', function(e) {
+        if (!seleccionadas().length) {
+            e.preventDefault();
+            alert('Selecciona al menos un vehículo.');
+            return;
+        }
+        // Volver a la página y filtros que se ven ahora (pueden venir de ?parcial)
+        form.querySelector('[name="siguiente"]').value = window.location.pathname + window.location.search;
+    });
 }
 
 // Inicializar tooltips de Bootstrap para inventario
@@ -37,7 +108,8 @@ function initializeInventoryTooltips() {
 
 // Inicializar funciones del inventario cuando el DOM esté listo
 document.addEventListener('DOMContentLoaded', function() {
-    initializeVehicleSearch();
+    initializeInventoryTable();
+    initializeInventoryActions();
     initializeInventoryTooltips();
 });
 